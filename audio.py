@@ -0,0 +1,276 @@
+"""
+Аудио-вход для выражений: amp (громкость) и band[k] (энергия полос спектра)
+
+Фоновый поток читает PCM (WAV файл или сырой s16le из stdin), считает FFT
+и пишет снимок в кольцевой буфер без блокировок. Кадр забирает последний
+снимок в свой заранее созданный массив - без lock и без выделений на линию.
+
+Для проверки из stdin:
+    ffmpeg -i song.mp3 -f s16le -ac 1 -ar 44100 - | python main.py
+с "audio": {"source": "-"} в конфиге
+"""
+import math
+import sys
+import threading
+import time
+import wave
+from array import array
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_BANDS = 8
+DEFAULT_BLOCK = 1024
+DEFAULT_RATE = 44100
+
+# Нижняя граница первой полосы (Гц), полосы идут логарифмически до Найквиста
+LOWEST_FREQUENCY = 40.0
+
+
+def silent_bands(count: int = DEFAULT_BANDS) -> array:
+    """Полосы без звука (для контекста, пока аудио нет)"""
+    return array('d', bytes(8 * count))
+
+
+class SnapshotRing:
+    """
+    Кольцевой буфер снимков для одного писателя и любого числа читателей
+
+    Писатель заполняет следующий слот и только потом публикует счетчик
+    (присваивание атрибута атомарно). Читатель копирует последний
+    опубликованный слот и проверяет, что писатель не успел до него дойти
+    по кругу - тогда копия целая; иначе повторяет. Блокировок нет
+    """
+
+    def __init__(self, width: int, capacity: int = 8):
+        self.width = width
+        self.capacity = capacity
+        self._amps = array('d', bytes(8 * capacity))
+        self._bands = [array('d', bytes(8 * width)) for _ in range(capacity)]
+        self._written = 0  # Сколько снимков опубликовано
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    def write(self, amp: float, bands: array):
+        """Публикует снимок (только из потока писателя)"""
+        index = self._written
+        slot = index % self.capacity
+        self._amps[slot] = amp
+        self._bands[slot][:] = bands
+        self._written = index + 1
+
+    def read_into(self, bands: array) -> float:
+        """Копирует последние полосы в bands (array('d') ширины width), возвращает amp"""
+        while True:
+            written = self._written
+            if written == 0:
+                return 0.0
+            slot = (written - 1) % self.capacity
+            amp = self._amps[slot]
+            bands[:] = self._bands[slot]
+            # Слот перезаписывается, только когда писатель ушел на capacity - 1 вперед
+            if self._written - written < self.capacity - 1:
+                return amp
+
+
+def _band_bins(bands: int, block: int, rate: int):
+    """Границы полос в номерах бинов rfft: логарифмически от LOWEST_FREQUENCY"""
+    nyquist = rate / 2
+    bins = block // 2 + 1
+    edges = []
+    for k in range(bands + 1):
+        frequency = LOWEST_FREQUENCY * (nyquist / LOWEST_FREQUENCY) ** (k / bands)
+        edges.append(min(bins, max(1, int(round(frequency / nyquist * (bins - 1))))))
+    # Каждой полосе хотя бы один бин
+    for k in range(1, len(edges)):
+        edges[k] = max(edges[k], edges[k - 1] + 1)
+    return [(edges[k], min(edges[k + 1], bins)) for k in range(bands)]
+
+
+class AudioInput:
+    """
+    Источник amp/band[k] для выражений
+
+    source - путь к WAV или '-' (сырой PCM s16le из stdin; rate и channels - только для него)
+    Значения: amp - RMS блока (0..1), band[k] - амплитуда полосы (синус
+    полной громкости дает около 1). smoothing - доля прошлого значения (0..1)
+    """
+
+    def __init__(self, source: str, bands: int = DEFAULT_BANDS, block: int = DEFAULT_BLOCK,
+                 rate: int = DEFAULT_RATE, channels: int = 1, loop: bool = True,
+                 gain: float = 1.0, smoothing: float = 0.5):
+        self.source = source
+        self.bands = bands
+        self.block = block
+        self.rate = rate
+        self.channels = channels
+        self.loop = loop
+        self.gain = gain
+        self.smoothing = smoothing
+        self.ring = SnapshotRing(bands)
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'AudioInput':
+        """Из секции 'audio' конфига"""
+        return cls(
+            str(config.get('source', '-')),
+            bands=int(config.get('bands', DEFAULT_BANDS)),
+            block=int(config.get('block', DEFAULT_BLOCK)),
+            rate=int(config.get('rate', DEFAULT_RATE)),
+            channels=int(config.get('channels', 1)),
+            loop=bool(config.get('loop', True)),
+            gain=float(config.get('gain', 1.0)),
+            smoothing=float(config.get('smoothing', 0.5)),
+        )
+
+    def settings(self):
+        """Параметры, при смене которых поток нужно перезапустить"""
+        return (self.source, self.bands, self.block, self.rate, self.channels,
+                self.loop, self.gain, self.smoothing)
+
+    # ========== ПОТОК ==========
+
+    def start(self):
+        if np is None:
+            print("⚠ Audio: numpy not installed, only 'amp' is computed (band[k] stays 0)")
+        self._thread = threading.Thread(target=self._run, name='audio-input', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def read_into(self, bands: array) -> float:
+        """Последний снимок: полосы в bands, возвращает amp (вызывать из кадра)"""
+        return self.ring.read_into(bands)
+
+    def _run(self):
+        try:
+            rate = self.rate
+            if self.source != '-':
+                with wave.open(self.source, 'rb') as wav:
+                    rate = wav.getframerate()
+            analyzer = _Analyzer(self.bands, self.block, rate, self.gain, self.smoothing)
+            for samples in self._blocks():
+                if self._stop.is_set():
+                    break
+                self.ring.write(*analyzer.analyze(samples))
+        except Exception as e:
+            self.error = e
+            print(f"⚠ Audio input stopped: {type(e).__name__}: {e}")
+
+    def _blocks(self) -> Iterator[array]:
+        """Блоки моно сэмплов float (-1..1)"""
+        if self.source == '-':
+            yield from self._stdin_blocks()
+            return
+        while not self._stop.is_set():
+            yield from self._wav_blocks()
+            if not self.loop:
+                break
+
+    def _stdin_blocks(self) -> Iterator[array]:
+        # Темп задает тот, кто пишет в stdin
+        stream = sys.stdin.buffer
+        frame_bytes = 2 * self.channels
+        while not self._stop.is_set():
+            data = stream.read(self.block * frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            data = data[:len(data) - len(data) % frame_bytes]
+            yield _to_mono(data, 2, self.channels)
+
+    def _wav_blocks(self) -> Iterator[array]:
+        # Файл читается в реальном времени: блок раз в block / rate секунд
+        with wave.open(self.source, 'rb') as wav:
+            width = wav.getsampwidth()
+            channels = wav.getnchannels()
+            period = self.block / wav.getframerate()
+            next_time = time.monotonic()
+            while not self._stop.is_set():
+                data = wav.readframes(self.block)
+                if not data:
+                    break
+                yield _to_mono(data, width, channels)
+                next_time += period
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_time = time.monotonic()  # Отстали - не догоняем рывком
+
+
+def _to_mono(data: bytes, width: int, channels: int):
+    """PCM (8 бит беззнаковый, 16/32 бит со знаком) -> моно float -1..1"""
+    if np is not None:
+        if width == 1:
+            samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128) / 128
+        else:
+            dtype = {2: '<i2', 4: '<i4'}[width]
+            samples = np.frombuffer(data, dtype=dtype) / float(2 ** (8 * width - 1))
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        return samples
+
+    if width == 1:
+        values = [(value - 128) / 128 for value in data]
+    else:
+        values = array({2: 'h', 4: 'i'}[width], data)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        scale = float(2 ** (8 * width - 1))
+        values = [value / scale for value in values]
+    if channels > 1:
+        values = [sum(values[i:i + channels]) / channels for i in range(0, len(values), channels)]
+    return array('d', values)
+
+
+class _Analyzer:
+    """Блок сэмплов -> (amp, полосы); состояние сглаживания - внутри потока"""
+
+    def __init__(self, bands: int, block: int, rate: int, gain: float, smoothing: float):
+        self.gain = gain
+        self.smoothing = min(max(smoothing, 0.0), 0.99)
+        self.amp = 0.0
+        self.values = array('d', bytes(8 * bands))
+        self.block = block
+        self.ranges = _band_bins(bands, block, rate)
+        self.window = np.hanning(block) if np is not None else None
+
+    def analyze(self, samples):
+        keep = self.smoothing
+        count = len(samples)
+        if np is not None:
+            amp = float(np.sqrt(np.mean(np.square(samples)))) if count else 0.0
+            if count < self.block:
+                samples = np.pad(samples, (0, self.block - count))
+            # Окно Ханна: синус амплитуды A дает пик |X| около A * N / 4
+            spectrum = np.abs(np.fft.rfft(samples * self.window)) * (4.0 / self.block)
+            for k, (start, end) in enumerate(self.ranges):
+                value = math.sqrt(float(np.sum(np.square(spectrum[start:end])))) * self.gain
+                self.values[k] = keep * self.values[k] + (1 - keep) * value
+        else:
+            amp = math.sqrt(sum(value * value for value in samples) / count) if count else 0.0
+
+        self.amp = keep * self.amp + (1 - keep) * amp * self.gain
+        return self.amp, self.values
+
+
+def open_audio(config: Optional[Dict[str, Any]]) -> Optional[AudioInput]:
+    """Запускает аудио-вход по секции 'audio' (None - без аудио)"""
+    if not isinstance(config, dict):
+        return None
+    audio = AudioInput.from_config(config)
+    audio.start()
+    print(f"✓ Audio input: {audio.source}, {audio.bands} bands")
+    return audio
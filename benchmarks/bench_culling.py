@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк отсечения вне окна ("cull": true): приближенная сцена, где большая
+часть отрезков за краем окна
+
+Запуск: python benchmarks/bench_culling.py [config.json] [--zooms 1 4 16]
+        [--count 5000] [--frames N] [--headless]
+Размеры точек (size) умножаются на zoom; для каждого zoom - кадр без отсечения
+и с ним: видимые отрезки, байт загрузки за кадр и время кадра
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyglet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Viewport culling benchmark")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--zooms', type=float, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--count', type=int, default=5000)
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--headless', action='store_true', help="GL context without a display (EGL)")
+    args = parser.parse_args()
+
+    if args.headless:
+        pyglet.options['headless'] = True
+
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+
+    # Для буферов рендерера нужен GL контекст - создаем скрытое окно
+    window = pyglet.window.Window(visible=False)
+
+    print(f"{'zoom':>6} {'cull':>5} {'lines':>8} {'drawn':>8} {'bytes/frame':>12} {'frame ms':>9}")
+    for zoom in args.zooms:
+        for cull in (False, True):
+            data = ConfigLoader.load_json(args.config)
+            scene = data['parametric_lines']
+            # Ломаные не сжимаются - независимые отрезки в обоих случаях
+            scene.update(count=args.count, cull=cull, topology='lines', period=False)
+            for point in scene.get('points', []):
+                if 'size' in point:
+                    point['size'] = f"({point['size']}) * {zoom}"
+
+            engine = ParametricEngine(window.width, window.height)
+            engine.load_config(data)
+            renderer = engine.current_pattern.renderer
+
+            uploaded = 0
+            start = time.perf_counter()
+            for frame in range(args.frames):
+                engine.update_at(frame / 60)
+                uploaded += renderer.uploaded_bytes
+                engine.draw()
+            pyglet.gl.glFinish()
+            frame_ms = (time.perf_counter() - start) / args.frames * 1000
+
+            drawn = renderer.segment_count if renderer.draw_count is None else renderer.draw_count
+            print(f"{zoom:>6g} {'on' if cull else 'off':>5} {renderer.segment_count:>8} {drawn:>8} "
+                  f"{uploaded // args.frames:>12} {frame_ms:>9.2f}")
+            engine.current_pattern.clear_lines()
+
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк смещенных точек: форма и форма + шум через sum на 100k итераций
+
+Запуск: python benchmarks/bench_displace.py [--counts 10000 100000] [--frames N]
+Кольцо connectToNext из одной точки: circle и sum(circle, noise). Печатает
+время кадра compute_endpoints (граф, пакетные ядра, выборка концов) и
+точек в секунду; бэкенд ядер - как при запуске (LINEDRAWER_KERNELS)
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Бенчмарк не рисует: pyglet.gl не должен создавать скрытое окно при импорте
+    import pyglet
+    pyglet.options['shadow_window'] = False
+except ImportError:
+    pass
+
+from functions import FunctionLibrary
+from functions import kernels
+from patterns import ConnectToNextPattern
+
+CIRCLE = {'func': 'circle', 'size': 300, 'angle': 'n * angle_step + time * 0.2'}
+
+SCENES = {
+    'circle': CIRCLE,
+    'circle+noise': {'func': 'sum', 'functions': [
+        CIRCLE,
+        {'func': 'noise', 'x': 'n * 0.002', 'y': 'time * 0.5', 'amplitude': 30},
+    ]},
+}
+
+
+def frame_ms(point, count: int, frames: int) -> float:
+    """Среднее время кадра (мс) после двух прогревочных"""
+    pattern = ConnectToNextPattern(FunctionLibrary())
+    pattern.set_config({'count': count, 'points': [point]})
+    pattern.set_batch(None)
+    pattern.create_lines()
+    pattern.prepare_render()
+
+    for frame in range(2):
+        pattern.begin_frame(frame / 60)
+        pattern.compute_endpoints(frame / 60)
+    start = time.perf_counter()
+    for frame in range(frames):
+        pattern.begin_frame(frame / 60)
+        pattern.compute_endpoints(frame / 60)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Displaced points benchmark")
+    parser.add_argument('--counts', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--frames', type=int, default=5)
+    args = parser.parse_args()
+
+    results = [(name, count, frame_ms(point, count, args.frames))
+               for count in args.counts for name, point in SCENES.items()]
+
+    print(f"backend: {kernels.BACKEND}")
+    print(f"{'scene':>14} {'count':>8} {'frame ms':>9} {'points/s':>11}")
+    for name, count, ms in results:
+        print(f"{name:>14} {count:>8} {ms:>9.1f} {count / ms * 1000:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пакетных ядер: одна функция на N итераций на каждом бэкенде
+
+Запуск: python benchmarks/bench_kernels.py [--count 100000] [--repeat 5]
+        [--functions circle rose superellipse]
+Время evaluate_batch (без графа) на numba, numpy и python (поточечно),
+ускорение относительно python. Первый вызов numba компилирует ядро -
+он не учитывается. Недоступный бэкенд пропускается с сообщением
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Бенчмарк не рисует: pyglet.gl не должен создавать скрытое окно при импорте
+    import pyglet
+    pyglet.options['shadow_window'] = False
+except ImportError:
+    pass
+
+from functions import FunctionLibrary
+from functions import kernels
+from patterns.base_pattern import BasePattern
+
+# Параметры с выражениями, как в сценах: столбцы контекста и ядро
+PARAMS = {
+    'circle': {'size': 300, 'angle': 'n * angle_step + time'},
+    'rose': {'k': 5, 'size': '200 + 20 * sin(time)', 'angle': 'n * angle_step'},
+    'superellipse': {'a': 200, 'b': 150, 'n': 4, 'angle': 'n * angle_step * 3'},
+}
+
+
+def best_time(evaluate, repeat: int) -> float:
+    """Лучшее время из repeat запусков (мс)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        evaluate()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch kernel benchmark")
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--functions', nargs='+', default=list(PARAMS), choices=list(PARAMS))
+    args = parser.parse_args()
+
+    library = FunctionLibrary()
+    library.active_graph = None
+    contexts = [BasePattern.build_context(n, 0.75, args.count) for n in range(args.count)]
+
+    times = {}
+    for backend in kernels.BACKENDS:
+        if kernels.select_backend(backend) != backend:
+            print(f"⚠ backend {backend}: not installed - skipped")
+            continue
+        for name in args.functions:
+            func = library.get(name)
+            params = PARAMS[name]
+            func.evaluate_batch(params, contexts[:kernels.MIN_BATCH])  # Компиляция numba
+            times[name, backend] = best_time(lambda: func.evaluate_batch(params, contexts), args.repeat)
+    kernels.select_backend(os.environ.get('LINEDRAWER_KERNELS'))
+
+    print(f"{args.count} iterations, best of {args.repeat}")
+    print(f"{'function':>14} {'backend':>8} {'ms':>9} {'vs python':>10}")
+    for name in args.functions:
+        python_ms = times.get((name, 'python'))
+        for backend in kernels.BACKENDS:
+            ms = times.get((name, backend))
+            if ms is None:
+                continue
+            speedup = f"{python_ms / ms:>9.1f}x" if python_ms else f"{'-':>10}"
+            print(f"{name:>14} {backend:>8} {ms:>9.2f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк параллельного вычисления линий
+
+Запуск: python benchmarks/bench_parallel.py [config.json] [--count N] [--frames N]
+        [--chunk-size N] [--headless]
+Печатает время кадра для разного числа потоков и проверяет,
+что результат побитно совпадает с последовательным вычислением по тем же частям
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyglet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel update_lines benchmark")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--count', type=int, default=2000, help="iterations (count) for the scene")
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--headless', action='store_true', help="GL context without a display (EGL)")
+    args = parser.parse_args()
+
+    if args.headless:
+        pyglet.options['headless'] = True
+
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+
+    # Для буферов рендерера нужен GL контекст - создаем скрытое окно
+    window = pyglet.window.Window(visible=False)
+
+    data = ConfigLoader.load_json(args.config)
+    data['parametric_lines']['count'] = args.count
+
+    engine = ParametricEngine(window.width, window.height)
+    engine.load_config(data)
+    pattern = engine.current_pattern
+
+    # Последовательно по тем же частям: потоки не должны менять ни бита
+    reference = pattern.compute_endpoints(1.0, None, args.chunk_size)
+
+    max_workers = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, max_workers} & set(range(1, max_workers + 1)))
+
+    print(f"{'workers':>8} {'ms/frame':>10} {'speedup':>8} {'max diff':>10}")
+    baseline = None
+    for workers in worker_counts:
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        start = time.perf_counter()
+        for frame in range(args.frames):
+            pattern.begin_frame(frame / 60)
+            endpoints = pattern.compute_endpoints(frame / 60, executor, args.chunk_size)
+        elapsed = (time.perf_counter() - start) / args.frames * 1000
+
+        endpoints = pattern.compute_endpoints(1.0, executor, args.chunk_size)
+        difference = max((abs(a - b) for line, expected in zip(endpoints, reference)
+                          for a, b in zip(line, expected)), default=0.0)
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.2f} {baseline / elapsed:>8.2f} {difference:>10.1e}")
+
+        if executor:
+            executor.shutdown()
+
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк изменения размера окна
+
+Запуск: python benchmarks/bench_resize.py [config.json] [--counts 500 2000 8000] [--resizes N]
+Сравнивает update_window_size (смещение в рендерере) с полным пересозданием линий,
+как это было раньше: время на один resize для разного числа линий
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyglet
+
+
+def measure(resize, sizes):
+    """Среднее время одного вызова resize(width, height) в мс"""
+    start = time.perf_counter()
+    for width, height in sizes:
+        resize(width, height)
+    return (time.perf_counter() - start) / len(sizes) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Window resize benchmark")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--counts', type=int, nargs='+', default=[500, 2000, 8000])
+    parser.add_argument('--resizes', type=int, default=50)
+    parser.add_argument('--headless', action='store_true', help="GL context without a display (EGL)")
+    args = parser.parse_args()
+
+    if args.headless:
+        pyglet.options['headless'] = True
+
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+
+    # Для буферов рендерера нужен GL контекст - создаем скрытое окно
+    window = pyglet.window.Window(visible=False)
+
+    # Размеры, как при перетаскивании края окна
+    sizes = [(800 + step, 600 + step // 2) for step in range(args.resizes)]
+
+    print(f"{'lines':>8} {'resize ms':>10} {'rebuild ms':>11} {'speedup':>8}")
+    for count in args.counts:
+        data = ConfigLoader.load_json(args.config)
+        data['parametric_lines']['count'] = count
+
+        engine = ParametricEngine(window.width, window.height)
+        engine.load_config(data)
+        lines = engine.current_pattern.get_line_count()
+
+        resize_ms = measure(engine.update_window_size, sizes)
+
+        def rebuild(width, height):
+            engine.update_window_size(width, height)
+            engine._create_lines(engine.config)
+
+        # Пересоздание дорогое - хватит нескольких размеров
+        rebuild_ms = measure(rebuild, sizes[:5])
+        print(f"{lines:>8} {resize_ms:>10.4f} {rebuild_ms:>11.2f} {rebuild_ms / resize_ms:>8.0f}")
+
+        engine.current_pattern.clear_lines()
+
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
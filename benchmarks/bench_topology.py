@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк топологии буфера: независимые отрезки (GL_LINES) и ломаные (GL_LINE_STRIP)
+
+Запуск: python benchmarks/bench_topology.py [config.json] [--patterns connect connectClosed]
+        [--counts 500 5000] [--frames N] [--headless]
+Для каждого паттерна и count: число вершин, байт загрузки за кадр и время кадра
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyglet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line topology benchmark")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--patterns', nargs='+', default=['connect', 'connectClosed'])
+    parser.add_argument('--counts', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--headless', action='store_true', help="GL context without a display (EGL)")
+    args = parser.parse_args()
+
+    if args.headless:
+        pyglet.options['headless'] = True
+
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+
+    # Для буферов рендерера нужен GL контекст - создаем скрытое окно
+    window = pyglet.window.Window(visible=False)
+
+    print(f"{'pattern':>14} {'count':>7} {'topology':>9} {'vertices':>9} {'bytes/frame':>12} {'frame ms':>9}")
+    for pattern in args.patterns:
+        for count in args.counts:
+            for topology in ('lines', 'strip'):
+                data = ConfigLoader.load_json(args.config)
+                data['parametric_lines'].update(pattern=pattern, count=count, topology=topology)
+
+                engine = ParametricEngine(window.width, window.height)
+                engine.load_config(data)
+                renderer = engine.current_pattern.renderer
+                vertices = getattr(renderer, 'vertex_count', 2 * renderer.segment_count)
+
+                uploaded = 0
+                start = time.perf_counter()
+                for frame in range(args.frames):
+                    engine.update_at(frame / 60)
+                    uploaded += renderer.uploaded_bytes
+                    engine.draw()
+                pyglet.gl.glFinish()
+                frame_ms = (time.perf_counter() - start) / args.frames * 1000
+
+                print(f"{pattern:>14} {count:>7} {topology:>9} {vertices:>9} "
+                      f"{uploaded // args.frames:>12} {frame_ms:>9.2f}")
+                engine.current_pattern.clear_lines()
+
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Проверка концов линий паттернов на совпадение с эталоном без кэшей
+
+Запуск: python benchmarks/check_endpoints.py [--headless]
+(без DISPLAY в Linux --headless включается сам)
+Эталон - поточечный evaluate каждой точки в отдельной библиотеке без графа
+(без общих подвыражений и сохраненных значений). Проверяются:
+- сцены: compute_endpoints (граф, пакетные ядра, адаптивная выборка)
+- set_count: концы после смены count на месте и у паттерна, собранного заново
+- части кадра: compute_endpoints по частям chunk_size последовательно и в
+  потоках - против эталона и побитно друг с другом
+- кэш кадров: кадр ячейки и его повтор через период (float32 и int16)
+- цвета и толщины-выражения: столбцы по контекстам кадра против упаковки по
+  вершинам в новых контекстах
+- адаптивная выборка движущейся формы: отклонение ломаной от кривой в кадрах
+  между моментами выборки
+- set_count в рендерере: кадр после смены count против сцены, загруженной заново
+- отсечение: концы со статическими линиями (целиком и по частям) и кадр в
+  окне против кадра без отсечения
+(две последние - с GL в скрытом окне; без контекста пропускаются)
+Печатает максимальные расхождения и завершается с кодом 1, если они больше допуска
+"""
+import argparse
+import copy
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Без дисплея (CI) - EGL: иначе окно для проверки отсечения не создается
+    import pyglet
+    if '--headless' in sys.argv or (sys.platform.startswith('linux') and not os.environ.get('DISPLAY')):
+        pyglet.options['headless'] = True
+    # Скрытое окно при импорте pyglet.gl не нужно - GL создается только для отсечения
+    pyglet.options['shadow_window'] = False
+except ImportError:
+    pyglet = None
+
+from functions import FunctionLibrary
+from patterns import ConnectPattern, ConnectAllPattern, ConnectToNextPattern, ConnectClosedPattern
+from periodic import CachedFrame, FrameCache, QUANT_STEP, pack_endpoints
+
+# Допуск в пикселях: пакетные ядра и math могут расходиться в последнем бите
+TOLERANCE = 1e-6
+# Кадр кэша хранится в float32: относительная точность ~6e-8 от координаты
+FLOAT32_TOLERANCE = 1e-3
+
+PATTERNS = {
+    'connect': ConnectPattern,
+    'connectAll': ConnectAllPattern,
+    'connectToNext': ConnectToNextPattern,
+    'connectClosed': ConnectClosedPattern,
+}
+
+# Сцены, на которых кэши графа, выборка и связность могут разойтись с эталоном
+SCENES = {
+    # (n+dn) при адаптивной выборке: dn у каждой итерации свой, а выборка
+    # сначала считает точки с dn=1
+    'adaptive_dn': {
+        'pattern': 'connect', 'count': 360, 'sampling': 'adaptive', 'tolerance': 0.5,
+        'points': [
+            {'func': 'rose', 'k': 5, 'size': 250, 'angle': 'n * angle_step'},
+            {'func': 'rose', 'k': 5, 'size': 250, 'angle': '(n + dn) * angle_step'},
+        ],
+    },
+    'adaptive_dn_nested': {
+        'pattern': 'connect', 'count': 120, 'sampling': 'adaptive',
+        'points': [
+            {'func': 'directed_line', 'from': {'func': 'fixed', 'x': 0, 'y': 0},
+             'to': {'func': 'circle', 'size': 200, 'angle': '(n + dn / 2) * angle_step'}},
+            {'func': 'circle', 'size': 200, 'angle': '(n + dn) * angle_step'},
+        ],
+    },
+    # Статические точки (в том числе от count) рядом с точками от time
+    'mixed_static': {
+        'pattern': 'connect', 'count': 48,
+        'points': [
+            {'func': 'circle', 'size': 150, 'angle': 'n * angle_step'},
+            {'func': 'circle', 'size': 'count * 4', 'angle': 'n * angle_step * 3'},
+            {'func': 'ellipse', 'a': 380, 'b': 120, 'angle': 'n * angle_step + time'},
+        ],
+    },
+    'closed_shared': {
+        'pattern': 'connectClosed', 'count': 30,
+        'points': [
+            {'func': 'directed_line', 'from': {'func': 'fixed', 'x': 0, 'y': 0},
+             'to': {'func': 'circle', 'size': 220, 'angle': 'n * angle_step - time * 0.5'}},
+            {'func': 'square', 'size': 140, 'angle': 'n * angle_step * 2'},
+        ],
+    },
+    'all_pairs': {
+        'pattern': 'connectAll', 'count': 10,
+        'points': [
+            {'func': 'lissajous', 'a': 250, 'b': 200, 'A': 3, 'B': 2, 'delta': 'time', 'angle': 'n * angle_step'},
+            {'func': 'cardioid', 'size': 60, 'angle': 'n * angle_step'},
+        ],
+    },
+    'to_next': {
+        'pattern': 'connectToNext', 'count': 40,
+        'points': [
+            {'func': 'circle', 'size': '120 + 30 * sin(time + n)', 'angle': 'n * angle_step'},
+            {'func': 'hypocycloid', 'R': 200, 'r': 60, 'angle': 'n * angle_step * 4'},
+        ],
+    },
+    # Пакеты узлов графа массивами: sum, общий узел в двух точках, morph и blend
+    # по подмножествам строк, статический узел в следующих кадрах
+    'displaced': {
+        'pattern': 'connect', 'count': 64,
+        'points': [
+            {'func': 'sum', 'functions': [
+                {'func': 'circle', 'size': 200, 'angle': 'n * angle_step'},
+                {'func': 'noise', 'x': 'n * 0.05', 'y': 'time', 'amplitude': 25},
+            ]},
+            {'func': 'morph', 't': '(n % 9) / 8', 'functions': [
+                {'func': 'circle', 'size': 200, 'angle': 'n * angle_step'},
+                {'func': 'square', 'size': 120, 'angle': 'n * angle_step + time'},
+                {'func': 'noise', 'x': 'n * 0.05', 'y': 'time', 'amplitude': 25},
+            ]},
+            {'func': 'blend', 'weights': ['n % 2', 1], 'functions': [
+                {'func': 'rose', 'k': 3, 'size': 150, 'angle': 'n * angle_step'},
+                {'func': 'fixed', 'x': 'time * 10', 'y': 5},
+            ]},
+        ],
+    },
+    # Концы дальше +-4096 пикселей: в int16 кэша кадров не помещаются
+    'far': {
+        'pattern': 'connect', 'count': 24,
+        'points': [
+            {'func': 'circle', 'size': 5000, 'angle': 'n * angle_step + time'},
+            {'func': 'circle', 'size': 150, 'angle': 'n * angle_step'},
+        ],
+    },
+}
+
+# Части кадра: меньше MIN_BATCH (части считаются по точкам) и больше
+CHUNK_SIZES = (7, 40)
+CHUNK_WORKERS = 4
+
+# set_count: новые count для сцен с равномерной выборкой
+COUNT_CHANGES = (57, 13, 48)
+
+# Кэш кадров: сцены с периодом 2pi по time, сетка и моменты проверки
+CACHE_SCENES = ('mixed_static', 'all_pairs', 'far')
+CACHE_PERIOD = 2 * math.pi
+CACHE_FPS = 30
+CACHE_TIMES = (0.0, 0.51, 1.7, 4.02)
+
+# Отсечение: сцена частично за окном, статические линии рядом с линиями от time
+CULL_SCENE = {
+    'pattern': 'connect', 'count': 40, 'topology': 'lines', 'cull': True,
+    'points': [
+        {'func': 'circle', 'size': 520, 'angle': 'n * angle_step'},
+        {'func': 'circle', 'size': 420, 'angle': '(n + 0.5) * angle_step'},
+        {'func': 'ellipse', 'a': 330, 'b': 60, 'angle': 'n * angle_step * 2 + time'},
+    ],
+}
+CULL_TIMES = (0.0, 0.8, 2.3)
+
+# Цвета и толщины: выражения от n, time и point_index, ошибка и nan в строках
+STYLE_SCENES = {
+    'chain': {
+        'pattern': 'connect', 'count': 90, 'width': '1 + (n % 3) + point_index',
+        'color': ['128 + 127 * sin(n * 0.1 + time)', 200, 'point_index * 100'], 'alpha': 'n * 3',
+        'points': [
+            {'func': 'circle', 'size': 250, 'angle': 'n * angle_step + time'},
+            {'func': 'circle', 'size': 150, 'angle': 'n * angle_step * 3',
+             'color': [300, 'sqrt(n - 40) * 20', '-5'], 'alpha': 'log(n)'},
+        ],
+    },
+    'adaptive': {
+        'pattern': 'connectToNext', 'count': 120, 'sampling': 'adaptive', 'tolerance': 0.5,
+        'width': 'sqrt(30 - n) + time', 'color': [255, '2 * n', 0],
+        'points': [{'func': 'rose', 'k': 3, 'size': 250, 'angle': 'n * angle_step'}],
+    },
+}
+STYLE_TIMES = (0.0, 1.3)
+
+# Выступ бежит по кругу со временем: выборка по одному кадру его теряет
+MOTION_SCENE = {
+    'pattern': 'connectToNext', 'count': 240, 'sampling': 'adaptive', 'tolerance': 0.5,
+    'points': [{'func': 'circle', 'angle': 'n * angle_step',
+                'size': '200 + 60 * exp(-((n - 120 - 90 * sin(time)) ** 2) / 30)'}],
+}
+MOTION_TIMES = (0.0, 0.7, 1.6, 2.5, 3.9, 5.1)
+# Середина хорды - оценка снизу, между моментами выборки допускается запас
+MOTION_LIMIT = 6 * MOTION_SCENE['tolerance']
+MOTION_STEPS = 8
+
+
+def pattern_for(config):
+    """Паттерн сцены без окна и батча"""
+    pattern = PATTERNS[config['pattern']](FunctionLibrary())
+    pattern.set_config(copy.deepcopy(config))
+    pattern.set_batch(None)
+    pattern.create_lines()
+    pattern.prepare_render()
+    return pattern
+
+
+def reference_endpoints(pattern, library, current_time: float):
+    """Концы линий поточечно, без графа и пакетных ядер (library - без active_graph)"""
+    points = pattern.config.get('points', [])
+    connectivity = pattern.connectivity
+
+    def point(iteration, index):
+        context = pattern._create_context(pattern._iterations[iteration], current_time)
+        config = points[index]
+        return library.get(config.get('func', 'circle')).evaluate(config, context)[:2]
+
+    endpoints = []
+    for iteration_a, point_a, iteration_b, point_b in zip(
+            connectivity.iteration_a, connectivity.point_a,
+            connectivity.iteration_b, connectivity.point_b):
+        endpoints.append((*point(iteration_a, point_a), *point(iteration_b, point_b)))
+    return endpoints
+
+
+def reference_library():
+    library = FunctionLibrary()
+    library.active_graph = None
+    return library
+
+
+def max_error(endpoints, reference):
+    if len(endpoints) != len(reference):
+        return float('inf')
+    return max((abs(a - b) for line, expected in zip(endpoints, reference)
+                for a, b in zip(line, expected)), default=0.0)
+
+
+def frame_endpoints(pattern, current_time: float):
+    """Концы кадра так, как их считает движок: новый кадр скалярных функций и вычисление"""
+    pattern.begin_frame(current_time)
+    return pattern.compute_endpoints(current_time)
+
+
+def check_scene(config, times=(0.0, 0.5, 1.25)):
+    """Максимальное расхождение compute_endpoints с эталоном по нескольким кадрам"""
+    pattern = pattern_for(config)
+    library = reference_library()
+    error = 0.0
+    for current_time in times:
+        error = max(error, max_error(frame_endpoints(pattern, current_time),
+                                     reference_endpoints(pattern, library, current_time)))
+    return error
+
+
+def check_chunks(pattern, executor, current_time: float, chunk_sizes=CHUNK_SIZES):
+    """
+    Кадр по частям без потоков и в потоках
+    Возвращает (расхождение с эталоном, число несовпавших линий между ними)
+    """
+    reference = reference_endpoints(pattern, reference_library(), current_time)
+    error, different = 0.0, 0
+    for chunk_size in chunk_sizes:
+        pattern.begin_frame(current_time)
+        serial = pattern.compute_endpoints(current_time, None, chunk_size)
+        parallel = pattern.compute_endpoints(current_time, executor, chunk_size)
+        error = max(error, max_error(serial, reference))
+        different += sum(a != b for a, b in zip(serial, parallel)) + abs(len(serial) - len(parallel))
+    return error, different
+
+
+def check_set_count(config, counts=COUNT_CHANGES, current_time=0.75):
+    """
+    Смена count на месте против эталона и против паттерна, собранного заново
+    Возвращает максимальное расхождение (inf - связность не совпала)
+    """
+    pattern = pattern_for(config)
+    library = reference_library()
+    frame_endpoints(pattern, current_time)
+    error = 0.0
+    for count in counts:
+        if not pattern.set_count(count):
+            return float('inf')
+        fresh = pattern_for(dict(config, count=count))
+        if list(pattern.connectivity.lines()) != list(fresh.connectivity.lines()):
+            return float('inf')
+        endpoints = frame_endpoints(pattern, current_time)
+        error = max(error, max_error(endpoints, reference_endpoints(pattern, library, current_time)),
+                    max_error(endpoints, frame_endpoints(fresh, current_time)))
+    return error
+
+
+def check_adaptive_motion(config=MOTION_SCENE, times=MOTION_TIMES):
+    """
+    Наибольшее отклонение ломаной адаптивной выборки от кривой (px) по кадрам:
+    промежуточные n между соседними выборками против интерполяции по хорде
+    """
+    pattern = pattern_for(config)
+    samples = pattern._iterations
+    error = 0.0
+    for current_time in times:
+        def point(n):
+            return pattern._calculate_points_for_iteration(n, current_time)[0]
+        for a, b in zip(samples, samples[1:]):
+            (ax, ay), (bx, by) = point(a), point(b)
+            for step in range(1, MOTION_STEPS):
+                f = step / MOTION_STEPS
+                x, y = point(a + (b - a) * f)
+                error = max(error, math.hypot(x - ax - (bx - ax) * f, y - ay - (by - ay) * f))
+    return error, len(samples)
+
+
+def check_styles(config, times=STYLE_TIMES):
+    """
+    Цвета и толщины кадра против упаковки по вершинам в новых контекстах
+    Возвращает (байт цвета не совпало, максимальное расхождение толщин)
+    """
+    pattern = pattern_for(config)
+    different, error = 0, 0.0
+    for current_time in times:
+        frame_endpoints(pattern, current_time)
+        contexts = {n: pattern._create_context(n, current_time) for n in pattern._iterations}
+        colors = pattern.compute_colors(current_time)
+        expected = pattern.colors.pack(pattern._vertices, contexts)
+        different += different_bytes(colors.tobytes(), expected.tobytes())
+        widths = pattern.compute_widths(current_time)
+        expected = pattern.widths.pack(pattern._vertices, contexts)
+        error = max(error, max_error([widths], [expected]))
+    return different, error
+
+
+def check_frame_cache(config, frame_bytes: int):
+    """
+    Кэш кадров: кадр ячейки против эталона в момент ячейки и повтор через период
+    (повтор обязан быть попаданием). frame_bytes - бюджет на кадр на линию:
+    16 - помещается float32, 12 - только int16 (или float32 реже, если концы
+    не помещаются в int16 - это решает первый кадр)
+    Возвращает (хранение, расхождение с эталоном ячейки, допуск, отставание от точного кадра)
+    """
+    pattern = pattern_for(config)
+    library = reference_library()
+    evaluate = lambda t: CachedFrame(pack_endpoints(frame_endpoints(pattern, t)))
+    lines = pattern.get_line_count()
+    slots = round(CACHE_PERIOD * CACHE_FPS)
+    cache = FrameCache(CACHE_PERIOD, lines, 0, CACHE_FPS, slots * frame_bytes * lines)
+    cache.get(CACHE_TIMES[0], evaluate)
+    tolerance = QUANT_STEP / 2 + FLOAT32_TOLERANCE if cache.storage == 'int16' else FLOAT32_TOLERANCE
+
+    error = 0.0
+    lag = 0.0
+    for current_time in CACHE_TIMES:
+        first, slot_time = cache.get(current_time, evaluate)
+        hits = cache.hits
+        replay, replay_slot = cache.get(current_time + CACHE_PERIOD, evaluate)
+        if replay_slot != slot_time or cache.hits != hits + 1:
+            return cache.storage, float('inf'), tolerance, lag
+        expected = pack_endpoints(reference_endpoints(pattern, library, slot_time))
+        error = max(error,
+                    max((abs(a - b) for a, b in zip(first.positions, expected)), default=0.0),
+                    max((abs(a - b) for a, b in zip(replay.positions, expected)), default=0.0))
+        # Кэш отдает кадр ячейки, а не момента: отставание - цена кэша (не ошибка)
+        exact = pack_endpoints(reference_endpoints(pattern, library, current_time))
+        lag = max(lag, max((abs(a - b) for a, b in zip(first.positions, exact)), default=0.0))
+    return cache.storage, error, tolerance, lag
+
+
+def open_window():
+    """Скрытое окно для проверок с рендерером; None - GL недоступен"""
+    if pyglet is None:
+        return None
+    try:
+        return pyglet.window.Window(400, 300, visible=False)
+    except Exception as e:
+        print(f"\n⚠ GL checks skipped: no GL context ({type(e).__name__})")
+        return None
+
+
+def load_engine(window, config):
+    from engine import ParametricEngine
+
+    engine = ParametricEngine(window.width, window.height)
+    engine.load_config({'parametric_lines': copy.deepcopy(config)})
+    return engine
+
+
+def render(window, engine, current_time: float) -> bytes:
+    """Кадр движка на момент current_time, RGB окна"""
+    engine.update_at(current_time)
+    window.switch_to()
+    pyglet.gl.glClearColor(0, 0, 0, 1)
+    window.clear()
+    engine.draw()
+    image = pyglet.image.get_buffer_manager().get_color_buffer().get_image_data()
+    return image.get_data('RGB', window.width * 3)
+
+
+def different_bytes(a: bytes, b: bytes) -> int:
+    return sum(x != y for x, y in zip(a, b)) + abs(len(a) - len(b))
+
+
+def check_culling(window, executor, config=CULL_SCENE, times=CULL_TIMES):
+    """
+    Отсечение: концы (статические запомнены; целиком и по частям) против
+    эталона и кадр в окне против того же кадра без отсечения
+    Возвращает (расхождение концов, несовпадающих байт, видимых линий, всего линий)
+    """
+    library = reference_library()
+    error = 0.0
+    different = 0
+    visible = lines = 0
+    for current_time in times:
+        engine = load_engine(window, config)
+        pattern = engine.current_pattern
+        culled = render(window, engine, current_time)
+        if pattern.culling is None:
+            return float('inf'), 0, 0, 0
+        endpoints = pattern.compute_endpoints(current_time)
+        error = max(error, max_error(endpoints, reference_endpoints(pattern, library, current_time)))
+        chunk_error, chunk_different = check_chunks(pattern, executor, current_time)
+        error = max(error, chunk_error if not chunk_different else float('inf'))
+        visible, lines = len(pattern.culling.visible), pattern.get_line_count()
+        pattern.clear_lines()
+
+        engine = load_engine(window, dict(config, cull=False))
+        different += different_bytes(culled, render(window, engine, current_time))
+        engine.current_pattern.clear_lines()
+    return error, different, visible, lines
+
+
+def check_set_count_frames(window, config, counts=COUNT_CHANGES, current_time=0.75) -> int:
+    """
+    set_count в рендерере: кадр после смены count на месте против кадра сцены,
+    загруженной сразу с этим count (буферы дописываются, а не пересоздаются)
+    Возвращает число несовпадающих байт
+    """
+    engine = load_engine(window, config)
+    render(window, engine, current_time)
+    different = 0
+    for count in counts:
+        engine.set_count(count)
+        fresh = load_engine(window, dict(config, count=count))
+        different += different_bytes(render(window, engine, current_time),
+                                     render(window, fresh, current_time))
+        fresh.current_pattern.clear_lines()
+    engine.current_pattern.clear_lines()
+    return different
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pattern endpoints vs uncached reference")
+    parser.add_argument('--headless', action='store_true', help="GL context without a display (EGL)")
+    parser.parse_args()
+
+    failed = 0
+
+    print(f"{'scene':>24} {'max error px':>14} {'ok':>4}")
+    for name, config in SCENES.items():
+        error = check_scene(config)
+        ok = error <= TOLERANCE
+        failed += not ok
+        print(f"{name:>24} {error:>14.3g} {'yes' if ok else 'NO':>4}")
+
+    print(f"\n{'set_count':>24} {'max error px':>14} {'ok':>4}")
+    for name, config in SCENES.items():
+        if config.get('sampling') == 'adaptive':
+            continue  # Адаптивная выборка пересоздает паттерн целиком
+        error = check_set_count(config)
+        ok = error <= TOLERANCE
+        failed += not ok
+        print(f"{name:>24} {error:>14.3g} {'yes' if ok else 'NO':>4}")
+
+    executor = ThreadPoolExecutor(max_workers=CHUNK_WORKERS)
+    print(f"\n{'chunks':>24} {'max error px':>14} {'lines differ':>13} {'ok':>4}")
+    for name, config in SCENES.items():
+        error, different = check_chunks(pattern_for(config), executor, 0.75)
+        ok = error <= TOLERANCE and not different
+        failed += not ok
+        print(f"{name:>24} {error:>14.3g} {different:>13} {'yes' if ok else 'NO':>4}")
+
+    print(f"\n{'frame cache':>24} {'storage':>8} {'max error px':>14} {'lag px':>8} {'ok':>4}")
+    for name in CACHE_SCENES:
+        for frame_bytes in (16, 12):
+            storage, error, tolerance, lag = check_frame_cache(SCENES[name], frame_bytes)
+            ok = error <= tolerance
+            failed += not ok
+            print(f"{name:>24} {storage:>8} {error:>14.3g} {lag:>8.2f} {'yes' if ok else 'NO':>4}")
+
+    print(f"\n{'styles':>24} {'colors differ':>14} {'width error':>12} {'ok':>4}")
+    for name, config in STYLE_SCENES.items():
+        different, error = check_styles(config)
+        ok = not different and error <= TOLERANCE
+        failed += not ok
+        print(f"{name:>24} {different:>14} {error:>12.3g} {'yes' if ok else 'NO':>4}")
+
+    error, samples = check_adaptive_motion()
+    ok = error <= MOTION_LIMIT
+    failed += not ok
+    print(f"\nadaptive sampling of a moving shape: {samples} samples, "
+          f"max deviation {error:.3g} px (limit {MOTION_LIMIT:g}) {'yes' if ok else 'NO'}")
+
+    window = open_window()
+    if window is not None:
+        print(f"\n{'set_count frame':>24} {'bytes differ':>14} {'ok':>4}")
+        for name, config in SCENES.items():
+            if config.get('sampling') == 'adaptive':
+                continue
+            different = check_set_count_frames(window, config)
+            failed += bool(different)
+            print(f"{name:>24} {different:>14} {'NO' if different else 'yes':>4}")
+
+        error, different, visible, lines = check_culling(window, executor)
+        ok = error <= TOLERANCE and not different
+        failed += not ok
+        print(f"\nculling: {visible} of {lines} lines visible, endpoints max error {error:.3g} px, "
+              f"{different} bytes differ from the frame without culling {'yes' if ok else 'NO'}")
+        window.close()
+    executor.shutdown()
+
+    if failed:
+        print(f"⚠ {failed} check(s) differ from the reference")
+        sys.exit(1)
+    print("✓ All checks match the reference")
+
+
+if __name__ == "__main__":
+    main()
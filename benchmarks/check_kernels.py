@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Проверка пакетных ядер функций на совпадение с эталоном (evaluate)
+
+Запуск: python benchmarks/check_kernels.py [--backend numba|numpy|python] [--count N]
+Для каждой функции с ядром сравнивает evaluate_batch с поточечным evaluate
+на числовых параметрах, выражениях и краевых случаях, печатает время
+и завершается с кодом 1, если расхождение больше допуска
+Без --backend проверяются все бэкенды по очереди; недоступный (numba или
+numpy не установлены) пропускается с сообщением, а не подменяется другим
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Проверка не рисует: pyglet.gl не должен создавать скрытое окно при импорте (CI без дисплея)
+    import pyglet
+    pyglet.options['shadow_window'] = False
+except ImportError:
+    pass
+
+from functions import FunctionLibrary
+from functions import kernels
+from patterns.base_pattern import BasePattern
+
+# Относительный допуск: numpy/numba и math могут расходиться в последнем бите
+TOLERANCE = 1e-9
+
+# Параметры для проверки: обычные, выражения и краевые значения
+CASES = {
+    'circle': [{'size': 120, 'angle': 'n * angle_step + time'}],
+    'square': [{'size': 90, 'angle': 'n * angle_step * 3 - 2'}],
+    'ngon': [
+        {'size': 140, 'angle': 'n * angle_step', 'sides': 5},
+        {'size': 100, 'angle': 'n * angle_step - time', 'sides': '2 + n % 7 + (n % 3) * 0.25'},
+        {'size': 100, 'angle': 'n * angle_step', 'sides': 'n % 5 - 1.5'},
+    ],
+    'fixed': [{'x': 'cos(n)', 'y': 3}],
+    'ellipse': [{'a': 200, 'b': '50 + n', 'angle': 'n * angle_step'}],
+    'superellipse': [
+        {'a': 100, 'b': 80, 'n': '0.5 + n % 6', 'angle': 'n * angle_step'},
+        {'a': 'n % 3', 'b': 80, 'n': 4, 'angle': 'n * angle_step * 7'},
+        {'a': 100, 'b': 80, 'n': '-(n % 3)', 'angle': 'n * pi / 2'},
+    ],
+    'hypocycloid': [{'R': 100, 'r': '(n % 4) * 10', 'angle': 'n * angle_step * 4'}],
+    'epicycloid': [{'R': 100, 'r': 30, 'angle': 'n * angle_step * 4'}],
+    'lissajous': [{'a': 200, 'b': 150, 'A': 3, 'B': 2, 'delta': 'time', 'angle': 'n * angle_step'}],
+    'butterfly': [{'size': 40, 'angle': 'n * angle_step * 12'}],
+    'cardioid': [{'size': 80, 'angle': 'n * angle_step'}],
+    'rose': [{'k': '(n % 4) * 0.5', 'size': 120, 'angle': 'n * angle_step'}],
+}
+
+# Выражения с ошибками и условиями - должны вести себя как эталон
+ERROR_CASES = [
+    ('circle', {'size': '100 / (n % 4)', 'angle': 'sqrt(n - 10)'}),
+    ('circle', {'size': '100 if n % 2 else 50', 'angle': 'log(n + 1, 2)'}),
+]
+
+
+def close(a, b):
+    return all(math.isclose(x, y, rel_tol=TOLERANCE, abs_tol=TOLERANCE) for x, y in zip(a, b))
+
+
+def run(evaluate):
+    """Результат и время; исключение - тоже результат (его ловит FunctionLibrary)"""
+    start = time.perf_counter()
+    try:
+        result = evaluate()
+    except Exception as e:
+        result = type(e).__name__
+    return result, time.perf_counter() - start
+
+
+def check(func, params, contexts):
+    """Сравнивает пакет с эталоном: (строки с расхождением, пакет, эталон, время, время)"""
+    batch, batch_time = run(lambda: func.evaluate_batch(params, contexts))
+    reference, reference_time = run(lambda: [func.evaluate(params, context) for context in contexts])
+
+    if isinstance(batch, str) or isinstance(reference, str):
+        mismatches = [] if batch == reference else [0]
+        return mismatches, [batch], [reference], batch_time, reference_time
+
+    mismatches = [row for row, (a, b) in enumerate(zip(batch, reference)) if not close(a, b)]
+    return mismatches, batch, reference, batch_time, reference_time
+
+
+def check_backend(backend: str, count: int) -> int:
+    """Все случаи на бэкенде backend; возвращает число расхождений"""
+    library = FunctionLibrary()
+    library.active_graph = None
+    contexts = [BasePattern.build_context(n, 0.75, count) for n in range(count)]
+
+    print(f"\nbackend: {backend}")
+    print(f"{'function':>14} {'batch ms':>10} {'ref ms':>10} {'speedup':>8} {'ok':>4}")
+
+    failed = 0
+    cases = [(name, params) for name, variants in CASES.items() for params in variants]
+    for name, params in cases + ERROR_CASES:
+        func = library.get(name)
+        # Первый вызов numba компилирует ядро - не учитываем его во времени
+        run(lambda: func.evaluate_batch(params, contexts[:kernels.MIN_BATCH]))
+
+        mismatches, batch, reference, batch_time, reference_time = check(func, params, contexts)
+        ok = not mismatches
+        failed += not ok
+        print(f"{name:>14} {batch_time * 1000:>10.2f} {reference_time * 1000:>10.2f} "
+              f"{reference_time / batch_time:>8.1f} {'yes' if ok else 'NO':>4}")
+        for row in mismatches[:3]:
+            print(f"    n={row}: batch {batch[row]} != reference {reference[row]}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kernel parity check")
+    parser.add_argument('--backend', choices=kernels.BACKENDS, default=None,
+                        help="one backend (default: every backend in turn)")
+    parser.add_argument('--count', type=int, default=5000)
+    args = parser.parse_args()
+
+    failed = 0
+    for backend in [args.backend] if args.backend else kernels.BACKENDS:
+        selected = kernels.select_backend(backend)
+        if selected != backend:
+            # Без numba/numpy выбирается следующий бэкенд - его проверка ниже
+            print(f"\n⚠ backend {backend}: not installed - skipped")
+            continue
+        failed += check_backend(backend, args.count)
+    kernels.select_backend(os.environ.get('LINEDRAWER_KERNELS'))
+
+    if failed:
+        print(f"⚠ {failed} case(s) differ from the reference")
+        sys.exit(1)
+    print("✓ All kernels match the reference")
+
+
+if __name__ == "__main__":
+    main()
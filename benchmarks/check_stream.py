@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Проверка трансляции по петле (127.0.0.1): сервер потока и несколько клиентов в одном процессе
+
+Запуск: python benchmarks/check_stream.py [config.json] [--count N] [--seconds S] [--fps F]
+Клиенты: по одному на каждую кодировку и медленный delta клиент (читает
+раз в --slow-delay секунд, маленький приемный буфер). Каждый принятый кадр
+декодируется и сравнивается с концами, которые посчитал сервер:
+- float32 - точно, int16/delta - с ошибкой не больше половины шага квантования
+- быстрые клиенты получают почти все кадры, медленный - пропускает (backpressure)
+- кадр дальше +-4096 px от центра int16 и delta клиенты получают как float32
+- заявленное клиентом сообщение больше лимита закрывает соединение с кодом 1009
+Печатает байт на кадр по кодировкам. Код выхода 1 при расхождении
+"""
+import argparse
+import asyncio
+import os
+import struct
+import sys
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Доля тиков, которую должен получить быстрый клиент
+MIN_FAST_SHARE = 0.8
+
+
+class _Recorder:
+    """Вывод сцены, который запоминает концы каждого кадра по номеру кадра потока"""
+
+    def __init__(self, stream_sink):
+        self.stream_sink = stream_sink
+        self.history = {}
+
+    def attach(self, server):
+        pass
+
+    def present(self, frame):
+        # Вызывается до StreamSink: клиент не получит кадр раньше, чем он записан
+        self.history[self.stream_sink.sequence + 1] = frame.positions
+
+
+async def _client(name: str, port: int, encoding: str, seconds: float, history, delay: float = 0.0,
+                  receive_buffer: int = 0):
+    from stream_server import StreamClient, QUANT_STEP
+
+    client = await StreamClient.connect('127.0.0.1', port, encoding, receive_buffer)
+    tolerance = 0.0 if encoding == 'float32' else QUANT_STEP / 2 + 1e-4
+    stats = {'name': name, 'encoding': encoding, 'frames': 0, 'bytes': 0, 'max_error': 0.0,
+             'gaps': 0, 'kinds': {}, 'ok': True}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    last = None
+    while loop.time() < deadline:
+        try:
+            data = await asyncio.wait_for(client.receive(), max(0.01, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            break
+        header, endpoints = client.decoder.decode(data)
+        sequence = header['sequence']
+        expected = history[sequence]
+        error = max((abs(value - expected[index])
+                     for index, value in enumerate(v for line in endpoints for v in line)), default=0.0)
+        stats['max_error'] = max(stats['max_error'], error)
+        if error > tolerance or len(endpoints) * 4 != len(expected):
+            stats['ok'] = False
+        if last is not None:
+            stats['gaps'] += sequence - last - 1
+        last = sequence
+        stats['frames'] += 1
+        stats['bytes'] += len(data)
+        stats['kinds'][header['kind']] = stats['kinds'].get(header['kind'], 0) + 1
+        if delay:
+            await asyncio.sleep(delay)
+    await client.close()
+    return stats
+
+
+def check_out_of_range() -> bool:
+    """Кадр вне диапазона int16 между обычными: без обрезки у int16 и delta клиентов"""
+    from stream_server import (StreamFrame, StreamDecoder, StreamSink, _Subscriber,
+                               KIND_FLOAT32, QUANT_STEP)
+
+    near = array('f', [10.0, 20.0, 30.0, 40.0])
+    far = array('f', [5000.5, -7000.25, 12.0, 3.0])
+    sink = StreamSink()
+    ok = True
+    for encoding in ('int16', 'delta'):
+        subscriber = _Subscriber(None, encoding, 'check')
+        decoder = StreamDecoder()
+        for sequence, positions in enumerate((near, far, near), 1):
+            frame = StreamFrame(sequence, 1, 0.0, 1, (0.0, 0.0), positions, array('B', [255]) * 8, 1)
+            header, endpoints = decoder.decode(sink._encode_for(subscriber, frame))
+            error = max(abs(value - expected) for value, expected in zip(endpoints[0], positions))
+            ok = ok and error <= QUANT_STEP / 2
+            ok = ok and (positions is not far or header['kind'] == KIND_FLOAT32)
+    return ok
+
+
+async def _oversized_message(port: int):
+    """Клиент заявляет сообщение 2^40 байт: код закрытия от сервера (None - не закрыл)"""
+    from stream_server import StreamClient, ws_read_message, OP_BINARY, OP_CLOSE
+
+    client = await StreamClient.connect('127.0.0.1', port, 'float32')
+    # FIN + binary, маска, длина 127 -> 8 байт длины, ключ маски; данных нет
+    client.writer.write(struct.pack('!BBQ', 0x80 | OP_BINARY, 0x80 | 127, 1 << 40) + os.urandom(4))
+    try:
+        while True:
+            opcode, payload = await asyncio.wait_for(ws_read_message(client.reader), 5.0)
+            if opcode == OP_CLOSE:
+                return struct.unpack('!H', payload[:2])[0]
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        return None
+    finally:
+        client.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loopback check of the WebSocket stream")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--count', type=int, default=500, help="iterations (more lines - bigger frames)")
+    parser.add_argument('--seconds', type=float, default=4.0)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--slow-delay', type=float, default=0.1)
+    args = parser.parse_args()
+
+    try:
+        # Без окна: pyglet.gl не должен создавать скрытое окно при импорте
+        import pyglet
+        pyglet.options['shadow_window'] = False
+    except ImportError:
+        pass
+
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+    from scene_server import SceneServer
+    from stream_server import StreamSink, run_stream, ENCODINGS
+
+    data = ConfigLoader.load_json(args.config)
+    data['parametric_lines']['count'] = args.count
+    engine = ParametricEngine(800, 600, headless=True)
+    engine.load_config(data)
+
+    scene = SceneServer(engine)
+    sink = StreamSink('127.0.0.1', 0)
+    recorder = scene.add_sink(_Recorder(sink))
+    scene.add_sink(sink)
+
+    async def run():
+        await sink.start()
+        ticking = asyncio.ensure_future(run_stream(scene, sink, args.fps, args.seconds + 1.0))
+        clients = [_client(encoding, sink.port, encoding, args.seconds, recorder.history)
+                   for encoding in ENCODINGS]
+        clients.append(_client('slow delta', sink.port, 'delta', args.seconds, recorder.history,
+                               args.slow_delay, receive_buffer=16 * 1024))
+        results = await asyncio.gather(*clients)
+        close_code = await _oversized_message(sink.port)
+        await ticking
+        await sink.close()
+        return results, close_code
+
+    results, close_code = asyncio.run(run())
+    ticks = sink.sequence
+    lines = engine.current_pattern.get_line_count()
+    print(f"{lines} lines, {ticks} ticks in {args.seconds + 1.0:g} s")
+    print(f"{'client':>12} {'frames':>7} {'skipped':>8} {'bytes/frame':>12} {'max error':>10}  kinds")
+
+    ok = True
+    for stats in results:
+        per_frame = stats['bytes'] // max(1, stats['frames'])
+        print(f"{stats['name']:>12} {stats['frames']:>7} {stats['gaps']:>8} {per_frame:>12} "
+              f"{stats['max_error']:>10.4f}  {stats['kinds']}")
+        ok = ok and stats['ok'] and stats['frames'] > 0
+
+    fast = [stats for stats in results if stats['name'] in ENCODINGS]
+    expected_frames = args.seconds * args.fps
+    if any(stats['frames'] < MIN_FAST_SHARE * expected_frames for stats in fast):
+        print("⚠ A fast client missed frames: the slow one held it back")
+        ok = False
+    slow = results[-1]
+    if slow['gaps'] == 0:
+        print("⚠ The slow client skipped no frames: backpressure did not kick in")
+        ok = False
+
+    if not check_out_of_range():
+        print("⚠ A frame outside the int16 range was clipped")
+        ok = False
+    print(f"oversized client message: close code {close_code}")
+    if close_code != 1009:
+        print("⚠ The server did not close with 1009 on an oversized message")
+        ok = False
+
+    if not ok:
+        print("⚠ Stream check failed")
+        sys.exit(1)
+    print("✓ Decoded frames match the server, slow client drops frames without stalling others")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Проверка толстых линий: ThickLineRenderer (GPU) против эталона CpuCanvas
+
+Запуск: python benchmarks/check_thick_lines.py [--segments N] [--big N] [--headless]
+(без DISPLAY в Linux --headless включается сам)
+Случайные отрезки с разной толщиной и цветами концов рисуются обоими путями,
+кадры сравниваются попиксельно (расхождения допустимы только на границах).
+Затем --big отрезков рисуются одним instanced вызовом - печатается время.
+Сервер сцены: кадр паттерна с толщинами-выражениями в WindowSink (GPU)
+против CanvasSink (CPU) того же вида, затем след (trails) за несколько
+тиков в сдвинутом виде - тоже GPU против CPU.
+Код выхода 1, если доля несовпадающих пикселей больше допуска
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyglet
+
+# Пиксель совпадает, если каналы отличаются не больше чем на CHANNEL_TOLERANCE;
+# несовпадений (центр пикселя ровно на границе, округление цвета) - не больше PIXEL_TOLERANCE
+CHANNEL_TOLERANCE = 8
+PIXEL_TOLERANCE = 0.01
+
+# Толстые линии с толщиной от n и point_index - для выводов сервера сцены
+SCENE_CONFIG = {
+    'pattern': 'connect', 'count': 24, 'width': '3 + (n % 4) * 2 + point_index',
+    'color': ['80 + n * 7', 200, 'point_index * 120'],
+    'points': [
+        {'func': 'circle', 'size': 110, 'angle': 'n * angle_step + time'},
+        {'func': 'circle', 'size': 60, 'angle': 'n * angle_step * 2'},
+    ],
+}
+SCENE_TIME = 0.7
+# След: затухание за тик, моменты тиков и сдвинутый вид (масштаб 1)
+TRAIL_FADE = 0.5
+TRAIL_TIMES = (0.7, 0.9, 1.1)
+TRAIL_VIEW = (40, 30)
+
+
+def random_segments(count: int, width: int, height: int, rng: random.Random):
+    """(концы относительно центра, цвета концов RGBA, толщины)"""
+    endpoints = []
+    colors = array('B')
+    widths = array('f')
+    for _ in range(count):
+        x1 = rng.uniform(-width / 2, width / 2)
+        y1 = rng.uniform(-height / 2, height / 2)
+        endpoints.append((x1, y1, x1 + rng.uniform(-150, 150), y1 + rng.uniform(-150, 150)))
+        colors.extend([rng.randrange(256), rng.randrange(256), rng.randrange(256), 255,
+                       rng.randrange(256), rng.randrange(256), rng.randrange(256), 255])
+        widths.append(rng.uniform(1.0, 12.0))
+    return endpoints, colors, widths
+
+
+def read_window(window) -> bytes:
+    """RGB кадра окна, строки сверху вниз (как в CpuCanvas)"""
+    image = pyglet.image.get_buffer_manager().get_color_buffer().get_image_data()
+    return image.get_data('RGB', -window.width * 3)
+
+
+def differing_pixels(a: bytes, b: bytes) -> int:
+    return sum(1 for i in range(0, len(a), 3)
+               if max(abs(a[i + c] - b[i + c]) for c in range(3)) > CHANNEL_TOLERANCE)
+
+
+def check_scene_sinks(window) -> int:
+    """Кадр сервера сцены в окне и на холсте того же размера; возвращает число различных пикселей"""
+    from engine import ParametricEngine
+    from scene_server import SceneServer, WindowSink, CanvasSink
+
+    engine = ParametricEngine(window.width, window.height, headless=True)
+    engine.load_config({'parametric_lines': dict(SCENE_CONFIG)})
+    server = SceneServer(engine)
+    window_sink = server.add_sink(WindowSink(window))
+    canvas_sink = server.add_sink(CanvasSink(window.width, window.height))
+    server.tick(SCENE_TIME)
+    if not window_sink.thick:
+        return window.width * window.height  # Вывод не выбрал толстые линии - весь кадр не тот
+
+    pyglet.gl.glClearColor(0, 0, 0, 1)
+    window_sink.on_draw()
+    gpu = read_window(window)
+    window_sink.renderer.delete()
+    return differing_pixels(gpu, bytes(canvas_sink.canvas.pixels))
+
+
+def check_scene_trails(window):
+    """
+    След сервера сцены: TrailBuffer окна против затухания холста в сдвинутом виде
+    Возвращает (различных пикселей, пикселей, которые след добавил к последнему кадру)
+    """
+    from engine import ParametricEngine
+    from raster import CpuCanvas
+    from scene_server import SceneServer, WindowSink, CanvasSink, Viewport
+
+    engine = ParametricEngine(window.width, window.height, headless=True)
+    engine.load_config({'parametric_lines': dict(SCENE_CONFIG, trails=True, trail_fade=TRAIL_FADE)})
+    server = SceneServer(engine)
+    viewport = Viewport(*TRAIL_VIEW, window.width, window.height)
+    window_sink = server.add_sink(WindowSink(window, viewport))
+    canvas_sink = server.add_sink(CanvasSink(window.width, window.height, viewport))
+
+    pyglet.gl.glClearColor(0, 0, 0, 1)
+    for current_time in TRAIL_TIMES:
+        server.tick(current_time)
+        window_sink.on_draw()
+    window_sink.on_draw()  # Перерисовка без тика не гасит след
+    gpu = read_window(window)
+    cpu = bytes(canvas_sink.canvas.pixels)
+
+    # Последний кадр без следа: след должен что-то к нему добавить
+    last = CpuCanvas(window.width, window.height)
+    canvas_sink.canvas = last
+    server.frame.trail_fade = None
+    canvas_sink.present(server.frame)
+    trail = differing_pixels(cpu, bytes(last.pixels))
+
+    window_sink.trails.delete()
+    window_sink.renderer.delete()
+    window.view = pyglet.math.Mat4()
+    return differing_pixels(gpu, cpu), trail
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thick line renderer vs CPU reference")
+    parser.add_argument('--segments', type=int, default=200)
+    parser.add_argument('--big', type=int, default=500000, help="segments for the single draw call timing")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--headless', action='store_true', help="GL context without a display (EGL)")
+    args = parser.parse_args()
+
+    # Без дисплея (CI) - тоже EGL: иначе создание окна бросает NoSuchDisplayException
+    if args.headless or (sys.platform.startswith('linux') and not os.environ.get('DISPLAY')):
+        pyglet.options['headless'] = True
+
+    from renderer import ThickLineRenderer
+    from raster import CpuCanvas
+
+    window = pyglet.window.Window(400, 300, visible=False)
+    center_x, center_y = window.width / 2, window.height / 2
+    endpoints, colors, widths = random_segments(args.segments, window.width, window.height,
+                                                random.Random(args.seed))
+
+    renderer = ThickLineRenderer()
+    renderer.resize(len(endpoints))
+    renderer.set_offset(center_x, center_y)
+    renderer.upload_positions(endpoints)
+    renderer.upload_colors(colors)
+    renderer.upload_widths(widths)
+
+    window.switch_to()
+    pyglet.gl.glClearColor(0, 0, 0, 1)
+    window.clear()
+    renderer.draw()
+    gpu = read_window(window)
+
+    canvas = CpuCanvas(window.width, window.height)
+    canvas.draw_thick_segments(endpoints, colors, widths, center_x, center_y)
+    cpu = bytes(canvas.pixels)
+
+    pixels = window.width * window.height
+    differing = differing_pixels(gpu, cpu)
+    lit = sum(1 for i in range(0, len(cpu), 3) if cpu[i] or cpu[i + 1] or cpu[i + 2])
+    print(f"{args.segments} segments: {lit} lit pixels, {differing} differ "
+          f"({differing / pixels:.3%} of frame)")
+
+    # Большой кадр: один вызов отрисовки на все отрезки
+    big_endpoints, big_colors, big_widths = random_segments(args.big, window.width, window.height,
+                                                            random.Random(args.seed + 1))
+    start = time.perf_counter()
+    renderer.resize(len(big_endpoints))
+    renderer.upload_positions(big_endpoints)
+    renderer.upload_colors(big_colors)
+    renderer.upload_widths(big_widths)
+    upload_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    window.clear()
+    renderer.draw()
+    pyglet.gl.glFinish()
+    draw_time = time.perf_counter() - start
+    print(f"{args.big} segments: upload {upload_time * 1000:.1f} ms "
+          f"({renderer.uploaded_bytes} bytes), one draw call {draw_time * 1000:.1f} ms")
+
+    renderer.delete()
+
+    scene_differing = check_scene_sinks(window)
+    print(f"scene server: window vs canvas sink {scene_differing} pixels differ "
+          f"({scene_differing / pixels:.3%} of frame)")
+    trail_differing, trail = check_scene_trails(window)
+    print(f"scene server trails: window vs canvas sink {trail_differing} pixels differ "
+          f"({trail_differing / pixels:.3%} of frame), trail adds {trail} pixels")
+    window.close()
+
+    if not trail:
+        print("⚠ Scene server trails: nothing accumulated")
+        sys.exit(1)
+    if max(differing, scene_differing, trail_differing) / pixels > PIXEL_TOLERANCE:
+        print("⚠ GPU output differs from the CPU reference")
+        sys.exit(1)
+    print("✓ Thick lines match the CPU reference")
+
+
+if __name__ == "__main__":
+    main()
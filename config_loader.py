@@ -2,7 +2,8 @@
 Загрузчик конфигурации JSON
 """
 import json
-from typing import Dict, Any
+import os
+from typing import Dict, Any, List, Tuple
 
 class ConfigLoader:
     """Загрузка JSON файлов"""
@@ -17,4 +18,35 @@ class ConfigLoader:
                 return data
         except Exception as e:
             print(f"Error loading JSON: {e}")
-            return {}
\ No newline at end of file
+            return {}
+    
+    @staticmethod
+    def load_scenes(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Все сцены из каталога (*.json по имени) или из файла с несколькими
+        JSON объектами подряд (как ex.txt). Имя сцены - имя файла,
+        для нескольких объектов в файле - 'файл#номер' (с 1)
+        """
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                           if name.endswith('.json'))
+        else:
+            files = [path]
+        
+        scenes = []
+        decoder = json.JSONDecoder()
+        for filepath in files:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                text = f.read()
+            objects = []
+            position = text.find('{')
+            while position != -1:
+                data, position = decoder.raw_decode(text, position)
+                objects.append(data)
+                position = text.find('{', position)
+            
+            name = os.path.splitext(os.path.basename(filepath))[0]
+            for index, data in enumerate(objects, 1):
+                scenes.append((name if len(objects) == 1 else f"{name}#{index}", data))
+        print(f"Loaded {len(scenes)} scenes from {path}")
+        return scenes
@@ -0,0 +1,224 @@
+"""
+Проверка конфигурации parametric_lines при загрузке
+
+Все ошибки находятся один раз (с JSON путями), а движок получает
+исправленный план: неизвестные функции заменены, битые выражения обнулены,
+все выражения заранее скомпилированы
+"""
+import copy
+from typing import Dict, Any, List, Tuple, Callable
+from functions.expressions import (
+    SAFE_FUNCTIONS, NON_EXPRESSION_PARAMS, compile_expression,
+    evaluate_expression, expression_names
+)
+from functions.graph import CHILD_KEYS, STYLE_KEYS
+from patterns.connectivity import iteration_template
+
+
+class ValidationReport:
+    """Результат проверки: ошибки и предупреждения с JSON путями"""
+
+    def __init__(self):
+        self.errors = []    # (путь, сообщение)
+        self.warnings = []  # (путь, сообщение)
+        self.expressions = 0
+
+    def error(self, path: str, message: str):
+        self.errors.append((path, message))
+
+    def warning(self, path: str, message: str):
+        self.warnings.append((path, message))
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def print(self):
+        """Печатает отчет (один раз при загрузке)"""
+        if self.ok and not self.warnings:
+            print(f"✓ Config valid ({self.expressions} expressions compiled)")
+            return
+
+        print(f"⚠ Config validation: {len(self.errors)} errors, {len(self.warnings)} warnings")
+        for path, message in self.errors:
+            print(f"  ✗ {path}: {message}")
+        for path, message in self.warnings:
+            print(f"  ! {path}: {message}")
+
+
+class ConfigValidator:
+    """Проверяет parametric_lines и строит план без ошибок"""
+
+    def __init__(self, function_lib, pattern_names: List[str],
+                 context_factory: Callable[[float, float, int], Dict[str, Any]]):
+        self.function_lib = function_lib
+        self.pattern_names = pattern_names
+        self.context_factory = context_factory
+
+    def validate(self, config: Dict[str, Any],
+                 root: str = '$.parametric_lines') -> Tuple[ValidationReport, Dict[str, Any]]:
+        """Возвращает (отчет, исправленная копия конфигурации)"""
+        report = ValidationReport()
+        plan = copy.deepcopy(config)
+
+        self._check_pattern(plan, report, root)
+        count = plan.get('count', 36)
+
+        # Пробный контекст: n=0, time=0
+        context = self.context_factory(0, 0.0, count)
+        known_names = set(SAFE_FUNCTIONS) | set(context)
+
+        points = plan.get('points', [])
+        if not isinstance(points, list):
+            report.error(f"{root}.points", "expected a list of point configs")
+            plan['points'] = []
+            return report, plan
+
+        if 'connectivity' in plan:
+            try:
+                iteration_template(plan['connectivity'], len(points))
+            except ValueError as e:
+                report.error(f"{root}.connectivity", str(e))
+                plan.pop('connectivity')
+
+        # Цвет и альфа могут зависеть еще и от point_index
+        style_names = known_names | {'point_index'}
+        style_context = dict(context, point_index=0)
+        for key in STYLE_KEYS:
+            if isinstance(plan.get(key), (list, str, int, float)):
+                self._check_style(plan, key, f"{root}.{key}", style_names, style_context, report)
+        if isinstance(plan.get('width'), str):
+            width = self._check_param(plan['width'], f"{root}.width", style_names, style_context, report)
+            if width == 0:
+                plan.pop('width')
+
+        for index, point in enumerate(points):
+            path = f"{root}.points[{index}]"
+            if not isinstance(point, dict):
+                report.error(path, "expected an object with 'func'")
+                points[index] = {'func': 'fixed', 'x': 0, 'y': 0}
+                continue
+            self._check_function(point, path, 'circle', known_names, context, report)
+            if not self._sample_point(point, path, context, report):
+                points[index] = {'func': 'fixed', 'x': 0, 'y': 0}
+
+        return report, plan
+
+    # ========== ПРОВЕРКИ ==========
+
+    def _check_pattern(self, plan: Dict[str, Any], report: ValidationReport, root: str):
+        """Параметры паттерна: имя, count, width, color"""
+        pattern = plan.get('pattern', 'connect')
+        if pattern not in self.pattern_names:
+            report.error(f"{root}.pattern", f"unknown pattern '{pattern}', available: {self.pattern_names}")
+            plan['pattern'] = 'connect'
+
+        count = plan.get('count', 36)
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            report.error(f"{root}.count", f"expected a positive integer, got {count!r}")
+            plan['count'] = 36
+
+        # Толщина-выражение проверяется вместе с цветом (зависит от point_index)
+        width = plan.get('width', 1.0)
+        if isinstance(width, bool) or not isinstance(width, (int, float, str)):
+            report.error(f"{root}.width", f"expected a number or expression, got {width!r}")
+            plan.pop('width')
+
+        # Цвет паттерна проверяется вместе с точками (может быть выражением)
+        color = plan.get('color', [255, 255, 255])
+        if not (isinstance(color, list) and len(color) >= 3):
+            report.warning(f"{root}.color", f"expected [r, g, b], got {color!r}")
+
+    def _check_function(self, config: Dict[str, Any], path: str, default: str,
+                        known_names, context: Dict[str, Any], report: ValidationReport):
+        """Рекурсивно проверяет конфиг функции и его вложенные функции"""
+        func_name = config.get('func', default)
+        if func_name not in self.function_lib.functions:
+            report.error(f"{path}.func", f"unknown function '{func_name}', using '{default}'")
+            config['func'] = default
+
+        for key, value in config.items():
+            param_path = f"{path}.{key}"
+
+            if key in CHILD_KEYS:
+                child_default = CHILD_KEYS[key]
+                children = value if isinstance(value, list) else [value]
+                for child_index, child in enumerate(children):
+                    child_path = f"{param_path}[{child_index}]" if isinstance(value, list) else param_path
+                    if isinstance(child, dict):
+                        self._check_function(child, child_path, child_default, known_names, context, report)
+                    else:
+                        report.error(child_path, "expected a function config object")
+                continue
+
+            if key in NON_EXPRESSION_PARAMS:
+                continue
+
+            if key in STYLE_KEYS:
+                self._check_style(config, key, param_path, known_names | {'point_index'},
+                                  dict(context, point_index=0), report)
+                continue
+
+            if isinstance(value, list):
+                for item_index, item in enumerate(value):
+                    value[item_index] = self._check_param(item, f"{param_path}[{item_index}]",
+                                                          known_names, context, report)
+            else:
+                config[key] = self._check_param(value, param_path, known_names, context, report)
+
+    def _check_style(self, config: Dict[str, Any], key: str, path: str, known_names,
+                     context: Dict[str, Any], report: ValidationReport):
+        """color ([r, g, b]) или alpha: числа или выражения"""
+        value = config[key]
+        if isinstance(value, list):
+            for item_index, item in enumerate(value):
+                value[item_index] = self._check_param(item, f"{path}[{item_index}]",
+                                                      known_names, context, report)
+        else:
+            config[key] = self._check_param(value, path, known_names, context, report)
+
+    def _check_param(self, value, path: str, known_names, context: Dict[str, Any],
+                     report: ValidationReport):
+        """Параметр: число или выражение. Возвращает значение для плана"""
+        if isinstance(value, (int, float)):
+            return value
+
+        if not isinstance(value, str):
+            report.error(path, f"expected a number or expression, got {value!r}")
+            return 0
+
+        try:
+            compile_expression(value)
+            names = expression_names(value)
+        except SyntaxError as e:
+            report.error(path, f"syntax error in '{value}': {e.msg}")
+            return 0
+
+        unknown = sorted(names - known_names)
+        if unknown:
+            report.error(path, f"unknown name(s) {unknown} in '{value}'")
+            return 0
+
+        report.expressions += 1
+        try:
+            evaluate_expression(value, context)
+        except Exception as e:
+            report.warning(path, f"{type(e).__name__} at n=0, time=0 in '{value}': {e}")
+        return value
+
+    def _sample_point(self, point: Dict[str, Any], path: str, context: Dict[str, Any],
+                      report: ValidationReport) -> bool:
+        """Пробное вычисление точки целиком (False - точку нужно заменить)"""
+        graph = self.function_lib.active_graph
+        self.function_lib.active_graph = None  # Конфиг еще не в графе
+        try:
+            coords = self.function_lib.get(point.get('func', 'circle')).evaluate(point, context)
+            if len(coords) < 2:
+                report.error(path, f"function returned {coords!r}, expected [x, y]")
+                return False
+            return True
+        except Exception as e:
+            report.error(path, f"{type(e).__name__} while evaluating at n=0, time=0: {e}")
+            return False
+        finally:
+            self.function_lib.active_graph = graph
@@ -6,6 +6,15 @@ from pyglet.math import Mat4
 from engine import ParametricEngine
 from config_loader import ConfigLoader
 
+# Шаг изменения count стрелками вверх/вниз
+COUNT_STEP = 1.25
+
+# Перемотка: , и . - на SEEK_STEP секунд (с Shift - в 10 раз больше),
+# - и = - скорость в SPEED_STEP раз, перетаскивание мышью - SCRUB_RATE секунд на пиксель
+SEEK_STEP = 1.0
+SPEED_STEP = 2.0
+SCRUB_RATE = 0.01
+
 class LineDrawerApp:
     """Основное окно приложения"""
     
@@ -48,10 +57,21 @@ class LineDrawerApp:
         
         @self.window.event
         def on_key_press(symbol, modifiers):
-            if symbol == pyglet.window.key.R:
+            key = pyglet.window.key
+            if symbol == key.R:
                 self.load_config()
-            elif symbol == pyglet.window.key.ESCAPE:
+            elif symbol == key.ESCAPE:
                 self.window.close()
+            elif symbol in (key.UP, key.DOWN, key.RIGHT, key.LEFT):
+                self.change_count(symbol, modifiers)
+            elif symbol in (key.SPACE, key.COMMA, key.PERIOD, key.MINUS, key.EQUAL, key._0, key.HOME):
+                self.control_time(symbol, modifiers)
+        
+        @self.window.event
+        def on_mouse_drag(x, y, dx, dy, buttons, modifiers):
+            # Прокрутка времени: след не накапливается заново на каждое движение
+            if dx:
+                self.engine.seek(self.engine.clock.now() + dx * SCRUB_RATE, warm_trails=False)
         
         @self.window.event
         def on_resize(width, height):
@@ -60,6 +80,51 @@ class LineDrawerApp:
             self.window.projection = Mat4.orthogonal_projection(0, width, 0, height, -1, 1)
             self.engine.update_window_size(width, height)
     
+    def change_count(self, symbol, modifiers):
+        """
+        Стрелки меняют count: вверх/вниз - в COUNT_STEP раз (с Shift - вдвое),
+        вправо/влево - на 1
+        """
+        key = pyglet.window.key
+        count = self.engine.get_count()
+        factor = 2.0 if modifiers & key.MOD_SHIFT else COUNT_STEP
+        if symbol == key.UP:
+            count = max(count + 1, int(count * factor))
+        elif symbol == key.DOWN:
+            count = min(count - 1, int(count / factor))
+        elif symbol == key.RIGHT:
+            count += 1
+        else:
+            count -= 1
+        self.engine.set_count(max(1, count))
+    
+    def control_time(self, symbol, modifiers):
+        """
+        Пробел - пауза, , и . - перемотка на SEEK_STEP (Shift - x10),
+        - и = - медленнее/быстрее, 0 - обычная скорость, Home - в начало
+        """
+        key = pyglet.window.key
+        clock = self.engine.clock
+        step = SEEK_STEP * (10 if modifiers & key.MOD_SHIFT else 1)
+        if symbol == key.SPACE:
+            clock.toggle()
+        elif symbol == key.COMMA:
+            self.engine.seek(clock.now() - step)
+        elif symbol == key.PERIOD:
+            self.engine.seek(clock.now() + step)
+        elif symbol == key.MINUS:
+            clock.set_speed(clock.speed / SPEED_STEP)
+        elif symbol == key.EQUAL:
+            clock.set_speed(clock.speed * SPEED_STEP)
+        elif symbol == key._0:
+            clock.set_speed(1.0)
+        else:
+            self.engine.seek(0.0)
+        
+        state = clock.state()
+        print(f"Time {state['time']:.2f} s, speed x{state['speed']:g}"
+              f"{'' if state['playing'] else ', paused'}")
+    
     def load_config(self):
         """Загрузка конфигурации"""
         data = ConfigLoader.load_json(self.config_file)
@@ -74,6 +139,7 @@ class LineDrawerApp:
         """Запуск приложения"""
         print("="*50)
         print("Parametric Line Drawer")
-        print("Controls: R - reload, ESC - exit")
+        print("Controls: R - reload, ESC - exit, arrows - count (Shift: x2)")
+        print("Time: Space - pause, , . - seek 1 s (Shift: 10 s), - = - speed, 0 - x1, Home - start, drag - scrub")
         print("="*50)
         pyglet.app.run()
\ No newline at end of file
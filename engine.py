@@ -1,22 +1,37 @@
 """
 Главный движок параметрического рисования
 """
-import pyglet
-import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
-from patterns import ConnectPattern, ConnectAllPattern, ConnectToNextPattern
+from patterns import ConnectPattern, ConnectAllPattern, ConnectToNextPattern, BasePattern
 from functions import FunctionLibrary
+from functions.diagnostics import hot_log
+from config_validator import ConfigValidator
+from interpolation import KeyframeBuffer
+from periodic import (FrameCache, CachedFrame, detect_period, verify_period, pack_endpoints,
+                      unpack_endpoints, DEFAULT_CACHE_FPS, DEFAULT_CACHE_MB, DEFAULT_MAX_PERIOD)
+from timeline import Timeline, StateSnapshots, trail_warmup_frames, TRAIL_FRAME
+from audio import AudioInput, DEFAULT_BANDS, open_audio, silent_bands
+
+# Без pyglet движок работает только в headless режиме
+try:
+    import pyglet
+    from renderer import TrailBuffer
+except ImportError:
+    pyglet = None
+    TrailBuffer = None
 
 class ParametricEngine:
     """Управляет всей параметрической графикой"""
     
 # В методе __init__ класса ParametricEngine добавляем:
-from patterns import ConnectClosedPattern
+from patterns import ConnectClosedPattern, CustomPattern
 
 class ParametricEngine:
     """Управляет всей параметрической графикой"""
     
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, workers: int = 0, chunk_size: int = 1024,
+                 headless: bool = False):
         self.width = width
         self.height = height
         self.center_x = width // 2
@@ -30,17 +45,48 @@ class ParametricEngine:
             'connect': ConnectPattern(self.function_lib, width, height),
             'connectAll': ConnectAllPattern(self.function_lib, width, height),
             'connectToNext': ConnectToNextPattern(self.function_lib, width, height),
-            'connectClosed': ConnectClosedPattern(self.function_lib, width, height)
+            'connectClosed': ConnectClosedPattern(self.function_lib, width, height),
+            'custom': CustomPattern(self.function_lib, width, height)
         }
         
         # Состояние
         self.current_pattern = None
-        self.lines_batch = pyglet.graphics.Batch()
-        self.start_time = time.time()
+        self.headless = headless or pyglet is None
+        self.lines_batch = None if self.headless else pyglet.graphics.Batch()
         self.config = {}
+        self.validation = None  # ValidationReport последней загрузки
+        
+        # Интерполяция между ключевыми кадрами (eval_rate в конфиге)
+        self.keyframes = None
+        self.last_error_check = 0.0
+        
+        # Кадры одного периода сцены (period в конфиге) или None
+        self.frame_cache = None
+        
+        # Часы сцены (пауза, перемотка, скорость) и снимки состояния для перемотки
+        self.clock = Timeline()
+        self.snapshots = StateSnapshots()
+        self.frame_time = None   # Момент последнего update_at (None - кадр устарел)
+        self._trail_time = None  # Момент кадра, последним добавленного в след
+        
+        # Параллельное вычисление линий (workers > 1 включает пул потоков)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.executor = None
+        self.executor_workers = 0
+        
+        # След (trails): затухание за кадр или None
+        self.trail_fade = None
+        self.trails = None
+        
+        # Аудио-вход (amp, band[k] в выражениях) или None
+        self.audio = None
     
     def update_window_size(self, width: int, height: int):
-        """Обновление при изменении размера окна"""
+        """
+        Обновление при изменении размера окна
+        Линии не пересоздаются: центр - смещение в рендерере (O(1))
+        """
         self.width = width
         self.height = height
         self.center_x = width // 2
@@ -50,13 +96,32 @@ class ParametricEngine:
         for pattern in self.patterns.values():
             pattern.update_window_size(width, height)
         
-        # Пересоздаем линии с новым центром
-        if self.config:
-            self._create_lines(self.config)
+        if self.trails is not None:
+            self.trails.resize(width, height)
     
     def load_config(self, data: Dict[str, Any]):
         """Загрузка конфигурации из JSON"""
-        self.config = data.get('parametric_lines', {})
+        config = data.get('parametric_lines', {})
+        
+        # Проверка один раз при загрузке: в цикл кадров попадает план без ошибок
+        audio = config.get('audio')
+        bands = int(audio.get('bands', DEFAULT_BANDS)) if isinstance(audio, dict) else None
+        validator = ConfigValidator(self.function_lib, list(self.patterns.keys()),
+                                    lambda n, t, count: BasePattern.build_context(
+                                        n, t, count, band=silent_bands(bands) if bands else None))
+        hot_log.enabled = False  # Проверка сама сообщает об ошибках
+        report, plan = validator.validate(config)
+        report.print()
+        self.validation = report
+        
+        # Журнал ошибок кадра: log_errors = false отключает его полностью
+        hot_log.enabled = bool(config.get('log_errors', True))
+        hot_log.reset()
+        self.function_lib.scalars.reset()
+        self.snapshots.clear()
+        self.frame_time = None
+        
+        self.config = plan
         self._create_lines(self.config)
     
     def _create_lines(self, config: Dict[str, Any]):
@@ -70,25 +135,309 @@ class ParametricEngine:
             pattern_name = 'connect'  # Fallback
         
         pattern = self.patterns[pattern_name]
+        
+        # Буферы прошлого паттерна больше не рисуются
+        if self.current_pattern is not None and self.current_pattern is not pattern:
+            self.current_pattern.clear_lines()
         self.current_pattern = pattern
         
         # Настраиваем паттерн
+        self._setup_audio(config)
         pattern.set_config(config)
+        pattern.set_audio(self.audio)
         pattern.set_batch(self.lines_batch)
         
         # Создаем линии
         pattern.create_lines()
+        pattern.prepare_render()
         print(f"Pattern '{pattern_name}' created {pattern.get_line_count()} lines")  # ← Теперь работает!
+        
+        # Статистика графа функций
+        stats = pattern.graph.stats()
+        print(f"Function graph: {stats['configs']} configs -> {stats['nodes']} nodes "
+              f"(dedup {stats['dedup_ratio']:.2f}x, {stats['static_nodes']} static)")
+        if config.get('dump_graph', False):
+            print(self.dump_function_graph())
+        
+        self._setup_interpolation(config)
+        self._setup_parallel(config)
+        self._setup_trails(config)
+        self._setup_cache(config)
+    
+    def _setup_interpolation(self, config: Dict[str, Any]):
+        """
+        Настройка временной интерполяции
+        eval_rate - частота вычисления графа функций (Гц), 0 - каждый кадр
+        interpolation - 'linear' или 'catmull_rom'
+        error_check_interval - как часто сравнивать с точным вычислением (сек), 0 (по умолчанию) -
+        никогда; результат - в журнал hot_log (уровень INFO)
+        """
+        eval_rate = float(config.get('eval_rate', 0))
+        if eval_rate <= 0:
+            self.keyframes = None
+            return
+        
+        mode = config.get('interpolation', 'linear')
+        self.keyframes = KeyframeBuffer(eval_rate, mode)
+        self.last_error_check = 0.0
+        print(f"Interpolation: {self.keyframes.mode} at {eval_rate} Hz")
+    
+    def _setup_cache(self, config: Dict[str, Any]):
+        """
+        Кэш кадров одного периода (включается явно)
+        period - 0/false (по умолчанию: без кэша), 'auto' - найти по выражениям
+        и проверить, или число секунд; max_period - самый длинный период для 'auto'
+        Кэш отдает кадр ближайшей ячейки сетки cache_fps, а не кадр точного времени:
+        линии отстают до половины ячейки (при быстром движении - на пиксели)
+        cache_fps - кадров на секунду периода, cache_mb - бюджет памяти,
+        cache_eviction - 'keep' или 'lru' (см. FrameCache)
+        """
+        self.frame_cache = None
+        period = config.get('period', 0)
+        pattern = self.current_pattern
+        if not period or pattern is None or not pattern.get_line_count():
+            return
+        
+        if period == 'auto':
+            count = config.get('count', 36)
+            contexts = [dict(BasePattern.build_context(n, 0.0, count), point_index=n) for n in (0, 1, 2)]
+            period, reason = detect_period(config, contexts,
+                                           float(config.get('max_period', DEFAULT_MAX_PERIOD)))
+            if period is None:
+                print(f"Frame cache off: {reason}")
+                return
+            evaluate = lambda t: pack_endpoints(self._evaluate_endpoints(t))
+            # Пробные кадры не должны менять сглаживание текущего кадра
+            scalars = self.function_lib.scalars
+            snapshot = scalars.snapshot()
+            try:
+                verified = verify_period(evaluate, period)
+            finally:
+                scalars.restore(snapshot)
+            if not verified:
+                print(f"Frame cache off: frames at t and t + {period:.2f} s differ")
+                return
+            source = f"detected, {reason}"
+        else:
+            period = float(period)
+            source = "declared"
+        
+        # Цвета и толщины от time тоже хранятся в кадре: повтор ничего не вычисляет
+        lines = pattern.get_line_count()
+        extra_bytes = (0 if pattern.colors.static else 8 * lines) + \
+                      (0 if pattern.widths.static or not pattern._thick() else 4 * lines)
+        self.frame_cache = FrameCache(period, lines, extra_bytes,
+                                      float(config.get('cache_fps', DEFAULT_CACHE_FPS)),
+                                      float(config.get('cache_mb', DEFAULT_CACHE_MB)) * 1024 * 1024,
+                                      config.get('cache_eviction', 'keep'))
+        print(f"Frame cache: period {period:.2f} s ({source}), {self.frame_cache.describe()}")
+    
+    def _evaluate_frame(self, current_time: float) -> CachedFrame:
+        """Кадр для кэша: концы, а также цвета и толщины, если они зависят от времени"""
+        pattern = self.current_pattern
+        colors = None if pattern.colors.static else pattern.compute_colors(current_time)
+        widths = None
+        if not pattern.widths.static and pattern._thick():
+            widths = pattern.compute_widths(current_time)
+        return CachedFrame(pack_endpoints(self._evaluate_endpoints(current_time)), colors, widths)
+    
+    def _setup_parallel(self, config: Dict[str, Any]):
+        """
+        Настройка пула потоков
+        workers - число потоков (0 или 1 - без пула), chunk_size - линий на задачу
+        Значения из конфига переопределяют параметры конструктора
+        """
+        workers = int(config.get('workers', self.workers))
+        self.chunk_size = int(config.get('chunk_size', self.chunk_size))
+        
+        if self.executor is not None:
+            if self.executor_workers == workers:
+                return
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        
+        self.executor_workers = workers
+        if workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+            print(f"Parallel update: {workers} workers, chunk size {self.chunk_size}")
+    
+    def _setup_trails(self, config: Dict[str, Any]):
+        """
+        Настройка следа
+        trails - включить накопление, trail_fade - доля яркости, гасимая за кадр
+        """
+        if self.trails is not None:
+            self.trails.delete()
+        if not config.get('trails', False):
+            self.trail_fade = None
+            self.trails = None
+            return
+        
+        self.trail_fade = float(config.get('trail_fade', 0.1))
+        if not self.headless:
+            # Framebuffer создается при первой отрисовке (нужен GL контекст)
+            self.trails = TrailBuffer(self.width, self.height, self.trail_fade)
+        print(f"Trails: fade {self.trail_fade} per frame")
+    
+    def _setup_audio(self, config: Dict[str, Any]):
+        """
+        Настройка аудио-входа
+        audio - {"source": "file.wav" или "-" (s16le из stdin), "bands", "block",
+        "rate", "channels", "loop", "gain", "smoothing"}; без секции amp и band[k] равны 0
+        Поток перезапускается, только если параметры изменились
+        """
+        audio_config = config.get('audio')
+        if self.audio is not None:
+            if isinstance(audio_config, dict) and \
+                    AudioInput.from_config(audio_config).settings() == self.audio.settings():
+                return
+            self.audio.stop()
+            self.audio = None
+        self.audio = open_audio(audio_config)
+    
+    def compute_endpoints(self, current_time: float):
+        """Концы линий текущего паттерна (через пул потоков, если он включен)"""
+        return self.current_pattern.compute_endpoints(current_time, self.executor, self.chunk_size)
+    
+    def set_count(self, count: int):
+        """
+        Меняет count текущей сцены на лету
+        Паттерн достраивает или отрезает итерации на месте; если не умеет - полное пересоздание
+        """
+        if not self.config or self.current_pattern is None:
+            return
+        
+        count = max(1, int(count))
+        if not self.current_pattern.set_count(count):
+            self.config['count'] = count
+            self._create_lines(self.config)
+            return
+        
+        # Ключевые кадры хранят концы линий старого набора; период зависит от count
+        if self.keyframes:
+            self.keyframes.clear()
+        self._setup_cache(self.config)
+        # Линии, зависящие от времени, - сразу, а не в следующем тике (и на паузе)
+        self.frame_time = None
+        self.update(0)
+    
+    def get_count(self) -> int:
+        return self.config.get('count', 36) if self.config else 0
+    
+    def dump_function_graph(self) -> str:
+        """Текстовый дамп графа функций текущей сцены"""
+        if not self.current_pattern or not self.current_pattern.graph:
+            return ""
+        return self.current_pattern.graph.dump()
     
     def update(self, dt: float):
         """Обновление анимации"""
         if not self.current_pattern:
             return
         
-        current_time = time.time() - self.start_time
-        self.current_pattern.update_lines(current_time)
+        current_time = self.clock.now()
+        if not self.clock.playing and current_time == self.frame_time:
+            return  # На паузе кадр не меняется: ничего не вычисляется
+        self.update_at(current_time)
+        if self.clock.playing:
+            self.snapshots.record(current_time, self.function_lib.scalars.snapshot)
+    
+    def seek(self, current_time: float, warm_trails: bool = True):
+        """
+        Перемотка на current_time: кадр вычисляется сразу по своему времени
+        Сглаживание продолжается от ближайшего снимка до current_time, ключевые
+        кадры сбрасываются, след (warm_trails) накапливается заново за
+        trail_warmup_frames кадров до current_time, а не с нуля
+        """
+        self.clock.seek(current_time)
+        current_time = self.clock.now()
+        
+        scalars = self.function_lib.scalars
+        snapshot = self.snapshots.nearest(current_time)
+        if snapshot is None:
+            scalars.reset()
+        else:
+            scalars.restore(snapshot[1])
+        if self.keyframes:
+            self.keyframes.clear()
+        self.last_error_check = current_time
+        
+        if not self.current_pattern:
+            return
+        if self.trails is not None and warm_trails:
+            self.trails.clear()
+            for k in range(trail_warmup_frames(self.trail_fade) - 1, 0, -1):
+                moment = current_time - k * TRAIL_FRAME
+                if moment >= 0:
+                    self.update_at(moment)
+                    self.trails.accumulate(self.current_pattern.draw)
+        self.update_at(current_time)
+    
+    def update_at(self, current_time: float):
+        """Обновление линий на момент current_time"""
+        pattern = self.current_pattern
+        self.frame_time = current_time
+        pattern.begin_frame(current_time)
+        
+        if hot_log.enabled:
+            hot_log.maybe_summary()
+        
+        if self.frame_cache is not None:
+            # Повтор периода: кадр из кэша, ничего не вычисляется
+            frame, _ = self.frame_cache.get(current_time, self._evaluate_frame)
+            pattern.apply_frame(frame.positions, frame.colors, frame.widths)
+            if self.frame_cache.complete and not self.frame_cache.complete_reported:
+                self.frame_cache.complete_reported = True
+                stats = self.frame_cache.stats()
+                print(f"✓ Frame cache complete: {stats['stored']} frames, "
+                      f"{stats['bytes'] / 1048576:.1f} MB - replay evaluates nothing")
+            return
+        
+        pattern.apply_endpoints(self.frame_endpoints(current_time))
+        
+        # Цвета и толщины-выражения (статические не загружаются)
+        pattern.apply_colors(current_time)
+        pattern.apply_widths(current_time)
+    
+    def frame_endpoints(self, current_time: float):
+        """
+        Концы линий кадра: из кэша периода, точное вычисление или интерполяция ключевых кадров
+        Кадр скалярных функций начинает вызывающий (pattern.begin_frame, см. update_at)
+        """
+        if self.frame_cache is not None:
+            frame, _ = self.frame_cache.get(current_time, self._evaluate_frame)
+            return unpack_endpoints(frame.positions)
+        return self._evaluate_endpoints(current_time)
+    
+    def _evaluate_endpoints(self, current_time: float):
+        """Концы линий без кэша периода (на паузе - точно, без ключевых кадров)"""
+        if not self.keyframes or not self.clock.playing:
+            return self.compute_endpoints(current_time)
+        
+        endpoints = self.keyframes.sample(current_time, self.compute_endpoints)
+        self._check_interpolation_error(current_time, endpoints)
+        return endpoints
+    
+    def _check_interpolation_error(self, current_time: float, endpoints):
+        """Периодически сравнивает интерполяцию с точным вычислением (по запросу, в журнал)"""
+        interval = float(self.config.get('error_check_interval', 0))
+        if interval <= 0 or not hot_log.enabled or current_time - self.last_error_check < interval:
+            return
+        
+        self.last_error_check = current_time
+        exact = self.compute_endpoints(current_time)
+        stats = self.keyframes.record_error(exact, endpoints)
+        hot_log.note('interpolation', f"error max {stats['max']:.2f}px, mean {stats['mean']:.3f}px")
     
     def draw(self):
         """Отрисовка всех линий"""
-        if self.current_pattern:
+        if not self.current_pattern:
+            return
+        
+        if self.trails is not None:
+            # В след добавляется каждый новый кадр один раз: на паузе след не гаснет
+            fresh = self.frame_time != self._trail_time
+            self._trail_time = self.frame_time
+            self.trails.draw(self.current_pattern.draw, accumulate=fresh)
+        else:
             self.current_pattern.draw()
\ No newline at end of file
@@ -4,15 +4,18 @@
 from .function_lib import FunctionLibrary, FunctionBase
 from .function_lib import (
     CircleFunction, SquareFunction, NGonFunction, FixedFunction,
-    SumFunction, MultiplyFunction, MorphFunction, DirectedLineFunction
+    SumFunction, MultiplyFunction, MorphFunction, DirectedLineFunction,
+    BlendFunction
 )
+from .graph import FunctionGraph, GraphNode
+from .scalar_functions import ScalarLibrary, scalars
 
 # Пробуем импортировать продвинутые функции
 try:
     from .advanced_functions import (
         EllipseFunction, SuperEllipseFunction, HypocycloidFunction,
         EpicycloidFunction, LissajousFunction, ButterflyFunction,
-        CardioidFunction, RoseFunction, SpiralFunction
+        CardioidFunction, RoseFunction, NoiseFunction, FbmFunction
     )
     HAS_ADVANCED = True
 except ImportError:
@@ -29,6 +32,11 @@ __all__ = [
     'MultiplyFunction',
     'MorphFunction',
     'DirectedLineFunction',
+    'BlendFunction',
+    'FunctionGraph',
+    'GraphNode',
+    'ScalarLibrary',
+    'scalars',
 ]
 
 if HAS_ADVANCED:
@@ -41,5 +49,6 @@ if HAS_ADVANCED:
         'ButterflyFunction',
         'CardioidFunction',
         'RoseFunction',
-        'SpiralFunction'
+        'NoiseFunction',
+        'FbmFunction'
     ])
\ No newline at end of file
@@ -3,17 +3,37 @@ advanced_functions.py - Продвинутые математические фу
 """
 import math
 from typing import Dict, Any, List
+from .expressions import evaluate_expression
+from .diagnostics import hot_log
+from . import kernels
+from .noise import noise, fbm
 
 # Определяем базовый класс здесь, чтобы избежать импорта
 class FunctionBaseAdvanced:
     """База для всех продвинутых математических функций"""
     
+    # Имя пакетного ядра в kernels.py и параметры ядра (имя, значение по умолчанию)
+    KERNEL = None
+    KERNEL_PARAMS = ()
+    
     def __init__(self, function_lib=None):
         self.function_lib = function_lib
     
     def evaluate(self, params: Dict[str, Any], context: Dict[str, Any]) -> List[float]:
         raise NotImplementedError
     
+    def evaluate_batch(self, params: Dict[str, Any],
+                       contexts: List[Dict[str, Any]]) -> List[List[float]]:
+        """
+        Вычисляет координаты для пакета контекстов (по одному)
+        Результат - список [x, y] или массив numpy (N, 2) у пакетных ядер
+        """
+        if self.KERNEL is not None:
+            result = kernels.evaluate_kernel_batch(self, params, contexts)
+            if result is not None:
+                return result
+        return [self.evaluate(params, context) for context in contexts]
+    
     def _parse_param(self, value, context: Dict[str, Any]):
         """Парсит параметр (число или выражение)"""
         if isinstance(value, str):
@@ -21,24 +41,21 @@ class FunctionBaseAdvanced:
         return float(value)
     
     def _evaluate_expression(self, expr: str, context: Dict[str, Any]) -> float:
-        """Вычисляет математическое выражение"""
-        safe_dict = {
-            'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-            'pi': math.pi, 'e': math.e, 'sqrt': math.sqrt,
-            'abs': abs, 'pow': math.pow, 'exp': math.exp,
-            'log': math.log, 'log10': math.log10,
-            'floor': math.floor, 'ceil': math.ceil, 'round': round,
-            **context
-        }
+        """Вычисляет математическое выражение (скомпилированное один раз)"""
         try:
-            return float(eval(expr, {"__builtins__": {}}, safe_dict))
-        except:
+            return evaluate_expression(expr, context)
+        except Exception as e:
+            if hot_log.enabled:
+                hot_log.report('expression', expr, e)
             return 0.0
 
 # ========== 2. ЭЛЛИПС ==========
 class EllipseFunction(FunctionBaseAdvanced):
     """Эллипс"""
     
+    KERNEL = 'ellipse'
+    KERNEL_PARAMS = (('a', 100), ('b', 100), ('angle', 0))
+    
     def evaluate(self, params, context):
         a = self._parse_param(params.get('a', 100), context)
         b = self._parse_param(params.get('b', 100), context)
@@ -53,6 +70,9 @@ class EllipseFunction(FunctionBaseAdvanced):
 class SuperEllipseFunction(FunctionBaseAdvanced):
     """Суперэллипс (кривая Ламе)"""
     
+    KERNEL = 'superellipse'
+    KERNEL_PARAMS = (('a', 100), ('b', 100), ('n', 2), ('angle', 0))
+    
     def evaluate(self, params, context):
         a = self._parse_param(params.get('a', 100), context)
         b = self._parse_param(params.get('b', 100), context)
@@ -93,6 +113,9 @@ class SuperEllipseFunction(FunctionBaseAdvanced):
 class HypocycloidFunction(FunctionBaseAdvanced):
     """Гипоциклоида (астроида)"""
     
+    KERNEL = 'hypocycloid'
+    KERNEL_PARAMS = (('R', 100), ('r', 25), ('angle', 0))
+    
     def evaluate(self, params, context):
         R = self._parse_param(params.get('R', 100), context)
         r = self._parse_param(params.get('r', 25), context)
@@ -113,6 +136,9 @@ class HypocycloidFunction(FunctionBaseAdvanced):
 class EpicycloidFunction(FunctionBaseAdvanced):
     """Эпициклоида"""
     
+    KERNEL = 'epicycloid'
+    KERNEL_PARAMS = (('R', 100), ('r', 30), ('angle', 0))
+    
     def evaluate(self, params, context):
         R = self._parse_param(params.get('R', 100), context)
         r = self._parse_param(params.get('r', 30), context)
@@ -133,6 +159,9 @@ class EpicycloidFunction(FunctionBaseAdvanced):
 class LissajousFunction(FunctionBaseAdvanced):
     """Кривые Лиссажу"""
     
+    KERNEL = 'lissajous'
+    KERNEL_PARAMS = (('a', 200), ('b', 150), ('A', 3), ('B', 2), ('delta', 0), ('angle', 0))
+    
     def evaluate(self, params, context):
         a = self._parse_param(params.get('a', 200), context)
         b = self._parse_param(params.get('b', 150), context)
@@ -151,6 +180,9 @@ class LissajousFunction(FunctionBaseAdvanced):
 class ButterflyFunction(FunctionBaseAdvanced):
     """Butterfly curve"""
     
+    KERNEL = 'butterfly'
+    KERNEL_PARAMS = (('size', 100), ('angle', 0))
+    
     def evaluate(self, params, context):
         size = self._parse_param(params.get('size', 100), context)
         angle = self._parse_param(params.get('angle', 0), context)
@@ -167,6 +199,9 @@ class ButterflyFunction(FunctionBaseAdvanced):
 class CardioidFunction(FunctionBaseAdvanced):
     """Кардиоида"""
     
+    KERNEL = 'cardioid'
+    KERNEL_PARAMS = (('size', 100), ('angle', 0))
+    
     def evaluate(self, params, context):
         size = self._parse_param(params.get('size', 100), context)
         angle = self._parse_param(params.get('angle', 0), context)
@@ -183,6 +218,9 @@ class CardioidFunction(FunctionBaseAdvanced):
 class RoseFunction(FunctionBaseAdvanced):
     """Розы (Rose curves)"""
     
+    KERNEL = 'rose'
+    KERNEL_PARAMS = (('k', 2), ('size', 100), ('angle', 0))
+    
     def evaluate(self, params, context):
         k = self._parse_param(params.get('k', 2), context)
         size = self._parse_param(params.get('size', 100), context)
@@ -199,6 +237,49 @@ class RoseFunction(FunctionBaseAdvanced):
         
         return [x, y]
 
+# ========== 10. ШУМ (СМЕЩЕНИЕ ТОЧЕК) ==========
+class NoiseFunction(FunctionBaseAdvanced):
+    """
+    Смещение шумом Перлина: (amplitude * noise(x, y, seed), amplitude * noise(x, y, seed + 1))
+    x, y - координаты выборки шума (выражения); складывается с формой через sum
+    """
+    
+    KERNEL = 'noise'
+    KERNEL_PARAMS = (('x', 'n * 0.1'), ('y', 0), ('amplitude', 20), ('seed', 0))
+    
+    def evaluate(self, params, context):
+        x = self._parse_param(params.get('x', 'n * 0.1'), context)
+        y = self._parse_param(params.get('y', 0), context)
+        amplitude = self._parse_param(params.get('amplitude', 20), context)
+        seed = int(self._parse_param(params.get('seed', 0), context))
+        
+        return [
+            amplitude * noise(x, y, seed),
+            amplitude * noise(x, y, seed + 1)
+        ]
+
+# ========== 11. ФРАКТАЛЬНЫЙ ШУМ ==========
+class FbmFunction(FunctionBaseAdvanced):
+    """Смещение фрактальным шумом: как noise, но сумма octaves октав"""
+    
+    KERNEL = 'fbm'
+    KERNEL_PARAMS = (('x', 'n * 0.1'), ('y', 0), ('amplitude', 20), ('octaves', 4),
+                     ('lacunarity', 2.0), ('gain', 0.5), ('seed', 0))
+    
+    def evaluate(self, params, context):
+        x = self._parse_param(params.get('x', 'n * 0.1'), context)
+        y = self._parse_param(params.get('y', 0), context)
+        amplitude = self._parse_param(params.get('amplitude', 20), context)
+        octaves = self._parse_param(params.get('octaves', 4), context)
+        lacunarity = self._parse_param(params.get('lacunarity', 2.0), context)
+        gain = self._parse_param(params.get('gain', 0.5), context)
+        seed = int(self._parse_param(params.get('seed', 0), context))
+        
+        return [
+            amplitude * fbm(x, y, octaves, lacunarity, gain, seed),
+            amplitude * fbm(x, y, octaves, lacunarity, gain, seed + 1)
+        ]
+
 def register_advanced_functions(library):
     """Регистрация всех продвинутых функций"""
     
@@ -212,6 +293,8 @@ def register_advanced_functions(library):
         'butterfly': ButterflyFunction(),
         'cardioid': CardioidFunction(),
         'rose': RoseFunction(),
+        'noise': NoiseFunction(),
+        'fbm': FbmFunction(),
     }
     
     # Регистрируем
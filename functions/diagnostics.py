@@ -0,0 +1,78 @@
+"""
+diagnostics.py - Журнал ошибок для горячего цикла кадров
+
+Одна и та же ошибка (источник, выражение, тип ошибки) пишется в лог один раз,
+дальше только считается; повторы выводятся периодической сводкой.
+Когда журнал выключен, на месте вызова остается одна проверка hot_log.enabled
+"""
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+ErrorKey = Tuple[str, str, str]
+
+
+class HotPathLog:
+    """Дедуплицирующий журнал ошибок с счетчиками и сводками"""
+
+    def __init__(self, name: str = 'linedrawer', summary_interval: float = 5.0):
+        self.enabled = True
+        self.logger = logging.getLogger(name)
+        self.summary_interval = summary_interval
+        self.counters = {}   # ключ -> всего повторов
+        self._reported = {}  # ключ -> повторов на момент последней сводки
+        self._last_summary = time.monotonic()
+        self._lock = threading.Lock()
+
+    def report(self, source: str, detail: str, error: Exception):
+        """
+        Регистрирует ошибку; в лог попадает только первая из одинаковых
+        Вызывать как: if hot_log.enabled: hot_log.report(...)
+        """
+        key = (source, detail, type(error).__name__)
+        with self._lock:
+            count = self.counters.get(key, 0) + 1
+            self.counters[key] = count
+            if count == 1:
+                self._reported[key] = 1
+
+        if count == 1:
+            self.logger.warning("%s '%s': %s: %s", source, detail, key[2], error)
+
+    def note(self, source: str, message: str):
+        """
+        Измерение горячего цикла (не ошибка): в лог уровня INFO, без дедупликации -
+        частоту ограничивает вызывающий
+        """
+        self.logger.info("%s: %s", source, message)
+
+    def maybe_summary(self, now: float = None):
+        """Выводит сводку повторов не чаще, чем раз в summary_interval секунд"""
+        now = time.monotonic() if now is None else now
+        if now - self._last_summary < self.summary_interval:
+            return
+        self._last_summary = now
+        self.summary()
+
+    def summary(self) -> Dict[ErrorKey, int]:
+        """Сводка: сколько раз каждая ошибка повторилась с прошлой сводки"""
+        with self._lock:
+            repeated = {key: count - self._reported.get(key, 0)
+                        for key, count in self.counters.items()
+                        if count > self._reported.get(key, 0)}
+            self._reported.update({key: self.counters[key] for key in repeated})
+
+        for (source, detail, error_type), count in repeated.items():
+            self.logger.warning("%s '%s': %s repeated %d times", source, detail, error_type, count)
+        return repeated
+
+    def reset(self):
+        """Сбрасывает счетчики (при перезагрузке конфигурации)"""
+        with self._lock:
+            self.counters.clear()
+            self._reported.clear()
+
+
+# Общий журнал для функций и паттернов
+hot_log = HotPathLog()
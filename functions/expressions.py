@@ -0,0 +1,56 @@
+"""
+expressions.py - Компиляция и кэш выражений в параметрах функций
+"""
+import ast
+import math
+from typing import Dict, Any, Set
+
+# Функции и константы, доступные в выражениях
+SAFE_FUNCTIONS = {
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
+    'sinh': math.sinh, 'cosh': math.cosh, 'tanh': math.tanh,
+    'pi': math.pi, 'e': math.e, 'tau': math.tau, 'sqrt': math.sqrt,
+    'abs': abs, 'pow': math.pow, 'exp': math.exp,
+    'log': math.log, 'log10': math.log10,
+    'floor': math.floor, 'ceil': math.ceil, 'round': round,
+}
+
+# Глобальные имена для eval: контекст передается как locals,
+# поэтому словарь не собирается заново на каждый вызов
+SAFE_GLOBALS = {"__builtins__": {}, **SAFE_FUNCTIONS}
+
+# Строковые параметры, которые не являются выражениями
+NON_EXPRESSION_PARAMS = {'func', 'operation'}
+
+# Имена, значение которых меняется от кадра к кадру: время, аудио-вход
+# и скалярные функции с состоянием (дополняются при регистрации)
+FRAME_NAMES = {'time', 'amp', 'band'}
+
+_compiled = {}
+
+
+def register_callable(name: str, func):
+    """Делает функцию доступной в выражениях (см. scalar_functions)"""
+    SAFE_FUNCTIONS[name] = func
+    SAFE_GLOBALS[name] = func
+
+
+def compile_expression(expr: str):
+    """Компилирует выражение один раз (SyntaxError пробрасывается)"""
+    code = _compiled.get(expr)
+    if code is None:
+        code = compile(expr, '<expression>', 'eval')
+        _compiled[expr] = code
+    return code
+
+
+def evaluate_expression(expr: str, context: Dict[str, Any]) -> float:
+    """Вычисляет выражение (исключения пробрасываются)"""
+    return float(eval(compile_expression(expr), SAFE_GLOBALS, context))
+
+
+def expression_names(expr: str) -> Set[str]:
+    """Имена переменных и функций, которые использует выражение"""
+    tree = ast.parse(expr, mode='eval')
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
@@ -2,12 +2,30 @@
 function_lib.py - Основная библиотека функций
 """
 import math
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from .expressions import evaluate_expression
+from .diagnostics import hot_log
+from .scalar_functions import scalars
+from . import kernels
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Стоимость выборки подмножества точек для пакетного вычисления
+# (в единицах "вычисление одной точки"); от нее зависит, когда
+# выгоднее посчитать дочернюю функцию для всех точек сразу
+GATHER_COST = 0.25
 
 # ========== БАЗОВЫЙ КЛАСС ==========
 class FunctionBase:
     """База для всех математических функций"""
     
+    # Имя пакетного ядра в kernels.py и параметры ядра (имя, значение по умолчанию)
+    KERNEL = None
+    KERNEL_PARAMS = ()
+    
     def __init__(self, function_lib=None):
         self.function_lib = function_lib
     
@@ -15,6 +33,34 @@ class FunctionBase:
         """Вычисляет координаты точки"""
         raise NotImplementedError
     
+    def evaluate_batch(self, params: Dict[str, Any],
+                       contexts: List[Dict[str, Any]]) -> List[List[float]]:
+        """
+        Вычисляет координаты для пакета контекстов (по умолчанию - по одному)
+        Результат - список [x, y] или массив numpy (N, 2) у пакетных ядер
+        """
+        if self.KERNEL is not None:
+            result = kernels.evaluate_kernel_batch(self, params, contexts)
+            if result is not None:
+                return result
+        return [self.evaluate(params, context) for context in contexts]
+    
+    def _evaluate_child_rows(self, config: Dict[str, Any], contexts: List[Dict[str, Any]],
+                             rows: List[int]) -> List[Optional[List[float]]]:
+        """
+        Вычисляет дочернюю функцию только для строк rows пакета
+        Если строк почти столько же, сколько контекстов, считаем для всех -
+        это дешевле, чем собирать подмножество
+        """
+        if len(rows) * (1 + GATHER_COST) >= len(contexts):
+            return self.function_lib.evaluate_child_batch(config, contexts)
+        
+        result = [None] * len(contexts)
+        values = self.function_lib.evaluate_child_batch(config, [contexts[row] for row in rows])
+        for row, value in zip(rows, values):
+            result[row] = value
+        return result
+    
     def _parse_param(self, value, context: Dict[str, Any]):
         """Парсит параметр (число или выражение)"""
         if isinstance(value, str):
@@ -22,21 +68,12 @@ class FunctionBase:
         return float(value)
     
     def _evaluate_expression(self, expr: str, context: Dict[str, Any]) -> float:
-        """Вычисляет математическое выражение"""
-        safe_dict = {
-            'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
-            'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
-            'sinh': math.sinh, 'cosh': math.cosh, 'tanh': math.tanh,
-            'pi': math.pi, 'e': math.e, 'tau': math.tau, 'sqrt': math.sqrt,
-            'abs': abs, 'pow': math.pow, 'exp': math.exp,
-            'log': math.log, 'log10': math.log10,
-            'floor': math.floor, 'ceil': math.ceil, 'round': round,
-            **context
-        }
+        """Вычисляет математическое выражение (скомпилированное один раз)"""
         try:
-            return float(eval(expr, {"__builtins__": {}}, safe_dict))
+            return evaluate_expression(expr, context)
         except Exception as e:
-            print(f"⚠ Expression evaluation error: {e} for '{expr}'")
+            if hot_log.enabled:
+                hot_log.report('expression', expr, e)
             return 0.0
 
 # ========== СУЩЕСТВУЮЩИЕ ФУНКЦИИ (без изменений) ==========
@@ -44,6 +81,9 @@ class FunctionBase:
 class CircleFunction(FunctionBase):
     """Окружность"""
     
+    KERNEL = 'circle'
+    KERNEL_PARAMS = (('size', 100), ('angle', 0))
+    
     def evaluate(self, params, context):
         size = self._parse_param(params.get('size', 100), context)
         angle = self._parse_param(params.get('angle', 0), context)
@@ -55,6 +95,9 @@ class CircleFunction(FunctionBase):
 class SquareFunction(FunctionBase):
     """Квадрат"""
     
+    KERNEL = 'square'
+    KERNEL_PARAMS = (('size', 100), ('angle', 0))
+    
     def evaluate(self, params, context):
         size = self._parse_param(params.get('size', 100), context)
         angle = self._parse_param(params.get('angle', 0), context)
@@ -74,6 +117,9 @@ class SquareFunction(FunctionBase):
 class NGonFunction(FunctionBase):
     """N-угольник с поддержкой дробных сторон"""
     
+    KERNEL = 'ngon'
+    KERNEL_PARAMS = (('size', 100), ('angle', 0), ('sides', 5))
+    
     def evaluate(self, params, context):
         size = self._parse_param(params.get('size', 100), context)
         angle = self._parse_param(params.get('angle', 0), context)
@@ -153,6 +199,9 @@ class NGonFunction(FunctionBase):
 class FixedFunction(FunctionBase):
     """Фиксированная точка"""
     
+    KERNEL = 'fixed'
+    KERNEL_PARAMS = (('x', 0), ('y', 0))
+    
     def evaluate(self, params, context):
         x = self._parse_param(params.get('x', 0), context)
         y = self._parse_param(params.get('y', 0), context)
@@ -166,13 +215,30 @@ class SumFunction(FunctionBase):
         total_x, total_y = 0.0, 0.0
         
         for func_config in functions_config:
-            func_name = func_config.get('func', 'circle')
-            func = self.function_lib.get(func_name)
-            x, y = func.evaluate(func_config, context)
+            x, y = self.function_lib.evaluate_child(func_config, context)
             total_x += x
             total_y += y
         
         return [total_x, total_y]
+    
+    def evaluate_batch(self, params, contexts):
+        if np is not None and contexts:
+            # Сумма столбцов в новом массиве: массивы детей хранит граф
+            totals = np.zeros((len(contexts), 2))
+            for func_config in params.get('functions', []):
+                values = self.function_lib.evaluate_child_batch(func_config, contexts)
+                totals += np.asarray(values, dtype=np.float64)[:, :2]
+            return totals
+        
+        # Новые списки, а не сложение на месте: значения детей может хранить граф
+        totals = None
+        for func_config in params.get('functions', []):
+            values = self.function_lib.evaluate_child_batch(func_config, contexts)
+            if totals is None:
+                totals = [[x, y] for x, y in values]
+            else:
+                totals = [[tx + x, ty + y] for (tx, ty), (x, y) in zip(totals, values)]
+        return totals if totals is not None else [[0.0, 0.0] for _ in contexts]
 
 class MultiplyFunction(FunctionBase):
     """Умножение функций"""
@@ -185,16 +251,11 @@ class MultiplyFunction(FunctionBase):
             return [0.0, 0.0]
         
         # Первая функция
-        func_config = functions_config[0]
-        func_name = func_config.get('func', 'circle')
-        func = self.function_lib.get(func_name)
-        result_x, result_y = func.evaluate(func_config, context)
+        result_x, result_y = self.function_lib.evaluate_child(functions_config[0], context)
         
         # Умножаем на остальные
         for func_config in functions_config[1:]:
-            func_name = func_config.get('func', 'circle')
-            func = self.function_lib.get(func_name)
-            x, y = func.evaluate(func_config, context)
+            x, y = self.function_lib.evaluate_child(func_config, context)
             
             if operation == 'elementwise':
                 result_x *= x
@@ -209,6 +270,18 @@ class MultiplyFunction(FunctionBase):
 class MorphFunction(FunctionBase):
     """Морфинг между функциями"""
     
+    def _segment(self, t: float, count: int):
+        """Активный отрезок морфинга: (индекс первой функции, доля)"""
+        t = max(0.0, min(1.0, t))
+        segment = t * (count - 1)
+        idx1 = int(segment)
+        fraction = segment - idx1
+        
+        if idx1 >= count - 1:
+            idx1 = count - 2
+            fraction = 1.0
+        return idx1, fraction
+    
     def evaluate(self, params, context):
         functions_config = params.get('functions', [])
         t = self._parse_param(params.get('t', 0), context)
@@ -216,36 +289,105 @@ class MorphFunction(FunctionBase):
         if not functions_config:
             return [0.0, 0.0]
         
-        t = max(0.0, min(1.0, t))
-        
         if len(functions_config) == 1:
-            func_config = functions_config[0]
-            func_name = func_config.get('func', 'circle')
-            func = self.function_lib.get(func_name)
-            return func.evaluate(func_config, context)
-        
-        segment = t * (len(functions_config) - 1)
-        idx1 = int(segment)
-        fraction = segment - idx1
+            return self.function_lib.evaluate_child(functions_config[0], context)
         
-        if idx1 >= len(functions_config) - 1:
-            idx1 = len(functions_config) - 2
-            fraction = 1.0
-        
-        func_config1 = functions_config[idx1]
-        func_name1 = func_config1.get('func', 'circle')
-        func1 = self.function_lib.get(func_name1)
-        x1, y1 = func1.evaluate(func_config1, context)
+        idx1, fraction = self._segment(t, len(functions_config))
         
-        func_config2 = functions_config[idx1 + 1]
-        func_name2 = func_config2.get('func', 'circle')
-        func2 = self.function_lib.get(func_name2)
-        x2, y2 = func2.evaluate(func_config2, context)
+        x1, y1 = self.function_lib.evaluate_child(functions_config[idx1], context)
+        x2, y2 = self.function_lib.evaluate_child(functions_config[idx1 + 1], context)
         
         return [
             x1 + fraction * (x2 - x1),
             y1 + fraction * (y2 - y1)
         ]
+    
+    def evaluate_batch(self, params, contexts):
+        """
+        Группирует точки по активному отрезку и вычисляет
+        каждую дочернюю функцию только для точек, где она нужна
+        """
+        functions_config = params.get('functions', [])
+        
+        if not functions_config:
+            return [[0.0, 0.0] for _ in contexts]
+        
+        if len(functions_config) == 1:
+            return self.function_lib.evaluate_child_batch(functions_config[0], contexts)
+        
+        # Активный отрезок для каждой точки
+        t_param = params.get('t', 0)
+        segments = [self._segment(self._parse_param(t_param, context), len(functions_config))
+                    for context in contexts]
+        
+        # Функция i нужна точкам отрезков i-1 (как вторая) и i (как первая)
+        rows_per_func = {}
+        for row, (idx1, _) in enumerate(segments):
+            rows_per_func.setdefault(idx1, []).append(row)
+            rows_per_func.setdefault(idx1 + 1, []).append(row)
+        
+        values = {}
+        for idx, rows in rows_per_func.items():
+            values[idx] = self._evaluate_child_rows(functions_config[idx], contexts, rows)
+        
+        result = []
+        for row, (idx1, fraction) in enumerate(segments):
+            x1, y1 = values[idx1][row]
+            x2, y2 = values[idx1 + 1][row]
+            result.append([
+                x1 + fraction * (x2 - x1),
+                y1 + fraction * (y2 - y1)
+            ])
+        return result
+
+class BlendFunction(FunctionBase):
+    """Взвешенная смесь функций (веса - числа или выражения)"""
+    
+    def _weights(self, params, context) -> List[float]:
+        """Веса для всех функций (нормированные, если normalize)"""
+        functions_config = params.get('functions', [])
+        weights_config = params.get('weights', [1] * len(functions_config))
+        
+        weights = [self._parse_param(w, context) for w in weights_config[:len(functions_config)]]
+        weights.extend([0.0] * (len(functions_config) - len(weights)))
+        
+        if params.get('normalize', True):
+            total = sum(weights)
+            if abs(total) > 1e-9:
+                weights = [w / total for w in weights]
+        return weights
+    
+    def evaluate(self, params, context):
+        functions_config = params.get('functions', [])
+        weights = self._weights(params, context)
+        
+        total_x, total_y = 0.0, 0.0
+        for func_config, weight in zip(functions_config, weights):
+            if weight == 0:
+                continue  # Нулевой вес - функцию не вычисляем
+            x, y = self.function_lib.evaluate_child(func_config, context)
+            total_x += weight * x
+            total_y += weight * y
+        
+        return [total_x, total_y]
+    
+    def evaluate_batch(self, params, contexts):
+        functions_config = params.get('functions', [])
+        weights = [self._weights(params, context) for context in contexts]
+        
+        totals = [[0.0, 0.0] for _ in contexts]
+        for idx, func_config in enumerate(functions_config):
+            rows = [row for row, row_weights in enumerate(weights) if row_weights[idx] != 0]
+            if not rows:
+                continue
+            
+            values = self._evaluate_child_rows(func_config, contexts, rows)
+            for row in rows:
+                x, y = values[row]
+                weight = weights[row][idx]
+                totals[row][0] += weight * x
+                totals[row][1] += weight * y
+        return totals
 
 class DirectedLineFunction(FunctionBase):
     """Точка на линии между двумя функциями"""
@@ -257,11 +399,8 @@ class DirectedLineFunction(FunctionBase):
         offset = self._parse_param(params.get('offset', 0), context)
         rotation = self._parse_param(params.get('rotation', 0), context)
         
-        from_func = self.function_lib.get(from_config.get('func', 'fixed'))
-        to_func = self.function_lib.get(to_config.get('func', 'fixed'))
-        
-        x1, y1 = from_func.evaluate(from_config, context)
-        x2, y2 = to_func.evaluate(to_config, context)
+        x1, y1 = self.function_lib.evaluate_child(from_config, context, default='fixed')
+        x2, y2 = self.function_lib.evaluate_child(to_config, context, default='fixed')
         
         dx = x2 - x1
         dy = y2 - y1
@@ -297,6 +436,8 @@ class FunctionLibrary:
     
     def __init__(self):
         self.functions = {}
+        self.active_graph = None  # FunctionGraph текущей сцены (общие подвыражения)
+        self.scalars = scalars  # Скалярные функции для выражений (общие для процесса)
         self._register_builtin_functions()
         self._register_advanced_functions()
     
@@ -318,6 +459,7 @@ class FunctionLibrary:
         self.register('sum', SumFunction(self))
         self.register('multiply', MultiplyFunction(self))
         self.register('morph', MorphFunction(self))
+        self.register('blend', BlendFunction(self))
         self.register('directed_line', DirectedLineFunction(self))
         
         print(f"✓ Registered built-in functions")
@@ -328,7 +470,7 @@ class FunctionLibrary:
             from .advanced_functions import (
                 EllipseFunction, SuperEllipseFunction, HypocycloidFunction,
                 EpicycloidFunction, LissajousFunction, ButterflyFunction,
-                CardioidFunction, RoseFunction
+                CardioidFunction, RoseFunction, NoiseFunction, FbmFunction
             )
             
             # Создаем и регистрируем продвинутые функции
@@ -340,6 +482,8 @@ class FunctionLibrary:
             butterfly = ButterflyFunction()
             cardioid = CardioidFunction()
             rose = RoseFunction()
+            noise = NoiseFunction()
+            fbm = FbmFunction()
             
             # Регистрируем
             self.register('ellipse', ellipse)
@@ -350,6 +494,8 @@ class FunctionLibrary:
             self.register('butterfly', butterfly)
             self.register('cardioid', cardioid)
             self.register('rose', rose)
+            self.register('noise', noise)
+            self.register('fbm', fbm)
             
             # Альтернативные имена
             self.register('astroida', hypocycloid)
@@ -367,23 +513,76 @@ class FunctionLibrary:
         # Убедимся, что функция имеет ссылку на библиотеку
         func.function_lib = self
     
+    def register_scalar(self, name: str, func, per_frame: bool = False):
+        """
+        Регистрация функции, возвращающей число: вызывается из выражений
+        per_frame - результат зависит не только от аргументов (время, состояние)
+        """
+        self.scalars.register(name, func, per_frame)
+    
     def get(self, name: str) -> FunctionBase:
         """Получение функции по имени"""
         if name not in self.functions:
-            print(f"⚠ Function '{name}' not found, using 'circle' as fallback")
+            if hot_log.enabled:
+                hot_log.report('function', name, KeyError("not found, using 'circle' as fallback"))
             return self.functions.get('circle')
         return self.functions[name]
     
     def evaluate(self, function_name: str, params: Dict[str, Any], 
                 context: Dict[str, Any]) -> List[float]:
         """Вычисляет функцию по имени"""
-        func = self.get(function_name)
+        graph = self.active_graph
+        node = graph.node_for(params) if graph is not None else None
         try:
-            return func.evaluate(params, context)
+            if node is not None:
+                return graph.value(node, context)
+            return self.get(function_name).evaluate(params, context)
         except Exception as e:
-            print(f"⚠ Error evaluating '{function_name}': {e}")
+            if hot_log.enabled:
+                hot_log.report('evaluate', function_name, e)
             return [0.0, 0.0]
     
+    def evaluate_batch(self, function_name: str, params: Dict[str, Any],
+                       contexts: List[Dict[str, Any]]) -> List[List[float]]:
+        """Вычисляет функцию по имени для пакета контекстов"""
+        try:
+            return self.evaluate_child_batch(params, contexts, default=function_name)
+        except Exception as e:
+            if hot_log.enabled:
+                hot_log.report('evaluate', function_name, e)
+            return [[0.0, 0.0] for _ in contexts]
+    
+    def evaluate_child_batch(self, config: Dict[str, Any], contexts: List[Dict[str, Any]],
+                             default: str = 'circle') -> List[List[float]]:
+        """Пакетная версия evaluate_child"""
+        graph = self.active_graph
+        if graph is not None:
+            node = graph.node_for(config)
+            if node is not None:
+                return graph.value_batch(node, contexts)
+        
+        func = self.get(config.get('func', default))
+        return func.evaluate_batch(config, contexts)
+    
+    def evaluate_child(self, config: Dict[str, Any], context: Dict[str, Any],
+                       default: str = 'circle') -> List[float]:
+        """
+        Вычисляет вложенную функцию композитной функции
+        Если конфиг есть в графе сцены - значение берется из графа (один раз на n, time)
+        """
+        graph = self.active_graph
+        if graph is not None:
+            node = graph.node_for(config)
+            if node is not None:
+                return graph.value(node, context)
+        
+        func = self.get(config.get('func', default))
+        return func.evaluate(config, context)
+    
     def list_functions(self):
         """Список всех доступных функций"""
-        return sorted(list(self.functions.keys()))
\ No newline at end of file
+        return sorted(list(self.functions.keys()))
+    
+    def list_scalar_functions(self):
+        """Список функций, доступных внутри выражений"""
+        return self.scalars.list_functions()
\ No newline at end of file
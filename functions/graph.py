@@ -0,0 +1,270 @@
+"""
+graph.py - Граф композиции функций (DAG) с удалением общих подвыражений
+"""
+import json
+from typing import Dict, Any, List, Set, Tuple
+from .expressions import FRAME_NAMES, NON_EXPRESSION_PARAMS, expression_names
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Ключи, в которых композитные функции хранят вложенные конфиги,
+# и функция по умолчанию для конфигов без 'func'
+CHILD_KEYS = {'functions': 'circle', 'from': 'fixed', 'to': 'fixed'}
+
+# Параметры стиля точки - не влияют на координаты
+STYLE_KEYS = ('color', 'alpha')
+
+# Имена контекста кроме n, которые не меняются по кадрам, но различаются
+# между итерациями или сценами (dn при адаптивной выборке, count после set_count)
+STATIC_KEY_NAMES = ('count', 'angle_step', 'dn')
+
+
+class GraphNode:
+    """Узел графа - одна уникальная конфигурация функции"""
+
+    def __init__(self, node_id: int, func_name: str, func, config: Dict[str, Any],
+                 children: List['GraphNode']):
+        self.node_id = node_id
+        self.func_name = func_name
+        self.func = func  # Функция разрешается один раз при построении
+        self.config = config
+        self.children = children
+        self.refs = 0  # Сколько раз конфигурация встречается в сцене
+
+        # Имена контекста, от которых зависит значение (вместе с детьми)
+        self.inputs = _config_inputs(config)
+        for child in children:
+            self.inputs |= child.inputs
+        # Без time/amp/band (и функций с состоянием) значение для n одинаково во всех кадрах
+        self.uses_time = not self.inputs.isdisjoint(FRAME_NAMES)
+        # Что кроме n входит в ключ сохраненного значения статического узла
+        self.key_names = tuple(name for name in STATIC_KEY_NAMES if name in self.inputs)
+
+
+def _config_inputs(config: Dict[str, Any]) -> Set[str]:
+    """Имена, которые читают выражения параметров конфигурации (без детей)"""
+    names = set()
+    for key, value in config.items():
+        if not isinstance(value, str) or key in CHILD_KEYS or key in STYLE_KEYS \
+                or key in NON_EXPRESSION_PARAMS:
+            continue
+        try:
+            names |= expression_names(value)
+        except Exception:
+            # Не разбирается - считаем, что зависит от всего
+            names.add('time')
+    return names
+
+
+def _static_key(node: GraphNode, context: Dict[str, Any]) -> Tuple:
+    """(id узла, n, значения key_names) - n одного и того же значения при другом dn - другая точка"""
+    if not node.key_names:
+        return node.node_id, context['n']
+    return (node.node_id, context['n']) + tuple(context.get(name) for name in node.key_names)
+
+
+def _as_columns(values):
+    """Результат пакета -> массив float64 (N, 2); точки разной длины остаются списком"""
+    try:
+        columns = np.asarray(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        return values
+    return columns if columns.ndim == 2 else values
+
+
+class FunctionGraph:
+    """
+    Граф точек сцены
+
+    Структурно одинаковые конфигурации (например, общий 'from' у нескольких
+    directed_line) сливаются в один узел и вычисляются один раз на (n, time).
+    Узлы хранятся в топологическом порядке: дети раньше родителей.
+    Значения узлов, не зависящих от времени, хранятся между кадрами
+    и считаются один раз на n.
+    Пакеты (value_batch) с numpy хранятся целиком, массивом (N, 2): узел от
+    времени - на кадр для одного списка контекстов, статический - по набору
+    итераций пакета. Поточечные значения (value) - по ключу на точку.
+    """
+
+    def __init__(self, function_lib, points_config: List[Dict[str, Any]]):
+        self.function_lib = function_lib
+        self.nodes = []
+        self._by_key = {}   # канонический ключ -> узел
+        self._node_of = {}  # id(конфиг) -> узел
+        self._values = {}   # (id узла, n, time) -> координаты
+        self._static_values = {}  # (id узла, n, dn/count...) -> координаты узлов без 'time'
+        self._batches = {}         # (id узла, id списка контекстов) -> (контексты, массив) кадра
+        self._static_batches = {}  # (id узла, итерации пакета) -> массив статического узла
+        self._batch_keys = {}      # (id списка контекстов, key_names) -> (контексты, итерации)
+        self.points = [self._lower(config) for config in points_config]
+
+    # ========== ПОСТРОЕНИЕ ==========
+
+    def _lower(self, config: Dict[str, Any], default: str = 'circle') -> GraphNode:
+        """Переводит конфигурацию в узел графа (hash-consing)"""
+        children = []
+        for child_key, child_default in CHILD_KEYS.items():
+            value = config.get(child_key)
+            if isinstance(value, dict):
+                children.append(self._lower(value, child_default))
+            elif isinstance(value, list):
+                children.extend(self._lower(item, child_default)
+                                for item in value if isinstance(item, dict))
+
+        func_name = config.get('func', default)
+        geometry = {k: v for k, v in config.items() if k not in STYLE_KEYS}
+        key = func_name + json.dumps(geometry, sort_keys=True, default=str)
+        node = self._by_key.get(key)
+        if node is None:
+            node = GraphNode(len(self.nodes), func_name, self.function_lib.get(func_name),
+                             config, children)
+            self._by_key[key] = node
+            self.nodes.append(node)  # После детей - топологический порядок
+
+        node.refs += 1
+        self._node_of[id(config)] = node
+        return node
+
+    def node_for(self, config: Dict[str, Any]):
+        """Узел для конфигурации (None, если конфиг не из этой сцены)"""
+        return self._node_of.get(id(config))
+
+    # ========== ВЫЧИСЛЕНИЕ ==========
+
+    def begin_frame(self):
+        """Сбрасывает значения прошлого кадра (статические остаются)"""
+        self._values.clear()
+        self._batches.clear()
+        self._batch_keys.clear()
+
+    def _key(self, node: GraphNode, context: Dict[str, Any]):
+        """Ключ значения: статическим узлам время не нужно, но нужны dn/count, если они читаются"""
+        if node.uses_time:
+            return self._values, (node.node_id, context['n'], context['time'])
+        return self._static_values, _static_key(node, context)
+
+    def invalidate(self, names) -> bool:
+        """
+        Сбрасывает сохраненные значения статических узлов, читающих names
+        (например, count и angle_step при смене count); True - такие узлы были
+        """
+        names = set(names)
+        stale = {node.node_id for node in self.nodes if not node.uses_time and node.inputs & names}
+        if stale:
+            self._static_values = {key: value for key, value in self._static_values.items()
+                                   if key[0] not in stale}
+        # Пакеты прошлого набора итераций больше не запрашиваются
+        self._static_batches.clear()
+        return bool(stale)
+
+    def value(self, node: GraphNode, context: Dict[str, Any]) -> List[float]:
+        """Значение узла для (n, time) из контекста, вычисляется один раз"""
+        values, key = self._key(node, context)
+        result = values.get(key)
+        if result is None:
+            result = node.func.evaluate(node.config, context)
+            values[key] = result
+        return result
+
+    def value_batch(self, node: GraphNode, contexts: List[Dict[str, Any]]):
+        """
+        Значения узла для пакета контекстов
+        С numpy - массив (N, 2), сохраненный на весь пакет: повторный запрос
+        (общий узел, статический узел в следующем кадре) ничего не считает.
+        Массив общий - вызывающие его не меняют
+        """
+        if np is None or not contexts:
+            return self._value_rows(node, contexts)
+
+        if node.uses_time:
+            key = (node.node_id, id(contexts))
+            entry = self._batches.get(key)
+            if entry is None:
+                # Список контекстов хранится с массивом: его id не займет другой пакет
+                entry = (contexts, _as_columns(node.func.evaluate_batch(node.config, contexts)))
+                self._batches[key] = entry
+            return entry[1]
+
+        key = (node.node_id, self._batch_iterations(node, contexts))
+        result = self._static_batches.get(key)
+        if result is None:
+            result = _as_columns(node.func.evaluate_batch(node.config, contexts))
+            self._static_batches[key] = result
+        return result
+
+    def _batch_iterations(self, node: GraphNode, contexts: List[Dict[str, Any]]) -> Tuple:
+        """Ключ набора итераций пакета для статического узла (n и key_names), один на кадр"""
+        cache_key = (id(contexts), node.key_names)
+        entry = self._batch_keys.get(cache_key)
+        if entry is None:
+            if node.key_names:
+                rows = tuple(_static_key(node, context)[1:] for context in contexts)
+            else:
+                rows = tuple(context['n'] for context in contexts)
+            entry = (contexts, rows)
+            self._batch_keys[cache_key] = entry
+        return entry[1]
+
+    def _value_rows(self, node: GraphNode, contexts: List[Dict[str, Any]]) -> List[List[float]]:
+        """Значения пакета по строкам (без numpy); вычисляются только отсутствующие"""
+        node_id = node.node_id
+        if node.uses_time:
+            values = self._values
+            keys = [(node_id, context['n'], context['time']) for context in contexts]
+        else:
+            values = self._static_values
+            if node.key_names:
+                keys = [_static_key(node, context) for context in contexts]
+            else:
+                keys = [(node_id, context['n']) for context in contexts]
+
+        missing = [row for row, key in enumerate(keys) if key not in values]
+        if missing:
+            computed = node.func.evaluate_batch(node.config, [contexts[row] for row in missing])
+            for row, result in zip(missing, computed):
+                values[keys[row]] = result
+
+        return [values[key] for key in keys]
+
+    def evaluate_iteration(self, context: Dict[str, Any]) -> List[Tuple[float, float]]:
+        """Вычисляет все узлы в топологическом порядке и возвращает точки итерации"""
+        for node in self.nodes:
+            self.value(node, context)
+
+        points = []
+        for node in self.points:
+            values, key = self._key(node, context)
+            coords = values[key]
+            points.append((coords[0], coords[1]))
+        return points
+
+    # ========== ДИАГНОСТИКА ==========
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика удаления дубликатов"""
+        total = sum(node.refs for node in self.nodes)
+        unique = len(self.nodes)
+        return {
+            'configs': total,
+            'nodes': unique,
+            'dedup_ratio': total / unique if unique else 1.0,
+            'static_nodes': sum(not node.uses_time for node in self.nodes)
+        }
+
+    def dump(self) -> str:
+        """Текстовый дамп графа"""
+        lines = []
+        for node in self.nodes:
+            params = {k: v for k, v in node.config.items()
+                      if k not in CHILD_KEYS and k not in STYLE_KEYS and k != 'func'}
+            children = ', '.join(f"#{child.node_id}" for child in node.children)
+            inputs = f" <- {children}" if children else ""
+            static = "" if node.uses_time else " static"
+            lines.append(f"#{node.node_id} {node.func_name}{inputs} x{node.refs}{static} {params}")
+
+        roots = ', '.join(f"#{node.node_id}" for node in self.points)
+        lines.append(f"points: {roots}")
+        return '\n'.join(lines)
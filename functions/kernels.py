@@ -0,0 +1,402 @@
+"""
+kernels.py - Пакетные ядра встроенных функций
+
+Бэкенд выбирается при импорте: numba (JIT) -> numpy -> python.
+Ядра написаны в стиле numpy над массивами float64 и компилируются numba
+без изменений; без numpy остается поточечный эталон (evaluate).
+Явный выбор: переменная окружения LINEDRAWER_KERNELS=numba|numpy|python
+
+Выражения в параметрах считаются векторно (имена контекста -> столбцы).
+Результат пакета - массив (N, 2): вызывающие (граф, sum, выборка концов)
+работают с ним целиком, без списков по строкам.
+Строки, где ядро или выражение дали nan/inf, пересчитываются эталоном -
+так ошибки (деление на ноль, домен sqrt и т.п.) ведут себя как раньше
+"""
+import math
+import os
+from array import array
+from operator import itemgetter
+from typing import Dict, Any, List, Optional, Tuple
+from .expressions import compile_expression, evaluate_expression, expression_names
+from .diagnostics import hot_log
+from .noise import noise_array, fbm_array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Меньше этого пакета накладные расходы numpy больше выигрыша
+MIN_BATCH = 16
+
+BACKENDS = ('numba', 'numpy', 'python')
+
+BACKEND = 'python'
+KERNELS = {}
+
+# Выражения, которые нельзя вычислить над массивами (условия, log(x, base) и т.п.)
+_scalar_only = set()
+
+
+# ========== ЯДРА (массивы float64 одинаковой длины) ==========
+
+def _circle(size, angle):
+    return size * np.cos(angle), size * np.sin(angle)
+
+
+def _square(size, angle):
+    quarter = math.pi / 2
+    side = np.mod(np.floor_divide(angle, quarter), 4.0)
+    t = np.mod(angle, quarter) / quarter
+
+    forward = size * (1 - 2 * t)
+    backward = size * (-1 + 2 * t)
+    x = np.where(side == 0, forward, np.where(side == 1, size, np.where(side == 2, backward, -size)))
+    y = np.where(side == 0, size, np.where(side == 1, forward, np.where(side == 2, -size, backward)))
+    return x, y
+
+
+def _ngon_point(sides, size, angle):
+    """Точка многоугольника с целым числом сторон sides (как _get_ngon_point)"""
+    polygon = np.where(sides >= 3, sides, 3.0)
+    side_angle = 2 * math.pi / polygon
+    side = np.mod(np.floor_divide(angle, side_angle), polygon)
+    t = np.mod(angle, side_angle) / side_angle
+
+    angle1 = side * side_angle
+    angle2 = np.mod(side + 1, polygon) * side_angle
+    x1 = size * np.cos(angle1)
+    y1 = size * np.sin(angle1)
+    x = x1 + t * (size * np.cos(angle2) - x1)
+    y = y1 + t * (size * np.sin(angle2) - y1)
+
+    # 2 стороны - отрезок, 1 - точка на окружности, меньше - центр
+    line_t = (angle / (2 * math.pi)) * 2 - 1
+    x = np.where(sides >= 3, x, np.where(sides == 2, size * line_t,
+                 np.where(sides == 1, size * np.cos(angle), 0.0)))
+    y = np.where(sides >= 3, y, np.where(sides == 1, size * np.sin(angle), 0.0))
+    return x, y
+
+
+def _ngon(size, angle, sides):
+    normalized = np.mod(angle, 2 * math.pi)
+
+    # Дробные стороны: интерполяция между floor и ceil (не меньше 2 и 3)
+    whole = sides == np.floor(sides)
+    low = np.floor(sides)
+    high = np.ceil(sides)
+    fraction = sides - low
+    clamp = ~whole & (low < 2)
+    low = np.where(whole, low, np.where(clamp, 2.0, low))
+    high = np.where(whole, low, np.where(clamp, 3.0, high))
+    fraction = np.where(whole, 0.0, np.where(clamp, np.maximum(sides - 2, 0.0), fraction))
+
+    x1, y1 = _ngon_point(low, size, normalized)
+    x2, y2 = _ngon_point(high, size, normalized)
+    return x1 + fraction * (x2 - x1), y1 + fraction * (y2 - y1)
+
+
+def _fixed(x, y):
+    return x + 0.0, y + 0.0
+
+
+def _ellipse(a, b, angle):
+    return a * np.cos(angle), b * np.sin(angle)
+
+
+def _superellipse(a, b, n, angle):
+    n = np.where(np.abs(n) < 0.001, 0.001, n)
+    cos_a = np.cos(angle)
+    sin_a = np.sin(angle)
+    sign_cos = np.where(cos_a >= 0, 1.0, -1.0)
+    sign_sin = np.where(sin_a >= 0, 1.0, -1.0)
+
+    # n >= 2: точка на кривой по радиусу
+    denom = np.abs(cos_a / a) ** n + np.abs(sin_a / b) ** n
+    r = 1.0 / denom ** (1.0 / n)
+    x = np.where(denom > 0, r * cos_a, 0.0)
+    y = np.where(denom > 0, r * sin_a, 0.0)
+    # Эталон делит на a и b только здесь: a == 0 или b == 0 - ошибка, отдаем эталону
+    general = (np.abs(cos_a) >= 0.001) & (np.abs(sin_a) >= 0.001)
+    x = np.where(general & ((a == 0) | (b == 0)), np.nan, x)
+    x = np.where(np.abs(cos_a) < 0.001, 0.0, np.where(np.abs(sin_a) < 0.001, a * sign_cos, x))
+    y = np.where(np.abs(cos_a) < 0.001, b * sign_sin, np.where(np.abs(sin_a) < 0.001, 0.0, y))
+
+    # n < 2: степенная форма
+    power = 2.0 / n
+    x_low = a * sign_cos * np.abs(cos_a) ** power
+    y_low = b * sign_sin * np.abs(sin_a) ** power
+    return np.where(n >= 2, x, x_low), np.where(n >= 2, y, y_low)
+
+
+def _hypocycloid(R, r, angle):
+    ratio = (R - r) / r
+    x = (R - r) * np.cos(angle) + r * np.cos(ratio * angle)
+    y = (R - r) * np.sin(angle) - r * np.sin(ratio * angle)
+    rolling = np.abs(r) > 0.001
+    return np.where(rolling, x, R * np.cos(angle)), np.where(rolling, y, R * np.sin(angle))
+
+
+def _epicycloid(R, r, angle):
+    ratio = (R + r) / r
+    x = (R + r) * np.cos(angle) - r * np.cos(ratio * angle)
+    y = (R + r) * np.sin(angle) - r * np.sin(ratio * angle)
+    rolling = np.abs(r) > 0.001
+    return np.where(rolling, x, R * np.cos(angle)), np.where(rolling, y, R * np.sin(angle))
+
+
+def _lissajous(a, b, A, B, delta, angle):
+    return a * np.sin(A * angle + delta), b * np.sin(B * angle)
+
+
+def _butterfly(size, angle):
+    r = np.exp(np.cos(angle)) - 2 * np.cos(4 * angle) + np.sin(angle / 12) ** 5
+    return size * r * np.cos(angle), size * r * np.sin(angle)
+
+
+def _cardioid(size, angle):
+    r = size * (1 - np.cos(angle))
+    return r * np.cos(angle), r * np.sin(angle)
+
+
+def _rose(k, size, angle):
+    r = np.where(np.abs(k) < 0.001, 0.0, size * np.cos(k * angle))
+    return r * np.cos(angle), r * np.sin(angle)
+
+
+def _by_seed(seed, evaluate):
+    """Значения по группам строк с одинаковым seed (таблицы шума - на seed)"""
+    first = seed[0]
+    if (seed == first).all():
+        return evaluate(slice(None), int(first))
+    values = np.empty(len(seed))
+    for value in np.unique(seed):
+        rows = seed == value
+        values[rows] = evaluate(rows, int(value))
+    return values
+
+
+def _noise(x, y, amplitude, seed):
+    # Вторая координата - шум со следующим seed (независимый от первой)
+    dx = _by_seed(seed, lambda rows, s: noise_array(x[rows], y[rows], s))
+    dy = _by_seed(seed, lambda rows, s: noise_array(x[rows], y[rows], s + 1))
+    return amplitude * dx, amplitude * dy
+
+
+def _fbm(x, y, amplitude, octaves, lacunarity, gain, seed):
+    if not all((column == column[0]).all() for column in (octaves, lacunarity, gain)):
+        # Разные октавы по строкам - nan: строки считает эталон
+        nan = np.full(len(x), np.nan)
+        return nan, nan
+    octaves, lacunarity, gain = int(octaves[0]), float(lacunarity[0]), float(gain[0])
+    dx = _by_seed(seed, lambda rows, s: fbm_array(x[rows], y[rows], octaves, lacunarity, gain, s))
+    dy = _by_seed(seed, lambda rows, s: fbm_array(x[rows], y[rows], octaves, lacunarity, gain, s + 1))
+    return amplitude * dx, amplitude * dy
+
+
+_KERNEL_SOURCES = {
+    'circle': _circle,
+    'square': _square,
+    'ngon': _ngon,
+    'fixed': _fixed,
+    'ellipse': _ellipse,
+    'superellipse': _superellipse,
+    'hypocycloid': _hypocycloid,
+    'epicycloid': _epicycloid,
+    'lissajous': _lissajous,
+    'butterfly': _butterfly,
+    'cardioid': _cardioid,
+    'rose': _rose,
+    'noise': _noise,
+    'fbm': _fbm,
+}
+
+# Ядра с таблицами и лямбдами numba не компилирует: они всегда numpy
+_NUMPY_KERNELS = {'noise', 'fbm'}
+
+
+# ========== ВЫБОР БЭКЕНДА ==========
+
+# Вспомогательные функции, которые ядра вызывают по имени модуля
+_HELPER_SOURCES = {'_ngon_point': _ngon_point}
+
+
+def select_backend(preferred: Optional[str] = None) -> str:
+    """
+    Выбирает бэкенд (по умолчанию - лучший доступный) и собирает ядра
+    Недоступный бэкенд заменяется следующим по списку
+    """
+    global BACKEND, KERNELS
+
+    order = BACKENDS[BACKENDS.index(preferred):] if preferred in BACKENDS else BACKENDS
+    for backend in order:
+        if backend == 'numba' and numba is not None and np is not None:
+            wrap = numba.njit(cache=True, error_model='numpy')
+            break
+        if backend == 'numpy' and np is not None:
+            wrap = None
+            break
+        if backend == 'python':
+            wrap = None
+            break
+
+    if backend == 'python':
+        KERNELS = {}
+    else:
+        # Ядра numba резолвят помощников как глобальные имена при компиляции
+        for name, helper in _HELPER_SOURCES.items():
+            globals()[name] = wrap(helper) if wrap else helper
+        KERNELS = {name: wrap(kernel) if wrap and name not in _NUMPY_KERNELS else kernel
+                   for name, kernel in _KERNEL_SOURCES.items()}
+
+    BACKEND = backend
+    return BACKEND
+
+
+# ========== ПАКЕТНОЕ ВЫЧИСЛЕНИЕ ==========
+
+if np is not None:
+    # Те же имена, что и в SAFE_FUNCTIONS, но над массивами
+    ARRAY_FUNCTIONS = {
+        'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+        'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+        'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+        'pi': math.pi, 'e': math.e, 'tau': math.tau, 'sqrt': np.sqrt,
+        'abs': np.abs, 'pow': np.power, 'exp': np.exp,
+        'log': np.log, 'log10': np.log10,
+        'floor': np.floor, 'ceil': np.ceil, 'round': np.round,
+        'noise': noise_array, 'fbm': fbm_array,
+    }
+    ARRAY_GLOBALS = {"__builtins__": {}, **ARRAY_FUNCTIONS}
+
+
+class ContextColumns:
+    """
+    Столбцы контекста пакета: строятся только для нужных выражениям имен
+    constants - имена, одинаковые для всего пакета, но не записанные в
+    контексты (point_index у цветов и толщин)
+    """
+
+    def __init__(self, contexts: List[Dict[str, Any]], constants: Optional[Dict[str, float]] = None):
+        self.contexts = contexts
+        self.constants = constants if constants is not None else {}
+        self.columns = {}
+
+    def has(self, name: str) -> bool:
+        return name in self.constants or name in self.contexts[0]
+
+    def get(self, name: str):
+        if name in self.constants:
+            return float(self.constants[name])
+        column = self.columns.get(name)
+        if column is None:
+            first = self.contexts[0].get(name)
+            if isinstance(first, array) and all(
+                    context.get(name) is first for context in self.contexts):
+                # Общий для кадра массив (band) - индексируется как есть
+                column = np.asarray(first)
+            else:
+                column = np.fromiter(map(itemgetter(name), self.contexts), dtype=np.float64,
+                                     count=len(self.contexts))
+                if isinstance(first, (int, float)) and (column == column[0]).all():
+                    # Одинаковое во всех строках (time, count, ...) - скаляр
+                    column = float(column[0])
+            self.columns[name] = column
+        return column
+
+
+def _scalar_column(expr: str, contexts: List[Dict[str, Any]], constants: Optional[Dict[str, float]] = None,
+                   fallback: float = 0.0):
+    """Выражение по одной строке (как _evaluate_expression); ошибка строки - fallback"""
+    values = np.empty(len(contexts))
+    for row, context in enumerate(contexts):
+        if constants:
+            context = dict(context, **constants)
+        try:
+            values[row] = evaluate_expression(expr, context)
+        except Exception as e:
+            if hot_log.enabled:
+                hot_log.report('expression', expr, e)
+            values[row] = fallback
+    return values
+
+
+def param_column(value, columns: ContextColumns, fallback: float = 0.0):
+    """
+    Столбец параметра: число, либо выражение над столбцами контекста
+    (нужен numpy; ядра, цвета и толщины паттернов считаются через него)
+    fallback - значение строк, где выражение бросило исключение
+    """
+    if not isinstance(value, str):
+        return float(value)
+
+    contexts = columns.contexts
+    constants = columns.constants
+    if value in _scalar_only:
+        return _scalar_column(value, contexts, constants, fallback)
+
+    try:
+        code = compile_expression(value)
+        local = {name: columns.get(name) for name in expression_names(value)
+                 if name not in ARRAY_FUNCTIONS and columns.has(name)}
+        with np.errstate(all='ignore'):
+            result = np.asarray(eval(code, ARRAY_GLOBALS, local), dtype=np.float64)
+    except Exception:
+        # Ошибка над массивами - не обязательно ошибка выражения: считаем по строкам
+        _scalar_only.add(value)
+        return _scalar_column(value, contexts, constants, fallback)
+
+    if result.ndim == 0:
+        if not math.isfinite(result):
+            return _scalar_column(value, contexts, constants, fallback)
+        return float(result)
+
+    bad = ~np.isfinite(result)
+    if bad.any():
+        # nan/inf - там, где эталон бросил бы исключение; повторяем его поведение
+        result = result.copy()
+        rows = np.flatnonzero(bad)
+        result[rows] = _scalar_column(value, [contexts[row] for row in rows], constants, fallback)
+    return result
+
+
+def evaluate_kernel_batch(func, params: Dict[str, Any], contexts: List[Dict[str, Any]]):
+    """
+    Вычисляет функцию с ядром (атрибуты KERNEL и KERNEL_PARAMS) для пакета:
+    массив float64 (N, 2) - строки не переводятся в списки
+    Возвращает None, если ядра нет - тогда вызывающий считает по точкам
+    """
+    kernel = KERNELS.get(func.KERNEL)
+    if kernel is None or len(contexts) < MIN_BATCH:
+        return None
+
+    count = len(contexts)
+    columns = ContextColumns(contexts)
+    args = []
+    for name, default in func.KERNEL_PARAMS:
+        column = param_column(params.get(name, default), columns)
+        if isinstance(column, float):
+            column = np.full(count, column)
+        args.append(column)
+
+    with np.errstate(all='ignore'):
+        x, y = kernel(*args)
+
+    points = np.column_stack((x, y)).astype(np.float64, copy=False)
+    bad = ~np.isfinite(points).all(axis=1)
+    for row in np.flatnonzero(bad):
+        points[row] = func.evaluate(params, contexts[row])
+    return points
+
+
+def kernel_info() -> Tuple[str, List[str]]:
+    """Текущий бэкенд и функции, у которых есть ядро"""
+    return BACKEND, sorted(KERNELS)
+
+
+select_backend(os.environ.get('LINEDRAWER_KERNELS'))
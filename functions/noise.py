@@ -0,0 +1,162 @@
+"""
+noise.py - Градиентный шум Перлина и фрактальный шум (fbm)
+
+Таблицы строятся один раз на seed: перестановка (удвоенная, без & 255 на
+втором шаге) и градиенты углов клетки по ячейке перестановки, так что
+градиент - два чтения из таблицы вместо третьей перестановки и ветвлений.
+Скалярная версия нужна выражениям и эталону, пакетная (numpy) считает
+весь столбец точек за один проход
+"""
+import math
+from typing import Dict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 8 градиентов (x, y) по трем младшим битам хэша
+GRADIENTS = ((1, 2), (-1, 2), (1, -2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1))
+
+# Нормировка: значения примерно -1..1
+NOISE_SCALE = 2.0 / 3.0
+
+# Таблицы разных seed в одной сцене (больше - таблицы строятся заново)
+MAX_SEEDS = 64
+
+
+def _permutation(seed: int = 0):
+    """Таблица перестановок градиентного шума (детерминированная)"""
+    values = list(range(256))
+    state = seed * 2654435761 + 1013904223
+    for i in range(255, 0, -1):
+        state = (state * 1103515245 + 12345) & 0x7FFFFFFF
+        j = state % (i + 1)
+        values[i], values[j] = values[j], values[i]
+    return values + values
+
+
+class NoiseTables:
+    """
+    Таблицы одного seed (списки и массивы numpy): перестановка и градиенты
+    grad_x[i], grad_y[i] - градиент хэша permutation[i]
+    """
+
+    __slots__ = ('seed', 'permutation', 'grad_x', 'grad_y', 'permutation_array',
+                 'grad_x_array', 'grad_y_array')
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.permutation = _permutation(seed)
+        self.grad_x = [float(GRADIENTS[h & 7][0]) for h in self.permutation]
+        self.grad_y = [float(GRADIENTS[h & 7][1]) for h in self.permutation]
+        if np is not None:
+            self.permutation_array = np.array(self.permutation, dtype=np.intp)
+            self.grad_x_array = np.array(self.grad_x)
+            self.grad_y_array = np.array(self.grad_y)
+
+
+_tables: Dict[int, NoiseTables] = {}
+
+
+def noise_tables(seed: int = 0) -> NoiseTables:
+    """Таблицы seed (строятся при первом обращении)"""
+    tables = _tables.get(seed)
+    if tables is None:
+        if len(_tables) >= MAX_SEEDS:
+            _tables.clear()
+        tables = _tables[seed] = NoiseTables(seed)
+    return tables
+
+
+# ========== СКАЛЯРНЫЕ ==========
+
+def _fade(t: float) -> float:
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def noise(x: float, y: float = 0.0, seed: float = 0) -> float:
+    """Градиентный шум Перлина, примерно -1..1 (0 в целых точках)"""
+    tables = _tables.get(seed) or noise_tables(int(seed))
+    xi = math.floor(x)
+    yi = math.floor(y)
+    xf = x - xi
+    yf = y - yi
+    xi &= 255
+    yi &= 255
+    p = tables.permutation
+    gx = tables.grad_x
+    gy = tables.grad_y
+    a = p[xi] + yi
+    b = p[xi + 1] + yi
+    u = _fade(xf)
+    v = _fade(yf)
+    n00 = gx[a] * xf + gy[a] * yf
+    n10 = gx[b] * (xf - 1) + gy[b] * yf
+    n01 = gx[a + 1] * xf + gy[a + 1] * (yf - 1)
+    n11 = gx[b + 1] * (xf - 1) + gy[b + 1] * (yf - 1)
+    x1 = n00 + u * (n10 - n00)
+    x2 = n01 + u * (n11 - n01)
+    return (x1 + v * (x2 - x1)) * NOISE_SCALE
+
+
+def fbm(x: float, y: float = 0.0, octaves: float = 4, lacunarity: float = 2.0,
+        gain: float = 0.5, seed: float = 0) -> float:
+    """Сумма октав шума (фрактальный шум), примерно -1..1"""
+    total = 0.0
+    amplitude = 1.0
+    norm = 0.0
+    for _ in range(max(1, int(octaves))):
+        total += noise(x, y, seed) * amplitude
+        norm += amplitude
+        amplitude *= gain
+        x *= lacunarity
+        y *= lacunarity
+    return total / norm
+
+
+# ========== ПАКЕТНЫЕ (numpy) ==========
+
+def noise_array(x, y=0.0, seed=0):
+    """
+    noise над массивами (x и y - массивы или числа, приводятся к общей форме)
+    seed - одно число на пакет (иначе TypeError - вызывающий считает по строкам)
+    """
+    tables = noise_tables(int(seed))
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+    x0 = np.floor(x)
+    y0 = np.floor(y)
+    xf = x - x0
+    yf = y - y0
+    xi = x0.astype(np.intp) & 255
+    yi = y0.astype(np.intp) & 255
+    p = tables.permutation_array
+    gx = tables.grad_x_array
+    gy = tables.grad_y_array
+    a = p[xi] + yi
+    b = p[xi + 1] + yi
+    u = xf * xf * xf * (xf * (xf * 6 - 15) + 10)
+    v = yf * yf * yf * (yf * (yf * 6 - 15) + 10)
+    n00 = gx[a] * xf + gy[a] * yf
+    n10 = gx[b] * (xf - 1) + gy[b] * yf
+    n01 = gx[a + 1] * xf + gy[a + 1] * (yf - 1)
+    n11 = gx[b + 1] * (xf - 1) + gy[b + 1] * (yf - 1)
+    x1 = n00 + u * (n10 - n00)
+    x2 = n01 + u * (n11 - n01)
+    return (x1 + v * (x2 - x1)) * NOISE_SCALE
+
+
+def fbm_array(x, y=0.0, octaves=4, lacunarity=2.0, gain=0.5, seed=0):
+    """fbm над массивами; octaves, lacunarity, gain и seed - числа на весь пакет"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    total = 0.0
+    amplitude = 1.0
+    norm = 0.0
+    for _ in range(max(1, int(octaves))):
+        total = total + noise_array(x, y, seed) * amplitude
+        norm += amplitude
+        amplitude *= float(gain)
+        x = x * lacunarity
+        y = y * lacunarity
+    return total / norm
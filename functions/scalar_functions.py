@@ -0,0 +1,212 @@
+"""
+scalar_functions.py - Функции, возвращающие одно число, для строк параметров
+
+Шум, сглаживание (easing), формы волн и сглаженные сигналы аудио доступны
+в выражениях наравне с time, n и angle_step: "size": "100 + 40 * noise(n * 0.1, time)"
+(шум и его версии над массивами - в noise.py)
+
+Результаты запоминаются на (функция, аргументы, кадр): один и тот же вызов
+в size/angle разных точек считается один раз. Кадр сбрасывается увеличением
+счетчика - O(1), старые записи просто перестают совпадать
+"""
+import math
+import threading
+from typing import Callable, Dict
+from .expressions import FRAME_NAMES, register_callable
+from .noise import noise, fbm
+
+# Больше записей - словарь памяти пересоздается в начале кадра
+MAX_MEMO_ENTRIES = 1 << 16
+
+
+class ScalarFunction:
+    """Зарегистрированная скалярная функция"""
+
+    __slots__ = ('name', 'func', 'per_frame', 'doc')
+
+    def __init__(self, name: str, func: Callable[..., float], per_frame: bool = False):
+        self.name = name
+        self.func = func
+        # Зависит от кадра (время, аудио, состояние) - не от одних аргументов
+        self.per_frame = per_frame
+        self.doc = (func.__doc__ or '').strip()
+
+
+class ScalarLibrary:
+    """
+    Реестр скалярных функций и их память на кадр
+
+    Память - словарь (имя, аргументы) -> (кадр, значение); запись верна,
+    только если ее кадр равен текущему. begin_frame увеличивает счетчик
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self.frame = 0
+        self.time = 0.0
+        self.dt = 0.0
+        self.amp = 0.0
+        self.band = ()
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+        self._state = {}  # Состояние функций с памятью между кадрами (сглаживание)
+        self._lock = threading.Lock()  # Промахи памяти из потоков compute_endpoints
+
+    def register(self, name: str, func: Callable[..., float], per_frame: bool = False):
+        """Регистрирует функцию и делает ее доступной в выражениях"""
+        self.functions[name] = ScalarFunction(name, func, per_frame)
+        register_callable(name, self._memoized(name, func))
+        if per_frame:
+            FRAME_NAMES.add(name)
+
+    def _memoized(self, name: str, func: Callable[..., float]):
+        def call(*args):
+            memo = self._memo  # Словарь может смениться в begin_frame
+            key = (name, args)
+            entry = memo.get(key)
+            if entry is not None and entry[0] == self.frame:
+                self.hits += 1
+                return entry[1]
+            # Промах - под блокировкой: при вычислении частями в потоках функция
+            # с состоянием (сглаживание) не должна продвинуться дважды за кадр
+            with self._lock:
+                entry = memo.get(key)
+                if entry is not None and entry[0] == self.frame:
+                    self.hits += 1
+                    return entry[1]
+                value = float(func(*args))
+                memo[key] = (self.frame, value)
+                self.misses += 1
+            return value
+
+        call.__name__ = name
+        call.__doc__ = func.__doc__
+        return call
+
+    def begin_frame(self, current_time: float, amp: float = 0.0, band=()):
+        """Новый кадр: память прошлого кадра больше не совпадает (O(1))"""
+        self.frame += 1
+        if len(self._memo) > MAX_MEMO_ENTRIES:
+            self._memo = {}
+        self.dt = max(0.0, current_time - self.time) if self.frame > 1 else 0.0
+        self.time = current_time
+        self.amp = amp
+        self.band = band
+
+    def reset(self):
+        """Сбрасывает состояние сглаживания (при перезагрузке конфигурации)"""
+        self._state.clear()
+        self._memo = {}
+        self.frame = 0
+
+    def snapshot(self):
+        """Состояние сглаживания и время кадра (для перемотки, см. timeline.py)"""
+        return dict(self._state), self.time
+
+    def restore(self, snapshot):
+        """
+        Возвращает состояние снимка: следующий кадр сглаживает от момента снимка
+        (dt = время кадра - время снимка), а не с нуля
+        """
+        state, current_time = snapshot
+        self._state = dict(state)
+        self._memo = {}  # Значения сглаживания после снимка больше не верны
+        self.time = current_time
+        self.frame = max(self.frame, 1)
+
+    def stats(self) -> Dict[str, int]:
+        return {'functions': len(self.functions), 'hits': self.hits, 'misses': self.misses}
+
+    def list_functions(self):
+        return sorted(self.functions)
+
+    # ========== СГЛАЖЕННЫЕ СИГНАЛЫ ==========
+
+    def _smooth(self, key, value: float, seconds: float) -> float:
+        """Экспоненциальное сглаживание с постоянной времени seconds"""
+        previous = self._state.get(key)
+        if previous is None or seconds <= 0:
+            smoothed = value
+        else:
+            smoothed = previous + (value - previous) * (1 - math.exp(-self.dt / seconds))
+        self._state[key] = smoothed
+        return smoothed
+
+    def smooth_amp(self, seconds: float = 0.2) -> float:
+        """Громкость amp, сглаженная за seconds"""
+        return self._smooth(('amp', seconds), self.amp, seconds)
+
+    def smooth_band(self, k: float, seconds: float = 0.2) -> float:
+        """Полоса band[k], сглаженная за seconds"""
+        k = int(k)
+        value = self.band[k] if 0 <= k < len(self.band) else 0.0
+        return self._smooth(('band', k, seconds), value, seconds)
+
+
+# ========== СГЛАЖИВАНИЕ И ФОРМЫ ВОЛН ==========
+
+def clamp(x: float, low: float = 0.0, high: float = 1.0) -> float:
+    """x в пределах [low, high]"""
+    return min(max(x, low), high)
+
+
+def lerp(a: float, b: float, t: float) -> float:
+    """Линейная интерполяция от a к b"""
+    return a + (b - a) * t
+
+
+def smoothstep(edge0: float, edge1: float, x: float) -> float:
+    """Плавный переход 0 -> 1 между edge0 и edge1"""
+    if edge0 == edge1:
+        return 0.0 if x < edge0 else 1.0
+    t = clamp((x - edge0) / (edge1 - edge0))
+    return t * t * (3 - 2 * t)
+
+
+def ease_in(t: float) -> float:
+    """Квадратичный разгон (t в 0..1)"""
+    t = clamp(t)
+    return t * t
+
+
+def ease_out(t: float) -> float:
+    """Квадратичное торможение (t в 0..1)"""
+    t = clamp(t)
+    return 1 - (1 - t) * (1 - t)
+
+
+def ease_in_out(t: float) -> float:
+    """Кубический разгон и торможение (t в 0..1)"""
+    t = clamp(t)
+    return 4 * t * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2
+
+
+def saw(x: float) -> float:
+    """Пила с периодом 1: 0..1"""
+    return x - math.floor(x)
+
+
+def tri(x: float) -> float:
+    """Треугольная волна с периодом 1: 0..1..0"""
+    return 1 - abs(2 * saw(x) - 1)
+
+
+def pulse(x: float, duty: float = 0.5) -> float:
+    """Прямоугольная волна с периодом 1: 1 на доле duty периода, иначе 0"""
+    return 1.0 if saw(x) < duty else 0.0
+
+
+BUILTIN_SCALARS = {
+    'noise': noise, 'fbm': fbm,
+    'clamp': clamp, 'lerp': lerp, 'smoothstep': smoothstep,
+    'ease_in': ease_in, 'ease_out': ease_out, 'ease_in_out': ease_in_out,
+    'saw': saw, 'tri': tri, 'pulse': pulse,
+}
+
+# Общая библиотека: выражения вычисляются с общими глобальными именами
+scalars = ScalarLibrary()
+for _name, _func in BUILTIN_SCALARS.items():
+    scalars.register(_name, _func)
+scalars.register('smooth_amp', scalars.smooth_amp, per_frame=True)
+scalars.register('smooth_band', scalars.smooth_band, per_frame=True)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Галерея: проверка и headless рендер многих сцен параллельно
+Запуск: python gallery.py scenes/ [--frames 4] [--workers 4] [--timeout 30] [--memory 1024]
+        [--out gallery] [--budget-ms 5]
+
+Источник - каталог *.json или файл с несколькими сценами подряд (как ex.txt).
+Каждая сцена считается в своем процессе (одновременно не больше --workers):
+зависшая убивается по --timeout, адресное пространство ограничено --memory
+(сверх уже занятого при импорте). Результат в --out:
+- contact_sheet.ppm: строка на сцену, столбец на кадр (красная строка - сцена упала)
+- report.json: статус, ошибки проверки и стоимость вычисления каждой сцены
+Секция 'audio' не используется: band[k] и amp в галерее равны 0
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Tuple
+from raster import CpuCanvas
+
+# Ограничение памяти процесса - только там, где есть resource (Unix)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BACKGROUND = (0, 0, 0)
+SHEET_BACKGROUND = (32, 32, 32)
+FAILED_TILE = (96, 0, 0)
+PADDING = 4
+
+# Сколько последних строк вывода сцены попадает в отчет при ошибке
+LOG_TAIL = 20
+
+
+class GalleryOptions:
+    """Параметры рендера, одинаковые для всех сцен (передаются в процессы)"""
+
+    def __init__(self, width: int = 800, height: int = 600, frames: int = 4, duration: float = 2.0,
+                 scale: float = 0.25, timeout: float = 30.0, memory_mb: int = 1024):
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.duration = duration
+        self.scale = scale
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+
+    @property
+    def thumb_size(self) -> Tuple[int, int]:
+        return max(1, int(self.width * self.scale)), max(1, int(self.height * self.scale))
+
+    def frame_times(self) -> List[float]:
+        """Моменты кадров: равномерно на [0, duration)"""
+        return [self.duration * index / self.frames for index in range(self.frames)]
+
+
+# ========== ПРОЦЕСС СЦЕНЫ ==========
+
+def _limit_memory(megabytes: int):
+    """Адресное пространство: уже занятое (интерпретатор, numpy) плюс megabytes"""
+    if resource is None or megabytes <= 0:
+        return
+    used = 0
+    try:
+        with open('/proc/self/statm') as f:
+            used = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    limit = used + megabytes * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _peak_memory_mb() -> float:
+    """Пик резидентной памяти процесса (ru_maxrss: КБ в Linux, байты в macOS)"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def render_scene(name: str, data: Dict[str, Any], options: GalleryOptions):
+    """
+    Проверка и рендер одной сцены в текущем процессе
+    Возвращает (запись отчета, [RGB кадра миниатюры])
+    """
+    from engine import ParametricEngine
+    from headless import HeadlessRenderer
+
+    config = data.get('parametric_lines', {})
+    config.pop('audio', None)
+    result = {'name': name, 'status': 'ok', 'pattern': config.get('pattern', 'connect')}
+
+    start = time.perf_counter()
+    engine = ParametricEngine(options.width, options.height, headless=True)
+    engine.load_config(data)
+    result['load_ms'] = (time.perf_counter() - start) * 1000
+
+    report = engine.validation
+    result['errors'] = [f"{path}: {message}" for path, message in report.errors]
+    result['warnings'] = [f"{path}: {message}" for path, message in report.warnings]
+    result['expressions'] = report.expressions
+    if report.errors:
+        result['status'] = 'invalid'  # Рендерится план с исправлениями, но сцену надо чинить
+
+    pattern = engine.current_pattern
+    result['lines'] = pattern.get_line_count()
+    result['graph_nodes'] = pattern.graph.stats()['nodes']
+
+    renderer = HeadlessRenderer(engine, BACKGROUND, options.scale)
+    # Первое вычисление компилирует ядра (numba) - в стоимость кадра не входит
+    renderer.evaluate(0.0)
+    eval_ms = []
+    raster_ms = []
+    frames = []
+    for current_time in options.frame_times():
+        start = time.perf_counter()
+        frame = renderer.evaluate(current_time)
+        middle = time.perf_counter()
+        canvas = renderer.draw(frame)
+        eval_ms.append((middle - start) * 1000)
+        raster_ms.append((time.perf_counter() - middle) * 1000)
+        frames.append(bytes(canvas.pixels))
+
+    result['eval_ms'] = eval_ms
+    result['eval_ms_mean'] = sum(eval_ms) / len(eval_ms) if eval_ms else 0.0
+    result['eval_ms_max'] = max(eval_ms, default=0.0)
+    result['raster_ms_mean'] = sum(raster_ms) / len(raster_ms) if raster_ms else 0.0
+    result['eval_us_per_line'] = result['eval_ms_mean'] * 1000 / max(1, result['lines'])
+    result['peak_memory_mb'] = _peak_memory_mb()
+    return result, frames
+
+
+def _scene_process(name: str, data: Dict[str, Any], options: GalleryOptions, connection):
+    """Точка входа процесса сцены: результат или ошибка уходят в connection"""
+    log = io.StringIO()
+    try:
+        _limit_memory(options.memory_mb)
+        # Без окна: pyglet.gl не должен создавать скрытое окно при импорте
+        try:
+            import pyglet
+            pyglet.options['shadow_window'] = False
+        except ImportError:
+            pass
+        with contextlib.redirect_stdout(log):
+            result, frames = render_scene(name, data, options)
+    except MemoryError:
+        result, frames = {'name': name, 'status': 'memory',
+                          'error': f"over {options.memory_mb} MB"}, []
+    except Exception as e:
+        result, frames = {'name': name, 'status': 'error', 'error': f"{type(e).__name__}: {e}",
+                          'traceback': traceback.format_exc()}, []
+    if result['status'] != 'ok':
+        result['log'] = log.getvalue().splitlines()[-LOG_TAIL:]
+    connection.send((result, frames))
+    connection.close()
+
+
+# ========== ПУЛ ПРОЦЕССОВ ==========
+
+def run_gallery(scenes: List[Tuple[str, Dict[str, Any]]], options: GalleryOptions,
+                workers: int = 0) -> List[Tuple[Dict[str, Any], List[bytes]]]:
+    """
+    Считает сцены в отдельных процессах, не больше workers одновременно
+    Процесс на сцену (а не общий пул): зависший или раздувшийся убивается
+    без последствий для остальных. Результаты - в порядке scenes
+    """
+    workers = workers or os.cpu_count() or 1
+    results = [None] * len(scenes)
+    pending = list(range(len(scenes)))
+    pending.reverse()
+    running = {}  # connection -> (индекс сцены, процесс, время запуска)
+
+    while pending or running:
+        while pending and len(running) < workers:
+            index = pending.pop()
+            name, data = scenes[index]
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_scene_process, name=f"gallery-{name}",
+                                              args=(name, data, options, sender), daemon=True)
+            process.start()
+            sender.close()  # В родителе конец писателя не нужен: EOF при падении процесса
+            running[receiver] = (index, process, time.monotonic())
+
+        for connection in wait(list(running), timeout=0.1):
+            index, process, started = running.pop(connection)
+            try:
+                result, frames = connection.recv()
+            except EOFError:
+                process.join()
+                result, frames = {'name': scenes[index][0], 'status': 'crashed',
+                                  'error': f"process exited with code {process.exitcode}"}, []
+            result['wall_ms'] = (time.monotonic() - started) * 1000
+            connection.close()
+            process.join()
+            results[index] = (result, frames)
+            _print_result(result)
+
+        now = time.monotonic()
+        for connection, (index, process, started) in list(running.items()):
+            if now - started > options.timeout:
+                process.kill()
+                process.join()
+                connection.close()
+                del running[connection]
+                result = {'name': scenes[index][0], 'status': 'timeout',
+                          'error': f"over {options.timeout:g} s", 'wall_ms': (now - started) * 1000}
+                results[index] = (result, [])
+                _print_result(result)
+
+    return results
+
+
+def _print_result(result: Dict[str, Any]):
+    if result['status'] == 'ok':
+        print(f"✓ {result['name']}: {result['lines']} lines, "
+              f"eval {result['eval_ms_mean']:.2f} ms/frame")
+    else:
+        detail = result.get('error') or f"{len(result.get('errors', []))} validation errors"
+        print(f"⚠ {result['name']}: {result['status']} ({detail})")
+
+
+# ========== ВЫВОД ==========
+
+def contact_sheet(results: List[Tuple[Dict[str, Any], List[bytes]]],
+                  options: GalleryOptions) -> CpuCanvas:
+    """Строка на сцену, столбец на кадр; упавшие сцены - строка красных клеток"""
+    thumb_width, thumb_height = options.thumb_size
+    sheet = CpuCanvas(PADDING + options.frames * (thumb_width + PADDING),
+                      PADDING + len(results) * (thumb_height + PADDING), SHEET_BACKGROUND)
+    failed = bytes(FAILED_TILE) * (thumb_width * thumb_height)
+    for row, (result, frames) in enumerate(results):
+        result['row'] = row
+        y = PADDING + row * (thumb_height + PADDING)
+        for column in range(options.frames):
+            pixels = frames[column] if column < len(frames) else failed
+            sheet.blit(pixels, thumb_width, thumb_height, PADDING + column * (thumb_width + PADDING), y)
+    return sheet
+
+
+def write_report(path: str, results: List[Tuple[Dict[str, Any], List[bytes]]],
+                 options: GalleryOptions, budget_ms: float):
+    """JSON отчет: параметры, сводка и записи сцен (сортировка по стоимости - в summary)"""
+    scenes = [result for result, _ in results]
+    rendered = [scene for scene in scenes if 'eval_ms_mean' in scene]
+    for scene in rendered:
+        scene['over_budget'] = budget_ms > 0 and scene['eval_ms_mean'] > budget_ms
+    statuses = {}
+    for scene in scenes:
+        statuses[scene['status']] = statuses.get(scene['status'], 0) + 1
+
+    report = {
+        'options': {'width': options.width, 'height': options.height, 'frames': options.frames,
+                    'duration': options.duration, 'scale': options.scale,
+                    'timeout': options.timeout, 'memory_mb': options.memory_mb,
+                    'budget_ms': budget_ms},
+        'summary': {
+            'scenes': len(scenes),
+            'statuses': statuses,
+            'most_expensive': [scene['name'] for scene in
+                               sorted(rendered, key=lambda scene: -scene['eval_ms_mean'])[:10]],
+            'over_budget': [scene['name'] for scene in rendered if scene['over_budget']],
+        },
+        'scenes': scenes,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+def main():
+    from config_loader import ConfigLoader
+
+    parser = argparse.ArgumentParser(description="Validate and render many scenes in parallel")
+    parser.add_argument('source', nargs='?', default='ex.txt',
+                        help="directory of *.json or a file with several JSON scenes")
+    parser.add_argument('--width', type=int, default=800, help="scene width")
+    parser.add_argument('--height', type=int, default=600, help="scene height")
+    parser.add_argument('--frames', type=int, default=4, help="sample frames per scene")
+    parser.add_argument('--duration', type=float, default=2.0, help="seconds covered by the frames")
+    parser.add_argument('--scale', type=float, default=0.25, help="thumbnail size relative to the scene")
+    parser.add_argument('--workers', type=int, default=0, help="parallel processes (0 - CPU count)")
+    parser.add_argument('--timeout', type=float, default=30.0, help="seconds per scene")
+    parser.add_argument('--memory', type=int, default=1024, help="MB per scene (0 - no limit)")
+    parser.add_argument('--budget-ms', type=float, default=0.0,
+                        help="flag scenes whose evaluation takes longer per frame")
+    parser.add_argument('--out', default='gallery')
+    args = parser.parse_args()
+
+    scenes = ConfigLoader.load_scenes(args.source)
+    if not scenes:
+        return
+    options = GalleryOptions(args.width, args.height, args.frames, args.duration,
+                             args.scale, args.timeout, args.memory)
+
+    start = time.perf_counter()
+    results = run_gallery(scenes, options, args.workers)
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(args.out, exist_ok=True)
+    sheet = contact_sheet(results, options)
+    sheet.save_ppm(os.path.join(args.out, 'contact_sheet.ppm'))
+    report = write_report(os.path.join(args.out, 'report.json'), results, options, args.budget_ms)
+
+    summary = report['summary']
+    print(f"Rendered {summary['scenes']} scenes in {elapsed:.1f} s: {summary['statuses']}")
+    if summary['over_budget']:
+        print(f"⚠ Over {args.budget_ms:g} ms/frame: {', '.join(summary['over_budget'])}")
+    print(f"Saved contact sheet and report to {args.out}")
+    if any(result['status'] != 'ok' for result, _ in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Headless рендер: те же вычисления, что и в окне, но растеризация на CPU
+Запуск: python headless.py config.json --frames 10 --fps 30 --out frames/
+"""
+import argparse
+import os
+from typing import Tuple
+from raster import CpuCanvas
+
+
+class HeadlessRenderer:
+    """
+    Рисует кадры движка на CpuCanvas (с тем же следом, что и GPU путь)
+    scale - размер холста относительно окна движка (миниатюры)
+    """
+
+    def __init__(self, engine, background: Tuple[int, int, int] = (0, 0, 0), scale: float = 1.0):
+        self.engine = engine
+        self.scale = scale
+        self.canvas = CpuCanvas(*self._canvas_size(), background)
+
+    def _canvas_size(self) -> Tuple[int, int]:
+        return (max(1, int(self.engine.width * self.scale)),
+                max(1, int(self.engine.height * self.scale)))
+
+    def render(self, current_time: float) -> CpuCanvas:
+        """Рисует кадр на момент current_time"""
+        return self.draw(self.evaluate(current_time))
+
+    def evaluate(self, current_time: float):
+        """Данные кадра без растеризации: (концы, цвета, толщины или None); None - нет паттерна"""
+        engine = self.engine
+        pattern = engine.current_pattern
+        if pattern is None:
+            return None
+
+        pattern.begin_frame(current_time)
+        endpoints = engine.frame_endpoints(current_time)
+        colors = pattern.compute_colors(current_time)
+        widths = pattern.compute_widths(current_time) if pattern.renderer_kind() == 'thick' else None
+        return endpoints, colors, widths
+
+    def draw(self, frame) -> CpuCanvas:
+        """Растеризует данные кадра из evaluate"""
+        engine = self.engine
+
+        if (self.canvas.width, self.canvas.height) != self._canvas_size():
+            self.canvas = CpuCanvas(*self._canvas_size(), self.canvas.background)
+
+        # След: гасим прошлый кадр вместо очистки
+        if engine.trail_fade is None:
+            self.canvas.clear()
+        else:
+            self.canvas.fade(engine.trail_fade)
+
+        if frame is None:
+            return self.canvas
+
+        endpoints, colors, widths = frame
+        center_x, center_y = engine.current_pattern.get_center()
+        scale = self.scale
+        if widths is not None:
+            if scale < 1:
+                # Миниатюра: не тоньше пикселя холста, иначе линии рвутся
+                widths = [max(width, 1 / scale) for width in widths]
+            self.canvas.draw_thick_segments(endpoints, colors, widths, center_x, center_y, scale, scale)
+        else:
+            self.canvas.draw_segments(endpoints, colors, center_x, center_y, scale, scale)
+        return self.canvas
+
+
+def main():
+    try:
+        # Без окна: pyglet.gl не должен создавать скрытое окно при импорте
+        import pyglet
+        pyglet.options['shadow_window'] = False
+    except ImportError:
+        pass
+
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+
+    parser = argparse.ArgumentParser(description="Render frames without a window")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--frames', type=int, default=1)
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--out', default='frames')
+    args = parser.parse_args()
+
+    engine = ParametricEngine(args.width, args.height, headless=True)
+    data = ConfigLoader.load_json(args.config)
+    if not data:
+        return
+    engine.load_config(data)
+
+    os.makedirs(args.out, exist_ok=True)
+    renderer = HeadlessRenderer(engine)
+    for frame in range(args.frames):
+        canvas = renderer.render(frame / args.fps)
+        canvas.save_ppm(os.path.join(args.out, f"frame_{frame:04d}.ppm"))
+
+    print(f"Saved {args.frames} frames to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
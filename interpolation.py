@@ -0,0 +1,134 @@
+"""
+Временная интерполяция: вычисляем граф функций с низкой частотой,
+а для кадров дисплея смешиваем концы линий между ключевыми кадрами
+"""
+import math
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+Endpoints = List[Tuple[float, float, float, float]]
+
+INTERPOLATION_MODES = ('linear', 'catmull_rom')
+
+
+def lerp_endpoints(a: Endpoints, b: Endpoints, u: float) -> Endpoints:
+    """Линейная интерполяция концов линий"""
+    result = []
+    for (ax1, ay1, ax2, ay2), (bx1, by1, bx2, by2) in zip(a, b):
+        result.append((
+            ax1 + (bx1 - ax1) * u,
+            ay1 + (by1 - ay1) * u,
+            ax2 + (bx2 - ax2) * u,
+            ay2 + (by2 - ay2) * u
+        ))
+    return result
+
+
+def catmull_rom_endpoints(p0: Endpoints, p1: Endpoints, p2: Endpoints,
+                          p3: Endpoints, u: float) -> Endpoints:
+    """Интерполяция Катмулла-Рома между p1 и p2"""
+    u2 = u * u
+    u3 = u2 * u
+    # Веса для p0..p3 (равномерный сплайн Катмулла-Рома)
+    w0 = 0.5 * (-u3 + 2 * u2 - u)
+    w1 = 0.5 * (3 * u3 - 5 * u2 + 2)
+    w2 = 0.5 * (-3 * u3 + 4 * u2 + u)
+    w3 = 0.5 * (u3 - u2)
+
+    result = []
+    for a, b, c, d in zip(p0, p1, p2, p3):
+        result.append((
+            w0 * a[0] + w1 * b[0] + w2 * c[0] + w3 * d[0],
+            w0 * a[1] + w1 * b[1] + w2 * c[1] + w3 * d[1],
+            w0 * a[2] + w1 * b[2] + w2 * c[2] + w3 * d[2],
+            w0 * a[3] + w1 * b[3] + w2 * c[3] + w3 * d[3]
+        ))
+    return result
+
+
+def endpoints_error(exact: Endpoints, approx: Endpoints) -> Tuple[float, float]:
+    """
+    Ошибка интерполяции: (максимальное, среднее) отклонение концов линий в пикселях
+    """
+    if not exact:
+        return 0.0, 0.0
+
+    max_error = 0.0
+    total = 0.0
+    for (ex1, ey1, ex2, ey2), (ax1, ay1, ax2, ay2) in zip(exact, approx):
+        d1 = math.hypot(ex1 - ax1, ey1 - ay1)
+        d2 = math.hypot(ex2 - ax2, ey2 - ay2)
+        max_error = max(max_error, d1, d2)
+        total += d1 + d2
+    return max_error, total / (2 * len(exact))
+
+
+class KeyframeBuffer:
+    """
+    Кольцевой буфер ключевых кадров
+
+    Ключ k вычисляется в момент времени k * interval. Так как геометрия -
+    чистая функция от времени, будущие ключи можно вычислить заранее,
+    поэтому интерполяция идет без задержки.
+    """
+
+    def __init__(self, rate: float, mode: str = 'linear'):
+        if mode not in INTERPOLATION_MODES:
+            print(f"⚠ Interpolation '{mode}' not found, using 'linear'. Available: {list(INTERPOLATION_MODES)}")
+            mode = 'linear'
+
+        self.rate = rate
+        self.interval = 1.0 / rate
+        self.mode = mode
+        self.keys = deque(maxlen=4)  # (индекс ключа, концы линий)
+        self.evaluations = 0
+
+        # Статистика ошибки интерполяции
+        self.error_stats = {'max': 0.0, 'mean': 0.0, 'checks': 0}
+
+    def clear(self):
+        """Сброс буфера (после перезагрузки конфигурации)"""
+        self.keys.clear()
+
+    def _needed_keys(self, k: int) -> List[int]:
+        """Индексы ключей, нужные для интервала [k, k+1]"""
+        if self.mode == 'catmull_rom':
+            return [k - 1, k, k + 1, k + 2]
+        return [k, k + 1]
+
+    def _get_key(self, index: int, evaluate: Callable[[float], Endpoints]) -> Endpoints:
+        """Возвращает ключ из буфера или вычисляет его"""
+        for key_index, endpoints in self.keys:
+            if key_index == index:
+                return endpoints
+
+        endpoints = evaluate(index * self.interval)
+        self.evaluations += 1
+
+        # Ключи добавляются по возрастанию; при скачке времени назад начинаем заново
+        if self.keys and index < self.keys[-1][0]:
+            self.keys.clear()
+        self.keys.append((index, endpoints))
+        return endpoints
+
+    def sample(self, current_time: float, evaluate: Callable[[float], Endpoints]) -> Endpoints:
+        """Концы линий в момент current_time, смешанные из ключевых кадров"""
+        position = current_time / self.interval
+        k = math.floor(position)
+        u = position - k
+
+        frames = [self._get_key(index, evaluate) for index in self._needed_keys(k)]
+
+        if self.mode == 'catmull_rom':
+            return catmull_rom_endpoints(frames[0], frames[1], frames[2], frames[3], u)
+        return lerp_endpoints(frames[0], frames[1], u)
+
+    def record_error(self, exact: Endpoints, approx: Endpoints) -> Dict[str, float]:
+        """Сравнивает интерполяцию с точным вычислением и сохраняет статистику"""
+        max_error, mean_error = endpoints_error(exact, approx)
+        self.error_stats = {
+            'max': max_error,
+            'mean': mean_error,
+            'checks': self.error_stats['checks'] + 1
+        }
+        return self.error_stats
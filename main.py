@@ -3,9 +3,13 @@
 Главный файл приложения
 """
 
+import logging
 from core import LineDrawerApp
 
 def main():
+    # Ошибки из цикла кадров идут в лог (с дедупликацией), а не в print
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    
     # Создаем приложение
     app = LineDrawerApp("example_parametric.json", width=1024, height=768)
     
@@ -6,11 +6,13 @@ from .connect import ConnectPattern
 from .connect_all import ConnectAllPattern
 from .connect_to_next import ConnectToNextPattern
 from .connect_closed import ConnectClosedPattern
+from .custom import CustomPattern
 
 __all__ = [
     'BasePattern',
     'ConnectPattern',
     'ConnectAllPattern',
     'ConnectToNextPattern',
-    'ConnectClosedPattern'
+    'ConnectClosedPattern',
+    'CustomPattern'
 ]
\ No newline at end of file
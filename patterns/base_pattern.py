@@ -2,47 +2,286 @@
 Базовый класс для ВСЕХ паттернов
 """
 import math
-import pyglet
+import threading
+from array import array
 from typing import Dict, Any, List, Tuple
+from functions.graph import FunctionGraph
+from functions.diagnostics import hot_log
+from audio import silent_bands
+from .colors import PointColors
+from .widths import SegmentWidths
+from .connectivity import Connectivity, iteration_template, gather_endpoints, gather_vertices, MANY_LINES
+from .culling import SegmentCulling, pack_endpoints, gather, CULL_MARGIN
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Без pyglet паттерны работают в headless режиме (только вычисления)
+try:
+    import pyglet
+    from renderer import LineRenderer, StripRenderer, ThickLineRenderer
+except ImportError:
+    pyglet = None
+    LineRenderer = None
+    StripRenderer = None
+    ThickLineRenderer = None
 
 class BasePattern:
-    """Базовый класс с общей логикой для всех паттернов"""
+    """
+    Общий движок паттернов: паттерн - это правила связности (connectivity.py)
+    Линии - массивы индексов (итерация, точка) обоих концов, построенные при
+    загрузке; кадр - таблица точек всех итераций и одна выборка концов из нее
+    """
+    
+    # Правила связности по умолчанию; 'connectivity' в конфиге их заменяет
+    CONNECTIVITY = [{'type': 'chain'}]
+    
+    # Меньше итераций паттерн не строит (set_count уходит в create_lines)
+    MIN_COUNT = 1
+    
+    # Меньше точек - линий нет
+    MIN_POINTS = 2
+    
+    # Топология буфера: 'lines' - независимые отрезки, 'strip' - ломаные с общими
+    # вершинами (для паттернов, где отрезки итерации идут цепочкой); 'topology' в конфиге
+    TOPOLOGY = 'lines'
+    
+    # Толщина линий, если 'width' не задан
+    DEFAULT_WIDTH = 1.0
+    
+    # Сколько моментов времени проверяет адаптивная выборка для точек от time
+    SAMPLE_TIMES = 8
     
     def __init__(self, function_lib, window_width: int = 800, window_height: int = 600):
         self.function_lib = function_lib
         self.config = {}
         self.batch = None
-        self.lines = []
+        self.connectivity = None  # Connectivity: линии как массивы индексов
+        self._iterations = []  # n каждой итерации (индекс в массивах связности -> n)
+        self.graph = None
+        self.renderer = None
+        self.colors = None
+        self.widths = None
+        self._vertices = []  # (n, индекс точки) для каждой вершины отрезков
+        self._dirty_ranges = None  # [(start, end)] линий, зависящих от времени; None - все
+        self.culling = None  # SegmentCulling при "cull": true - в буфер только видимые отрезки
         self.window_width = window_width
         self.window_height = window_height
         self.auto_center = [window_width // 2, window_height // 2]
+        self._sample_steps = {}  # n -> шаг до следующей выборки (адаптивный режим)
+        self._contexts = {}  # поток -> n -> контекст кадра (между кадрами меняются только time и amp)
+        
+        # Аудио-вход: снимок кадра читается в один массив, на него ссылаются все контексты
+        self.audio = None
+        self._amp = 0.0
+        self._band = silent_bands()
     
     def set_config(self, config: Dict[str, Any]):
         """Установка конфигурации (общая для всех)"""
         self.config = config
         
-        # Автоматически устанавливаем центр, если не задан
+        # Центр не задан - центр окна (следует за размером окна)
         if 'center' not in self.config:
-            self.config['center'] = self.auto_center.copy()
-            print(f"Auto-center: {self.config['center']}")
+            print(f"Auto-center: {self.auto_center}")
+        
+        # Граф функций: общие подвыражения вычисляются один раз на (n, time)
+        self.graph = FunctionGraph(self.function_lib, self.config.get('points', []))
+        self.function_lib.active_graph = self.graph
+        self._contexts = {}
+    
+    def set_audio(self, audio):
+        """Подключает аудио-вход (AudioInput или None) - источник amp и band[k]"""
+        self.audio = audio
+        self._amp = 0.0
+        self._band = silent_bands(audio.bands) if audio is not None else silent_bands()
+        self._contexts = {}
+    
+    def _read_audio(self):
+        """Последний снимок аудио - один раз за кадр, без блокировок и новых объектов"""
+        if self.audio is not None:
+            self._amp = self.audio.read_into(self._band)
     
     def update_window_size(self, width: int, height: int):
-        """Обновление размера окна"""
+        """
+        Обновление размера окна: меняется только смещение рендерера,
+        линии и буферы вершин остаются как есть
+        """
         self.window_width = width
         self.window_height = height
         self.auto_center = [width // 2, height // 2]
+        if self.renderer is not None:
+            self.renderer.set_offset(*self.get_center())
+        if self.culling is not None:
+            self._upload_visible()
+    
+    def get_center(self) -> Tuple[float, float]:
+        """Центр сцены: из конфига или центр окна"""
+        center = self.config.get('center', self.auto_center)
+        return center[0], center[1]
     
-    def set_batch(self, batch: pyglet.graphics.Batch):
-        """Установка batch для рисования"""
+    def set_batch(self, batch: 'pyglet.graphics.Batch'):
+        """Установка batch для рисования (None - headless, без рендерера)"""
         self.batch = batch
+        renderer_class = {'strip': StripRenderer, 'thick': ThickLineRenderer}.get(
+            self.renderer_kind(), LineRenderer)
+        if self.renderer is not None and (self.renderer.batch is not batch
+                                          or type(self.renderer) is not renderer_class):
+            self.renderer.delete()
+            self.renderer = None
+        if self.renderer is None and batch is not None and renderer_class is not None:
+            self.renderer = renderer_class(batch)
+    
+    def topology(self) -> str:
+        """Топология буфера: из конфига ('lines'/'strip') или по умолчанию для паттерна"""
+        topology = self.config.get('topology', self.TOPOLOGY)
+        return topology if topology in ('lines', 'strip') else self.TOPOLOGY
+    
+    def renderer_kind(self) -> str:
+        """
+        'thick' - толстые линии экземплярами (ThickLineRenderer), иначе топология
+        'renderer' в конфиге: 'auto' (по умолчанию) выбирает 'thick', если толщина
+        из конфига - выражение или больше 1: glLineWidth > 1 в core profile часто
+        не поддерживается. Без 'width' в конфиге остается топология паттерна
+        (TOPOLOGY, например strip у connect): DEFAULT_WIDTH рисуется glLineWidth,
+        где он не поддерживается - в 1 пиксель
+        """
+        kind = self.config.get('renderer', 'auto')
+        if kind == 'thick':
+            return 'thick'
+        if kind == 'auto' and 'width' in self.config:
+            width = self.config['width']
+            if isinstance(width, str) or width > 1:
+                return 'thick'
+        return self.topology()
+    
+    def _setup_line_width(self):
+        """line_width - толщина для glLineWidth (выражение там не работает - 1)"""
+        width = self.config.get('width', self.DEFAULT_WIDTH)
+        self.config['line_width'] = 1.0 if isinstance(width, str) else float(width)
+    
+    def connectivity_rules(self) -> List[Dict[str, Any]]:
+        """Правила связности: из конфига или паттерна по умолчанию"""
+        return self.config.get('connectivity', self.CONNECTIVITY)
+    
+    def create_lines(self) -> int:
+        """
+        Строит связность: массивы индексов линий по connectivity_rules()
+        Координаты здесь не вычисляются - их загружает prepare_render
+        """
+        self.connectivity = None
+        self._iterations = []
+        name = type(self).__name__
+        points_config = self.config.get('points', [])
+        count = self.config.get('count', 36)
+        
+        if count < self.MIN_COUNT:
+            print(f"⚠ {name} requires at least {self.MIN_COUNT} iterations (count >= {self.MIN_COUNT})")
+            return 0
+        if len(points_config) < self.MIN_POINTS:
+            print(f"⚠ {name} requires at least {self.MIN_POINTS} points")
+            return 0
+        
+        # Толщина линии
+        self._setup_line_width()
+        
+        try:
+            template = iteration_template(self.connectivity_rules(), len(points_config))
+        except ValueError as e:
+            # Конфиг без проверки: правила паттерна по умолчанию
+            print(f"⚠ Connectivity: {e}, using {self.CONNECTIVITY}")
+            template = iteration_template(self.CONNECTIVITY, len(points_config))
+        
+        self._iterations = self._iteration_values()
+        self.connectivity = Connectivity(template, len(self._iterations))
+        
+        lines = len(self.connectivity)
+        if lines > MANY_LINES:
+            print(f"⚠ {name}: {lines} lines (may affect performance)")
+        print(f"{name} created {lines} lines")
+        return lines
     
-    def create_lines(self) -> List:
-        """Создание линий - АБСТРАКТНЫЙ метод"""
-        raise NotImplementedError("Паттерн должен реализовать create_lines()")
+    def _line_vertices(self, first: int = 0) -> List[Tuple[float, int]]:
+        """(n, индекс точки) для обоих концов линий начиная с first"""
+        iterations = self._iterations
+        connectivity = self.connectivity
+        vertices = []
+        for k_a, point_a, k_b, point_b in zip(connectivity.iteration_a[first:], connectivity.point_a[first:],
+                                              connectivity.iteration_b[first:], connectivity.point_b[first:]):
+            vertices.append((iterations[k_a], point_a))
+            vertices.append((iterations[k_b], point_b))
+        return vertices
+    
+    def set_count(self, count: int) -> bool:
+        """
+        Меняет count без пересоздания паттерна: связность строится заново (это
+        только индексы), общий с прошлой связностью префикс линий остается,
+        хвост достраивается или отрезается, буфер вершин меняет размер на месте
+        Вычисляются только новые линии (и те, что зависят от count/angle_step)
+        
+        Возвращает False, если так нельзя (адаптивная выборка, пустой паттерн) -
+        тогда нужен полный create_lines
+        """
+        old_count = self.config.get('count', 36)
+        if count == old_count:
+            return True
+        if (count < self.MIN_COUNT or not self.get_line_count() or self.graph is None
+                or self.config.get('sampling', 'uniform') == 'adaptive'):
+            return False
+        
+        self.config['count'] = count
+        self._contexts = {}
+        
+        # angle_step и count меняются у всех итераций: сохраненные значения
+        # статических точек, которые их читают, больше не верны
+        count_dependent = self.graph.invalidate(('count', 'angle_step'))
+        
+        old = self.connectivity
+        self._iterations = list(range(count))
+        self.connectivity = Connectivity(old.template, count)
+        keep = self.connectivity.common_prefix(old)
+        del self._vertices[2 * keep:]
+        self._vertices.extend(self._line_vertices(keep))
+        
+        # Координаты новых линий (и всех, если геометрия зависит от count)
+        # Здесь считаются только статические: зависящие от времени обновит ближайший кадр
+        start = 0 if count_dependent else keep
+        total = len(self.connectivity)
+        uses_time = [point.uses_time for point in self.graph.points]
+        static_lines = [line for line in range(start, total)
+                        if not (uses_time[self.connectivity.point_a[line]]
+                                or uses_time[self.connectivity.point_b[line]])]
+        
+        self.graph.begin_frame()
+        segments = [(0.0, 0.0, 0.0, 0.0)] * (total - start)
+        for line, endpoints in zip(static_lines, self._compute_lines(static_lines, 0.0)):
+            segments[line - start] = endpoints
+        
+        self._dirty_ranges = self._time_dependent_ranges()
+        
+        if self.renderer is not None:
+            self.renderer.set_segment_count(total, self._vertices)
+            self.renderer.upload_segments(start, segments)
+            tail = self._vertices[2 * keep:]
+            if self.colors.static or self.widths.static:
+                contexts = {n: self._create_context(n, 0.0) for n, _ in tail}
+            if self.colors.static:
+                self.renderer.upload_colors(self.colors.pack(tail, contexts), first_segment=keep)
+            if self.widths.static and self._thick():
+                self.renderer.upload_widths(self.widths.pack(tail, contexts), first_segment=keep)
+        
+        if self.culling is not None:
+            # Сжатый буфер собирается из полного кадра: статические концы заново
+            self.culling.static_endpoints = None
+            self._update_culling(self.compute_endpoints(0.0))
+        
+        print(f"Count {old_count} -> {count}: {total - keep} lines rebuilt, {total} total")
+        return True
     
     # ========== ОБЩИЕ МЕТОДЫ (DRY) ==========
     
-    def _calculate_points_for_iteration(self, n: int, current_time: float = 0) -> List[Tuple[float, float]]:
+    def _calculate_points_for_iteration(self, n: float, current_time: float = 0) -> List[Tuple[float, float]]:
         """
         Вычисляет ВСЕ точки для итерации n
         ОБЩАЯ ЛОГИКА для всех паттернов
@@ -55,12 +294,19 @@ class BasePattern:
         count = self.config.get('count', 36)
         
         # Автоматический центр (если не задан явно)
-        center = self.config.get('center', self.auto_center)
-        center_x, center_y = center[0], center[1]
+        center_x, center_y = self.get_center()
         
         # Создаем контекст для выражений
         context = self._create_context(n, current_time)
         
+        # Вычисляем все узлы графа в топологическом порядке
+        if self.graph is not None:
+            try:
+                return [(x + center_x, y + center_y)
+                        for x, y in self.graph.evaluate_iteration(context)]
+            except Exception:
+                pass  # Ошибку покажет вычисление по точкам ниже
+        
         # Вычисляем каждую точку
         points = []
         for point_config in points_config:
@@ -69,6 +315,91 @@ class BasePattern:
         
         return points
     
+    def _iteration_values(self) -> List[float]:
+        """
+        Значения n для итераций
+        sampling: 'uniform' (по умолчанию) - n = 0, 1, ..., count-1
+        sampling: 'adaptive' - дробные n, сгущаются там, где кривая резко меняется
+        """
+        count = self.config.get('count', 36)
+        self._sample_steps = {}
+        if self.config.get('sampling', 'uniform') != 'adaptive' or count < 3:
+            return list(range(count))
+        
+        samples = self._adaptive_iterations(count)
+        
+        # dn - шаг до следующей выборки, чтобы выражения вида (n+dn) не оставляли разрывов
+        for a, b in zip(samples, samples[1:]):
+            self._sample_steps[a] = b - a
+        print(f"Adaptive sampling: {len(samples)} iterations instead of {count}")
+        return samples
+    
+    def _adaptive_iterations(self, count: int) -> List[float]:
+        """
+        Адаптивная выборка параметра n на отрезке [0, count-1]
+        Интервал делится пополам, пока середина кривой отклоняется от хорды
+        больше чем на tolerance пикселей
+        
+        Выборка строится один раз при create_lines (set_count ее не переносит -
+        паттерн пересоздается целиком). Если точки зависят от time,
+        отклонение берется максимальным по нескольким моментам: sample_times
+        из конфига или SAMPLE_TIMES моментов на [sample_time, sample_time + sample_period).
+        amp/band при этом не меняются - точки от аудио выбираются по тишине
+        """
+        tolerance = float(self.config.get('tolerance', 0.5))
+        max_depth = int(self.config.get('max_depth', 6))
+        min_depth = int(self.config.get('min_depth', 1))
+        min_step = float(self.config.get('min_step', 0.25))
+        base_count = int(self.config.get('base_count', max(4, count // 16)))
+        times = self._sample_times()
+        
+        cache = {}
+        
+        def points_at(n, t):
+            if (n, t) not in cache:
+                cache[n, t] = self._calculate_points_for_iteration(n, t)
+            return cache[n, t]
+        
+        def chord_error(a, b, m):
+            error = 0.0
+            for t in times:
+                for (ax, ay), (bx, by), (mx, my) in zip(points_at(a, t), points_at(b, t), points_at(m, t)):
+                    error = max(error, math.hypot(mx - (ax + bx) / 2, my - (ay + by) / 2))
+                if error > tolerance:
+                    break  # Интервал делится в любом случае
+            return error
+        
+        def subdivide(a, b, depth):
+            m = (a + b) / 2
+            if b - a <= min_step or depth >= max_depth:
+                return
+            if depth >= min_depth and chord_error(a, b, m) <= tolerance:
+                return
+            subdivide(a, m, depth + 1)
+            samples.append(m)
+            subdivide(m, b, depth + 1)
+        
+        last = count - 1
+        step = last / base_count
+        samples = [0]
+        for k in range(base_count):
+            a = k * step
+            b = last if k == base_count - 1 else (k + 1) * step
+            subdivide(a, b, 0)
+            samples.append(b)
+        
+        return samples
+    
+    def _sample_times(self) -> List[float]:
+        """Моменты времени, по которым адаптивная выборка меряет отклонение от хорды"""
+        sample_time = float(self.config.get('sample_time', 0))
+        if 'sample_times' in self.config:
+            return [float(t) for t in self.config['sample_times']] or [sample_time]
+        if self.graph is None or not any(node.uses_time for node in self.graph.points):
+            return [sample_time]
+        period = float(self.config.get('sample_period', 2 * math.pi))
+        return [sample_time + period * k / self.SAMPLE_TIMES for k in range(self.SAMPLE_TIMES)]
+    
     def _calculate_single_point(self, point_config: Dict[str, Any], 
                                context: Dict[str, Any]) -> Tuple[float, float]:
         """
@@ -83,7 +414,8 @@ class BasePattern:
             if len(coords) >= 2:
                 return coords[0], coords[1]
         except Exception as e:
-            print(f"Error calculating point: {e}")
+            if hot_log.enabled:
+                hot_log.report('point', func_name, e)
         
         return 0.0, 0.0
     
@@ -93,6 +425,16 @@ class BasePattern:
         ОБЩАЯ ЛОГИКА для всех паттернов
         """
         count = self.config.get('count', 36)
+        return self.build_context(n, current_time, count, self._sample_steps.get(n, 1),
+                                  self._amp, self._band)
+    
+    @staticmethod
+    def build_context(n: float, current_time: float, count: int, dn: float = 1,
+                      amp: float = 0.0, band=None) -> Dict[str, Any]:
+        """
+        Контекст выражений без привязки к паттерну (нужен и для проверки конфига)
+        band - массив полос аудио кадра (общий для всех контекстов, не копируется)
+        """
         angle_step = 2 * math.pi / count if count > 0 else 0
         
         return {
@@ -100,99 +442,374 @@ class BasePattern:
             'time': current_time,
             'count': count,
             'angle_step': angle_step,
+            'dn': dn,
+            'amp': amp,
+            'band': silent_bands() if band is None else band,
             'pi': math.pi,
             'e': math.e,
             'tau': math.tau
         }
     
-    def _create_line(self, x1: float, y1: float, x2: float, y2: float,
-                    color: Tuple[int, int, int] = (255, 255, 255)) -> pyglet.shapes.Line:
+    def prepare_render(self):
         """
-        Создает линию
-        ОБЩАЯ ЛОГИКА для всех паттернов
+        Готовит буферы рендерера после create_lines:
+        позиции первого кадра (статические линии больше не загружаются) и цвета
         """
-        if not self.batch:
-            self.batch = pyglet.graphics.Batch()
+        self.colors = PointColors(self.config)
+        self.widths = SegmentWidths(self.config.get('width', self.DEFAULT_WIDTH), self.DEFAULT_WIDTH)
+        self._contexts = {}
+        self._vertices = self._line_vertices() if self.connectivity is not None else []
+        self._dirty_ranges = self._time_dependent_ranges()
+        self.culling = None
+        
+        if self.renderer is None:
+            return
         
-        # Создаем линию (pyglet.shapes.Line не принимает width)
-        line = pyglet.shapes.Line(
-            x1, y1, x2, y2,
-            color=color,
-            batch=self.batch
-        )
+        lines = self.get_line_count()
+        endpoints = self.compute_endpoints(0.0)
+        self.renderer.resize(lines, self._vertices)
+        self.renderer.set_offset(*self.get_center())
+        self.renderer.upload_positions(endpoints)
+        self.renderer.upload_colors(self.compute_colors(0.0))
+        if self._thick():
+            self.renderer.upload_widths(self.compute_widths(0.0))
+        self._setup_culling(endpoints)
         
-        return line
+        if StripRenderer is not None and isinstance(self.renderer, StripRenderer):
+            # Сколько стоит кадр в сравнении с независимыми отрезками
+            lines_bytes = 16 * sum(end - start for start, end in self._dirty_ranges) \
+                if self._dirty_ranges is not None else 16 * lines
+            print(f"Line strips: {self.renderer.vertex_count} vertices instead of {2 * lines}, "
+                  f"positions per frame {lines_bytes} -> {self.renderer.upload_size(self._dirty_ranges)} bytes")
     
-    def _save_line_data(self, line: pyglet.shapes.Line, 
-                       point1_config: Dict[str, Any],
-                       point2_config: Dict[str, Any],
-                       n: int, context: Dict[str, Any]):
+    def _setup_culling(self, endpoints: List[Tuple[float, float, float, float]]):
         """
-        Сохраняет данные для анимации линии
-        ОБЩАЯ ЛОГИКА для всех паттернов
+        Отсечение вне окна ("cull": true, запас "cull_margin" пикселей)
+        Только для независимых отрезков: у ломаных (strip) вершины общие и не сжимаются
         """
-        line.pattern_data = {
-            'point1_config': point1_config,
-            'point2_config': point2_config,
-            'n': n,
-            'context_base': context.copy()
-        }
+        if not self.config.get('cull', False) or not self.get_line_count():
+            return
+        if StripRenderer is not None and isinstance(self.renderer, StripRenderer):
+            print("⚠ Culling off: topology 'strip' shares vertices between segments")
+            return
+        
+        culling = self.culling = SegmentCulling(float(self.config.get('cull_margin', CULL_MARGIN)))
+        self._update_culling(endpoints)
+        
+        lines = self.get_line_count()
+        static = 0 if culling.static_endpoints is None else \
+            lines - sum(end - start for start, end in culling.dynamic_ranges)
+        print(f"Viewport culling: margin {culling.margin} px, {len(culling.visible)} of {lines} "
+              f"lines visible, {static} static lines evaluated once")
+    
+    def _update_culling(self, endpoints: List[Tuple[float, float, float, float]]):
+        """
+        Полный кадр для отсечения: концы endpoints, цвета и толщины в момент 0
+        Концы статических линий запоминаются: кадр вычисляет только итерации,
+        которые нужны линиям, зависящим от времени (итерации из одних
+        статических линий не вычисляются совсем)
+        """
+        culling = self.culling
+        culling.colors = self.compute_colors(0.0)
+        culling.widths = self.compute_widths(0.0) if self._thick() else None
+        
+        ranges = self._dirty_ranges
+        culling.static_endpoints = None
+        if ranges is not None and sum(end - start for start, end in ranges) < self.get_line_count():
+            culling.static_endpoints = list(endpoints)
+            culling.dynamic_ranges = ranges
+            culling.dynamic_indices = [line for start, end in ranges for line in range(start, end)]
+            culling.dynamic_lines = self.connectivity.select(culling.dynamic_indices)
+            culling.dynamic_rows = sorted(set(culling.dynamic_lines[0]).union(culling.dynamic_lines[2]))
+        
+        culling.positions = pack_endpoints(endpoints)
+        self._upload_visible()
+    
+    def _upload_visible(self, colors: bool = True, widths: bool = True):
+        """
+        Отсекает последний полный кадр по окну и загружает видимые отрезки
+        в начало буфера; colors/widths - загрузить и их (выражения загружают
+        apply_colors/apply_widths уже по видимым отрезкам)
+        """
+        culling = self.culling
+        positions = culling.cull(self.get_center(), self.window_width, self.window_height)
+        if positions is None:
+            return
+        self.renderer.upload_visible(positions)
+        if colors:
+            self.renderer.upload_colors(gather(culling.colors, culling.visible, 8))
+        if widths and culling.widths is not None:
+            self.renderer.upload_widths(gather(culling.widths, culling.visible, 1))
+    
+    def _time_dependent_ranges(self) -> List[Tuple[int, int]]:
+        """
+        Диапазоны линий [start, end), у которых хотя бы один конец зависит от времени
+        Остальные линии после первой загрузки не меняются и не загружаются
+        """
+        if self.graph is None:
+            return None
+        
+        points = self.graph.points
+        ranges = []
+        start = None
+        for line_index in range(len(self._vertices) // 2):
+            (_, index1), (_, index2) = self._vertices[2 * line_index:2 * line_index + 2]
+            if points[index1].uses_time or points[index2].uses_time:
+                if start is None:
+                    start = line_index
+            elif start is not None:
+                ranges.append((start, line_index))
+                start = None
+        if start is not None:
+            ranges.append((start, len(self._vertices) // 2))
+        return ranges
+    
+    @property
+    def dirty_ranges(self) -> List[Tuple[int, int]]:
+        """Диапазоны линий, которые меняются от кадра к кадру (None - все)"""
+        return self._dirty_ranges
     
     def update_lines(self, current_time: float):
         """
         Обновляет ВСЕ линии для анимации
         ОБЩАЯ ЛОГИКА для всех паттернов
         """
-        for line in self.lines:
-            if hasattr(line, 'pattern_data'):
-                self._update_single_line(line, current_time)
+        self.begin_frame(current_time)
+        self.apply_endpoints(self.compute_endpoints(current_time))
+        self.apply_colors(current_time)
+        self.apply_widths(current_time)
     
-    def _update_single_line(self, line: pyglet.shapes.Line, current_time: float):
+    def begin_frame(self, current_time: float):
         """
-        Обновляет одну линию
-        ОБЩАЯ ЛОГИКА для всех паттернов
+        Новый кадр: снимок аудио и следующий кадр скалярных функций (dt, время,
+        сглаживание) - один раз за показанный кадр, а не на каждое вычисление концов
         """
-        data = line.pattern_data
+        self._read_audio()
+        self.function_lib.scalars.begin_frame(current_time, self._amp, self._band)
+    
+    def compute_endpoints(self, current_time: float, executor=None,
+                          chunk_size: int = 0) -> List[Tuple[float, float, float, float]]:
+        """
+        Вычисляет концы всех линий (без центра), не трогая сами линии
+        Нужно для интерполяции между ключевыми кадрами
+        Кадр скалярных функций не меняется (см. begin_frame): ключевые кадры
+        впрок и проверки не сдвигают dt и сглаживание
         
-        # Обновляем время в контексте
-        context = data['context_base'].copy()
-        context['time'] = current_time
+        При chunk_size > 0 линии делятся на части по chunk_size (при отсечении -
+        только линии, зависящие от времени), каждая часть пишет в свои линии
+        общего списка. С executor (ThreadPoolExecutor) части считаются в потоках,
+        у каждого потока свои контексты, без него - по очереди. Деление зависит
+        только от chunk_size, поэтому результат с executor и без него совпадает
+        побитно (часть меньше MIN_BATCH в kernels.py считается по точкам, а не
+        пакетным ядром - с chunk_size 0 числа могут отличаться округлением)
+        """
+        if self.graph is not None:
+            self.graph.begin_frame()
         
-        # Вычисляем первую точку
-        x1, y1 = self._calculate_single_point(data['point1_config'], context)
+        culling = self.culling
+        if culling is not None and culling.static_endpoints is not None:
+            lines = culling.dynamic_indices
+            if chunk_size <= 0 or len(lines) <= chunk_size:
+                return self._compute_dynamic(current_time)
+            endpoints = list(culling.static_endpoints)
+            chunks = [lines[start:start + chunk_size] for start in range(0, len(lines), chunk_size)]
+        else:
+            total = self.get_line_count()
+            if chunk_size <= 0 or total <= chunk_size:
+                return self._compute_lines(range(total), current_time)
+            endpoints = [None] * total
+            chunks = [range(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
         
-        # Вычисляем вторую точку
-        x2, y2 = self._calculate_single_point(data['point2_config'], context)
+        def compute_chunk(lines):
+            computed = self._compute_lines(lines, current_time)
+            if isinstance(lines, range):
+                endpoints[lines.start:lines.stop] = computed
+            else:
+                for line, value in zip(lines, computed):
+                    endpoints[line] = value
         
-        # Автоматический центр (если не задан явно)
-        center = self.config.get('center', self.auto_center)
-        center_x, center_y = center[0], center[1]
+        if executor is None:
+            for lines in chunks:
+                compute_chunk(lines)
+        else:
+            # list() дожидается всех частей и пробрасывает исключения
+            list(executor.map(compute_chunk, chunks))
+        return endpoints
+    
+    def _compute_lines(self, lines, current_time: float) -> List[Tuple[float, float, float, float]]:
+        """
+        Концы линий с индексами lines (range или список): таблица точек только
+        нужных итераций и одна выборка концов из нее по массивам связности
+        """
+        if not len(lines):
+            return []
+        iteration_a, point_a, iteration_b, point_b = self.connectivity.select(lines)
+        if len(lines) == len(self.connectivity):
+            rows = range(self.connectivity.iteration_count)
+        else:
+            rows = sorted(set(iteration_a).union(iteration_b))
+        
+        columns = self._compute_point_table([self._iterations[k] for k in rows], current_time)
+        return gather_endpoints(columns, rows, iteration_a, point_a, iteration_b, point_b)
+    
+    def _compute_dynamic(self, current_time: float) -> List[Tuple[float, float, float, float]]:
+        """Концы всех линий при отсечении: статические - запомненные, остальные - одной выборкой"""
+        culling = self.culling
+        endpoints = list(culling.static_endpoints)
+        rows = culling.dynamic_rows
+        if not rows:
+            return endpoints
         
-        # Обновляем координаты линии
-        line.x = x1 + center_x
-        line.y = y1 + center_y
-        line.x2 = x2 + center_x
-        line.y2 = y2 + center_y
+        columns = self._compute_point_table([self._iterations[k] for k in rows], current_time)
+        computed = gather_endpoints(columns, rows, *culling.dynamic_lines)
+        offset = 0
+        for start, end in culling.dynamic_ranges:
+            endpoints[start:end] = computed[offset:offset + end - start]
+            offset += end - start
+        return endpoints
+    
+    def _compute_point_table(self, iterations: List[float], current_time: float) -> List[List]:
+        """
+        Таблица точек пакетом: столбец на точку, в столбце (x, y) каждой итерации
+        (каждая точка считается сразу для всех итераций)
+        """
+        points_config = self.config.get('points', [])
+        contexts = self._frame_contexts(iterations, current_time)
+        
+        return [
+            self.function_lib.evaluate_batch(point_config.get('func', 'circle'), point_config, contexts)
+            for point_config in points_config
+        ]
+    
+    def _frame_contexts(self, iterations: List[float], current_time: float) -> List[Dict[str, Any]]:
+        """
+        Контексты итераций для кадра: словари создаются один раз на n (у каждого
+        потока свои - части кадра не меняют контексты друг друга), в следующих
+        кадрах у них меняются только time и amp (band - общий массив)
+        """
+        cache = self._contexts.get(threading.get_ident())
+        if cache is None:
+            cache = self._contexts[threading.get_ident()] = {}
+        amp = self._amp
+        contexts = []
+        for n in iterations:
+            context = cache.get(n)
+            if context is None:
+                context = self._create_context(n, current_time)
+                cache[n] = context
+            else:
+                context['time'] = current_time
+                context['amp'] = amp
+            contexts.append(context)
+        return contexts
+    
+    def apply_endpoints(self, endpoints: List[Tuple[float, float, float, float]]):
+        """
+        Записывает концы линий (центр добавляет рендерер)
+        ОБЩАЯ ЛОГИКА для всех паттернов
+        """
+        if self.culling is not None:
+            self.culling.positions = pack_endpoints(endpoints)
+            self._upload_visible(colors=self.colors.static, widths=self.widths.static)
+        elif self.renderer is not None:
+            self.renderer.upload_positions(endpoints, self._dirty_ranges)
+    
+    def apply_frame(self, positions: array, colors: array = None, widths: array = None):
+        """
+        Загружает готовый кадр (кэш периода): упакованные концы, цвета и толщины
+        (None - не менялись), без вычислений
+        """
+        if self.renderer is None:
+            return
+        if self.culling is not None:
+            self.culling.positions = positions
+            if colors is not None:
+                self.culling.colors = colors
+            if widths is not None and self.culling.widths is not None:
+                self.culling.widths = widths
+            self._upload_visible()
+            return
+        self.renderer.upload_packed(positions, self._dirty_ranges)
+        if colors is not None:
+            self.renderer.upload_colors(colors)
+        if widths is not None and self._thick():
+            self.renderer.upload_widths(widths)
+    
+    def _vertex_contexts(self, current_time: float) -> Dict[float, Dict[str, Any]]:
+        """Контексты кадра по n (для упаковки по вершинам без numpy)"""
+        contexts = self._frame_contexts(self._iterations, current_time)
+        return dict(zip(self._iterations, contexts))
+    
+    def compute_colors(self, current_time: float):
+        """
+        Упакованные цвета RGBA всех вершин в момент current_time
+        С numpy - таблица цветов (точка, итерация) по контекстам кадра и одна
+        выборка по вершинам, как у концов линий
+        """
+        if np is None or not self.get_line_count():
+            return self.colors.pack(self._vertices, self._vertex_contexts(current_time))
+        contexts = self._frame_contexts(self._iterations, current_time)
+        table = self.colors.table(contexts, len(self.config.get('points', [])))
+        return array('B', gather_vertices(table, self.connectivity).tobytes())
+    
+    def _thick(self) -> bool:
+        return ThickLineRenderer is not None and isinstance(self.renderer, ThickLineRenderer)
+    
+    def compute_widths(self, current_time: float) -> array:
+        """Толщины всех отрезков в момент current_time"""
+        if self.widths.static:
+            return self.widths.pack(self._vertices, {})
+        if np is None or not self.get_line_count():
+            return self.widths.pack(self._vertices, self._vertex_contexts(current_time))
+        contexts = self._frame_contexts(self._iterations, current_time)
+        table = self.widths.table(contexts, len(self.config.get('points', [])))
+        return array('f', gather_vertices(table, self.connectivity, first_only=True).tobytes())
+    
+    def apply_widths(self, current_time: float):
+        """Пересчитывает и загружает толщины-выражения (только для толстых линий)"""
+        if self.widths is None or self.widths.static or not self._thick():
+            return
+        widths = self.compute_widths(current_time)
+        if self.culling is not None:
+            self.culling.widths = widths
+            widths = gather(widths, self.culling.visible, 1)
+        self.renderer.upload_widths(widths)
+    
+    def apply_colors(self, current_time: float):
+        """Пересчитывает и загружает цвета (пропускается для статических цветов)"""
+        if self.renderer is None or self.colors is None or self.colors.static:
+            return
+        colors = self.compute_colors(current_time)
+        if self.culling is not None:
+            self.culling.colors = colors
+            colors = gather(colors, self.culling.visible, 8)
+        self.renderer.upload_colors(colors)
     
     def clear_lines(self):
         """Очищает все линии"""
-        self.lines.clear()
-        if self.batch:
-            self.batch = None
+        self.connectivity = None
+        self.culling = None
+        self._vertices = []
+        if self.renderer is not None:
+            self.renderer.delete()
     
     def draw(self):
         """Рисует все линии"""
-        if self.batch and self.lines:
+        if self._thick():
+            # Толщина - в данных отрезков, glLineWidth не нужен
+            if self.get_line_count():
+                self.renderer.draw()
+        elif self.renderer is not None and self.get_line_count():
             # Устанавливаем толщину линии
             line_width = float(self.config.get('line_width', 1.0))
             pyglet.gl.glLineWidth(line_width)
             
             # Рисуем
-            self.batch.draw()
+            self.renderer.draw()
             
             # Возвращаем толщину к значению по умолчанию
             pyglet.gl.glLineWidth(1.0)
     
     def get_line_count(self) -> int:
         """Возвращает количество линий в паттерне"""
-        return len(self.lines)
\ No newline at end of file
+        return len(self.connectivity) if self.connectivity is not None else 0
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Цвета точек: статические или выражения от n, time и point_index
+"""
+from array import array
+from typing import Dict, Any, List, Tuple
+from functions.expressions import evaluate_expression
+from functions.diagnostics import hot_log
+from functions import kernels
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_COLOR = [255, 255, 255]
+DEFAULT_ALPHA = 255
+
+Vertex = Tuple[float, int]  # (n, индекс точки)
+
+
+def _clamp_byte(value: float) -> int:
+    return max(0, min(255, int(value)))
+
+
+def _clamp_bytes(column):
+    """Столбец компоненты -> 0..255 как _clamp_byte (nan/inf - 0)"""
+    column = np.where(np.isfinite(column), column, 0.0)
+    return np.clip(np.trunc(column), 0, 255)
+
+
+class PointColors:
+    """
+    Цвет каждой точки: 'color' ([r, g, b], элементы - числа или выражения)
+    и 'alpha' из конфига точки, иначе из конфига паттерна
+
+    Результат - упакованный массив RGBA (uint8) по вершинам отрезков
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        pattern_color = config.get('color', DEFAULT_COLOR)
+        pattern_alpha = config.get('alpha', DEFAULT_ALPHA)
+
+        self.specs = []
+        for point_config in config.get('points', []):
+            color = point_config.get('color', pattern_color)
+            if not isinstance(color, (list, tuple)) or len(color) < 3:
+                color = DEFAULT_COLOR
+            alpha = point_config.get('alpha', pattern_alpha)
+            self.specs.append(list(color[:3]) + [alpha])
+
+        # Статический цвет не вычисляется и не загружается каждый кадр
+        self.static = all(not isinstance(value, str) for spec in self.specs for value in spec)
+
+    def _component(self, value, context: Dict[str, Any]) -> int:
+        """Компонента цвета 0..255"""
+        if not isinstance(value, str):
+            return _clamp_byte(value)
+        try:
+            return _clamp_byte(evaluate_expression(value, context))
+        except Exception as e:
+            if hot_log.enabled:
+                hot_log.report('color', value, e)
+            return 0
+
+    def point_color(self, point_index: int, context: Dict[str, Any]) -> Tuple[int, int, int, int]:
+        """RGBA точки в контексте итерации"""
+        if point_index >= len(self.specs):
+            return (255, 255, 255, 255)
+
+        context['point_index'] = point_index
+        r, g, b, a = (self._component(value, context) for value in self.specs[point_index])
+        return (r, g, b, a)
+
+    def pack(self, vertices: List[Vertex], contexts: Dict[float, Dict[str, Any]]) -> array:
+        """
+        Упаковывает цвета вершин в массив RGBA
+        contexts - контекст выражений для каждой итерации n
+        """
+        cache = {}
+        colors = array('B')
+        for vertex in vertices:
+            rgba = cache.get(vertex)
+            if rgba is None:
+                n, point_index = vertex
+                rgba = self.point_color(point_index, contexts[n])
+                cache[vertex] = rgba
+            colors.extend(rgba)
+        return colors
+
+    def table(self, contexts: List[Dict[str, Any]], point_count: int):
+        """
+        Цвета всех точек всех итераций одним проходом (нужен numpy):
+        uint8 (точка, итерация, RGBA). Каждая компонента - столбец по контекстам
+        итераций (kernels.param_column), столбцы контекста общие для всех точек
+        """
+        table = np.full((point_count, len(contexts), 4), 255, dtype=np.uint8)
+        if not contexts:
+            return table
+        columns = kernels.ContextColumns(contexts, {'point_index': 0})
+        for point_index, spec in enumerate(self.specs[:point_count]):
+            columns.constants['point_index'] = point_index
+            for channel, value in enumerate(spec):
+                if isinstance(value, str):
+                    table[point_index, :, channel] = _clamp_bytes(kernels.param_column(value, columns))
+                else:
+                    table[point_index, :, channel] = _clamp_byte(value)
+        return table
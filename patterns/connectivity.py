@@ -0,0 +1,256 @@
+"""
+Связность паттерна: какие точки каких итераций соединяются линиями
+
+Правило - JSON объект {"type": ..., параметры}. Каждое правило дает шаблон
+итерации: список (точка a, сдвиг итерации, точка b, замыкать по итерациям).
+Шаблон одинаков для всех итераций, поэтому при загрузке он разворачивается
+в массивы индексов (итерация a, точка a, итерация b, точка b) одним циклом,
+а кадр собирает концы линий одной выборкой из таблицы точек
+
+Типы правил (P - число точек, итерация k):
+- chain: точка i -> i+1
+- closed: chain и последняя -> первая
+- all: каждая пара i < j
+- every: i -> i+step ("wrap": true - по кругу, звездные многоугольники)
+- star: точка center -> каждая другая
+- grid: сетка итерации x точки: i -> i+1 и i итерации k -> i итерации k+1
+  ("wrap_points", "wrap_iterations" - замыкание по каждой стороне)
+- offset (или next): точка i итерации k -> точка i+shift итерации k+offset
+  ("wrap": true - последние итерации соединяются с первыми, "points" - какие точки)
+- pairs: явные пары [a, b] или [a, b, сдвиг итерации]
+"""
+from array import array
+from typing import Any, Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# (точка a, сдвиг итерации, точка b, замыкать сдвиг по итерациям)
+TemplateEntry = Tuple[int, int, int, bool]
+
+# Больше линий - предупреждение при загрузке
+MANY_LINES = 100000
+
+
+def _index(value, point_count: int, name: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"'{name}' must be an integer, got {value!r}")
+    if not 0 <= value < point_count:
+        raise ValueError(f"'{name}' = {value} is out of range for {point_count} points")
+    return value
+
+
+def _integer(rule: Dict[str, Any], name: str, default: int) -> int:
+    value = rule.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"'{name}' must be an integer, got {value!r}")
+    return value
+
+
+def _chain(rule, point_count):
+    return [(i, 0, i + 1, False) for i in range(point_count - 1)]
+
+
+def _closed(rule, point_count):
+    if point_count < 2:
+        return []
+    return [(i, 0, (i + 1) % point_count, False) for i in range(point_count)]
+
+
+def _all(rule, point_count):
+    return [(i, 0, j, False) for i in range(point_count) for j in range(i + 1, point_count)]
+
+
+def _every(rule, point_count):
+    step = _integer(rule, 'step', 2)
+    if step <= 0:
+        raise ValueError(f"'step' must be positive, got {step}")
+    if rule.get('wrap', False):
+        return [(i, 0, (i + step) % point_count, False) for i in range(point_count)
+                if step % point_count]
+    return [(i, 0, i + step, False) for i in range(point_count - step)]
+
+
+def _star(rule, point_count):
+    if not point_count:
+        return []
+    center = _index(rule.get('center', 0), point_count, 'center')
+    return [(center, 0, j, False) for j in range(point_count) if j != center]
+
+
+def _grid(rule, point_count):
+    wrap_points = bool(rule.get('wrap_points', False))
+    wrap_iterations = bool(rule.get('wrap_iterations', False))
+    # Сначала кольцо итерации (цепочкой - ломаная для strip), затем связи со следующей
+    ring = _closed(rule, point_count) if wrap_points else _chain(rule, point_count)
+    return ring + [(i, 1, i, wrap_iterations) for i in range(point_count)]
+
+
+def _offset(rule, point_count):
+    offset = _integer(rule, 'offset', 1)
+    shift = _integer(rule, 'shift', 0)
+    points = rule.get('points')
+    if points is None:
+        points = range(point_count)
+    elif isinstance(points, list):
+        points = [_index(point, point_count, 'points') for point in points]
+    else:
+        raise ValueError(f"'points' must be a list of point indices, got {points!r}")
+    wrap = bool(rule.get('wrap', True))
+    return [(i, offset, (i + shift) % point_count, wrap) for i in points]
+
+
+def _pairs(rule, point_count):
+    pairs = rule.get('pairs', [])
+    if not isinstance(pairs, list):
+        raise ValueError(f"'pairs' must be a list of [a, b] or [a, b, offset], got {pairs!r}")
+    wrap = bool(rule.get('wrap', True))
+    template = []
+    for pair in pairs:
+        if not isinstance(pair, list) or len(pair) not in (2, 3):
+            raise ValueError(f"expected [a, b] or [a, b, offset], got {pair!r}")
+        a = _index(pair[0], point_count, 'pairs')
+        b = _index(pair[1], point_count, 'pairs')
+        offset = pair[2] if len(pair) == 3 else 0
+        if isinstance(offset, bool) or not isinstance(offset, int):
+            raise ValueError(f"pair offset must be an integer, got {offset!r}")
+        template.append((a, offset, b, wrap))
+    return template
+
+
+RULES = {
+    'chain': _chain,
+    'closed': _closed,
+    'all': _all,
+    'every': _every,
+    'star': _star,
+    'grid': _grid,
+    'offset': _offset,
+    'next': _offset,
+    'pairs': _pairs,
+}
+
+
+def iteration_template(rules: List[Dict[str, Any]], point_count: int) -> List[TemplateEntry]:
+    """
+    Шаблон одной итерации для списка правил (по порядку правил)
+    ValueError - неизвестный тип или неверные параметры
+    """
+    if not isinstance(rules, list):
+        raise ValueError(f"expected a list of rules, got {rules!r}")
+    template = []
+    for rule in rules:
+        if not isinstance(rule, dict) or rule.get('type') not in RULES:
+            kind = rule.get('type') if isinstance(rule, dict) else rule
+            raise ValueError(f"unknown connectivity rule {kind!r}, available: {sorted(RULES)}")
+        template.extend(RULES[rule['type']](rule, point_count))
+    return template
+
+
+class Connectivity:
+    """
+    Линии паттерна как массивы индексов, построенные один раз при загрузке
+
+    iteration_a/iteration_b - номер итерации в списке итераций паттерна
+    (не n: при адаптивной выборке n дробные), point_a/point_b - индекс точки.
+    Линии идут по итерациям первого конца, внутри итерации - по шаблону
+    """
+
+    def __init__(self, template: List[TemplateEntry], iteration_count: int):
+        self.template = template
+        self.iteration_count = iteration_count
+        self.iteration_a = array('i')
+        self.point_a = array('i')
+        self.iteration_b = array('i')
+        self.point_b = array('i')
+
+        for k in range(iteration_count):
+            for point_a, offset, point_b, wrap in template:
+                other = k + offset
+                if wrap:
+                    other %= iteration_count
+                elif not 0 <= other < iteration_count:
+                    continue
+                self.iteration_a.append(k)
+                self.point_a.append(point_a)
+                self.iteration_b.append(other)
+                self.point_b.append(point_b)
+
+    def __len__(self) -> int:
+        return len(self.iteration_a)
+
+    def lines(self):
+        """(итерация a, точка a, итерация b, точка b) для каждой линии"""
+        return zip(self.iteration_a, self.point_a, self.iteration_b, self.point_b)
+
+    def select(self, lines):
+        """Массивы индексов линий lines (range с шагом 1 - срезы без копирования по одной)"""
+        arrays = (self.iteration_a, self.point_a, self.iteration_b, self.point_b)
+        if isinstance(lines, range) and lines.step == 1:
+            return tuple(values[lines.start:lines.stop] for values in arrays)
+        return tuple(array('i', [values[line] for line in lines]) for values in arrays)
+
+    def common_prefix(self, other: 'Connectivity') -> int:
+        """Сколько первых линий совпадает с other (их не нужно пересобирать)"""
+        limit = min(len(self), len(other))
+        for index, line in enumerate(zip(self.lines(), other.lines())):
+            if line[0] != line[1]:
+                return index
+        return limit
+
+
+def gather_endpoints(columns: List[List], rows, iteration_a, point_a,
+                     iteration_b, point_b) -> List:
+    """
+    Концы линий из таблицы точек: columns[точка][строка] = (x, y), rows -
+    номера итераций строк по возрастанию (range - все итерации подряд)
+    С numpy - одна выборка по плоским индексам точка * строк + строка
+    """
+    if np is not None:
+        try:
+            table = np.asarray(columns, dtype=np.float64)
+        except ValueError:
+            table = None  # Точки разной длины - выборка по одной ниже
+        if table is not None and table.ndim == 3 and table.shape[2] >= 2:
+            row_count = table.shape[1]
+            table = table[:, :, :2].reshape(-1, 2)
+            row_a = np.frombuffer(iteration_a, dtype=np.int32)
+            row_b = np.frombuffer(iteration_b, dtype=np.int32)
+            if not isinstance(rows, range):
+                row_a = np.searchsorted(rows, row_a)
+                row_b = np.searchsorted(rows, row_b)
+            a = np.frombuffer(point_a, dtype=np.int32) * row_count + row_a
+            b = np.frombuffer(point_b, dtype=np.int32) * row_count + row_b
+            return np.hstack((table[a], table[b])).tolist()
+
+    position = {k: row for row, k in enumerate(rows)}
+    endpoints = []
+    for k_a, a, k_b, b in zip(iteration_a, point_a, iteration_b, point_b):
+        first = columns[a][position[k_a]]
+        second = columns[b][position[k_b]]
+        endpoints.append((first[0], first[1], second[0], second[1]))
+    return endpoints
+
+
+def gather_vertices(table, connectivity: Connectivity, first_only: bool = False):
+    """
+    Значения вершин линий из таблицы numpy (точка, итерация, ...) одной выборкой:
+    концы a и b подряд, как вершины буфера, или только концы a (first_only -
+    значение на отрезок). Таблица с одной итерацией - одинаково для всех итераций
+    """
+    points, rows = table.shape[:2]
+    flat = table.reshape(points * rows, -1)
+    a = np.frombuffer(connectivity.point_a, dtype=np.int32) * rows
+    if rows > 1:
+        a = a + np.frombuffer(connectivity.iteration_a, dtype=np.int32)
+    if first_only:
+        return flat[a]
+    b = np.frombuffer(connectivity.point_b, dtype=np.int32) * rows
+    if rows > 1:
+        b = b + np.frombuffer(connectivity.iteration_b, dtype=np.int32)
+    index = np.empty(2 * len(a), dtype=np.intp)
+    index[0::2] = a
+    index[1::2] = b
+    return flat[index]
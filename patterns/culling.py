@@ -0,0 +1,97 @@
+"""
+Отсечение отрезков вне окна перед загрузкой ("cull": true в конфиге)
+
+Отрезок виден, если его ограничивающий прямоугольник (с запасом margin на
+толщину) пересекает окно. Видимые отрезки сжимаются в начало буфера, и
+рендерер рисует только их: позиции, цвета и толщины выбираются по одному
+массиву индексов. Без numpy - тот же отбор списками
+"""
+from array import array
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Запас (пикселей) вокруг окна: концы и толщина линий у края не обрезаются
+CULL_MARGIN = 4.0
+
+
+def pack_endpoints(endpoints: List[Tuple[float, float, float, float]]) -> array:
+    """Концы линий -> упакованные позиции (x1, y1, x2, y2 на отрезок)"""
+    if np is not None and endpoints:
+        return array('f', np.asarray(endpoints, dtype=np.float32).tobytes())
+    positions = array('f')
+    for endpoint in endpoints:
+        positions.extend(endpoint)
+    return positions
+
+
+def visible_segments(positions: array, offset: Tuple[float, float],
+                     width: float, height: float, margin: float = CULL_MARGIN):
+    """
+    Индексы отрезков, пересекающих окно [0, width] x [0, height]
+    positions - относительно центра, offset - центр в окне
+    """
+    left = -offset[0] - margin
+    right = width - offset[0] + margin
+    bottom = -offset[1] - margin
+    top = height - offset[1] + margin
+
+    if np is not None:
+        segments = np.frombuffer(positions, dtype=np.float32).reshape(-1, 4)
+        x1, y1, x2, y2 = segments.T
+        mask = np.maximum(x1, x2) >= left
+        mask &= np.minimum(x1, x2) <= right
+        mask &= np.maximum(y1, y2) >= bottom
+        mask &= np.minimum(y1, y2) <= top
+        return np.flatnonzero(mask)
+
+    return [segment for segment in range(len(positions) // 4)
+            if max(positions[4 * segment], positions[4 * segment + 2]) >= left
+            and min(positions[4 * segment], positions[4 * segment + 2]) <= right
+            and max(positions[4 * segment + 1], positions[4 * segment + 3]) >= bottom
+            and min(positions[4 * segment + 1], positions[4 * segment + 3]) <= top]
+
+
+def gather(data: array, segments, stride: int) -> array:
+    """Данные отрезков segments (stride элементов на отрезок) подряд, в порядке segments"""
+    if np is not None:
+        values = np.frombuffer(data, dtype=np.dtype(data.typecode)).reshape(-1, stride)
+        return array(data.typecode, values[segments].tobytes())
+    result = array(data.typecode)
+    for segment in segments:
+        result.extend(data[stride * segment:stride * (segment + 1)])
+    return result
+
+
+class SegmentCulling:
+    """
+    Состояние отсечения паттерна: последний полный кадр (позиции, цвета и
+    толщины всех отрезков) и видимые отрезки. Полный кадр нужен, чтобы при
+    смене окна или цвета пересжать буфер без вычисления точек
+
+    static_endpoints - концы всех линий, где вычислены только статические
+    (не зависят от времени); в кадре вычисляются лишь итерации линий из
+    dynamic_ranges. None - вычисляется все
+    """
+
+    def __init__(self, margin: float = CULL_MARGIN):
+        self.margin = margin
+        self.positions = None  # array('f') - 4 на отрезок
+        self.colors = None     # array('B') - 8 на отрезок
+        self.widths = None     # array('f') - 1 на отрезок (толстые линии)
+        self.visible = []
+        self.static_endpoints = None
+        self.dynamic_ranges = None
+        self.dynamic_indices = None  # Линии dynamic_ranges подряд (для частей кадра)
+        self.dynamic_lines = None  # (iteration_a, point_a, iteration_b, point_b) линий dynamic_ranges
+        self.dynamic_rows = None   # Итерации, которые они используют
+
+    def cull(self, offset: Tuple[float, float], width: float, height: float) -> Optional[array]:
+        """Видимые отрезки последнего кадра; возвращает их позиции (None - кадра еще нет)"""
+        if self.positions is None:
+            return None
+        self.visible = visible_segments(self.positions, offset, width, height, self.margin)
+        return gather(self.positions, self.visible, 4)
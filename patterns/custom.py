@@ -0,0 +1,16 @@
+"""
+Паттерн custom - связность целиком из конфига ("connectivity": [правила])
+Правила и их параметры - в connectivity.py
+"""
+from .base_pattern import BasePattern
+
+class CustomPattern(BasePattern):
+    """
+    Линии по правилам "connectivity" конфига, например:
+    [{"type": "grid", "wrap_points": true}] - сетка итерации x точки,
+    [{"type": "every", "step": 2, "wrap": true}] - звездный многоугольник,
+    [{"type": "star", "center": 0}, {"type": "offset", "offset": 3}]
+    Без правил - цепочка, как у connect
+    """
+    
+    MIN_POINTS = 1
@@ -0,0 +1,76 @@
+"""
+Толщина отрезков: число или выражение от n, time и point_index
+"""
+from array import array
+from typing import Dict, Any, List
+from functions.expressions import evaluate_expression
+from functions.diagnostics import hot_log
+from functions import kernels
+from .colors import Vertex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class SegmentWidths:
+    """
+    Толщина каждого отрезка из 'width' паттерна
+
+    Выражение вычисляется в контексте итерации первого конца отрезка
+    (point_index - индекс его точки). Результат - массив float по отрезкам
+    """
+
+    def __init__(self, width, default: float = 1.0):
+        self.value = width
+        self.default = float(default)
+        # Число не вычисляется и не загружается каждый кадр
+        self.static = not isinstance(width, str)
+
+    def segment_width(self, point_index: int, context: Dict[str, Any]) -> float:
+        """Толщина отрезка, который начинается в точке point_index итерации context"""
+        if self.static:
+            return float(self.value)
+        context['point_index'] = point_index
+        try:
+            return max(0.0, evaluate_expression(self.value, context))
+        except Exception as e:
+            if hot_log.enabled:
+                hot_log.report('width', self.value, e)
+            return self.default
+
+    def pack(self, vertices: List[Vertex], contexts: Dict[float, Dict[str, Any]]) -> array:
+        """
+        Толщины отрезков по вершинам (по две на отрезок, как в PointColors.pack)
+        contexts - контекст выражений для каждой итерации n
+        """
+        if self.static:
+            return array('f', [float(self.value)]) * (len(vertices) // 2)
+
+        cache = {}
+        widths = array('f')
+        for index in range(0, len(vertices) - 1, 2):
+            vertex = vertices[index]
+            width = cache.get(vertex)
+            if width is None:
+                n, point_index = vertex
+                width = self.segment_width(point_index, contexts[n])
+                cache[vertex] = width
+            widths.append(width)
+        return widths
+
+    def table(self, contexts: List[Dict[str, Any]], point_count: int):
+        """
+        Толщины отрезков, начинающихся в каждой точке каждой итерации (нужен
+        numpy): float32 (точка, итерация), выражение - столбец по контекстам
+        """
+        table = np.empty((point_count, len(contexts)), dtype=np.float32)
+        if not contexts:
+            return table
+        columns = kernels.ContextColumns(contexts, {'point_index': 0})
+        for point_index in range(point_count):
+            columns.constants['point_index'] = point_index
+            # fmax: nan -> 0, как max(0.0, nan) в segment_width
+            table[point_index] = np.fmax(kernels.param_column(self.value, columns, self.default), 0.0)
+        return table
@@ -0,0 +1,380 @@
+"""
+Периодичность сцены по time и кэш кадров одного периода
+
+Большинство сцен периодичны: time*0.3 в угле и sin(time*10) в смещении
+повторяются через общий период. Период берется из конфига ('period') или
+находится по выражениям: у каждого вхождения time ищется множитель c
+(time*c, c*time, time/c), а вместе с ним - функция, в которую оно попадает:
+sin/cos/tan (период 2pi/c), saw/tri/pulse (1/c), сам параметр - угол (2pi/c).
+Общий период - НОК этих периодов; найденный период проверяется вычислением
+кадров в t и t + период.
+
+FrameCache хранит кадры одного периода на сетке времени (cache_fps).
+Кадр вычисляется в момент своей ячейки, поэтому повтор совпадает с записью.
+При нехватке памяти: float32 -> int16 (1/8 пикселя, если концы в пределах
++-4096 пикселей) -> меньше кадров в секунду -> часть периода (политика
+вытеснения - в FrameCache)
+"""
+import ast
+import math
+from array import array
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from functions.expressions import FRAME_NAMES, NON_EXPRESSION_PARAMS, SAFE_GLOBALS
+
+DEFAULT_CACHE_FPS = 60.0
+MIN_CACHE_FPS = 15.0        # Ниже - кадры заметно дергаются, лучше кэшировать часть периода
+DEFAULT_CACHE_MB = 64.0
+MAX_MEMORY_SHARE = 0.25     # Кэш не больше этой доли свободной памяти системы
+DEFAULT_MAX_PERIOD = 120.0  # Длиннее - считаем сцену непериодической
+PERIOD_TOLERANCE = 0.01     # Пикселей: кадры в t и t + период совпадают
+QUANT_STEP = 1 / 8          # Шаг хранения int16 (пикселя)
+QUANT_LIMIT = 32767         # Шагов int16: концы в пределах +-4096 пикселей
+
+# Функции, периодичные по аргументу: период аргумента
+PERIODIC_FUNCTIONS = {'sin': 2 * math.pi, 'cos': 2 * math.pi, 'tan': math.pi,
+                      'saw': 1.0, 'tri': 1.0, 'pulse': 1.0}
+
+Period = Tuple[float, Fraction]  # (основа периода, множитель): период = основа * множитель
+
+
+# ========== ПОИСК ПЕРИОДА ==========
+
+def scene_expressions(plan: Dict[str, Any]) -> List[str]:
+    """Все строки-выражения сцены: параметры точек, цвет, альфа, толщина"""
+    expressions = []
+
+    def collect(value):
+        if isinstance(value, str):
+            expressions.append(value)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                if key not in NON_EXPRESSION_PARAMS:
+                    collect(item)
+
+    collect(plan.get('points', []))
+    for key in ('color', 'alpha', 'width'):
+        collect(plan.get(key))
+    return expressions
+
+
+class _TimeTerms(ast.NodeVisitor):
+    """Периоды вхождений time в одном выражении (reason - почему периода нет)"""
+
+    def __init__(self, contexts: List[Dict[str, Any]]):
+        self.contexts = contexts
+        self.periods = []
+        self.reason = None
+        self.parents = {}
+
+    def run(self, tree: ast.AST):
+        for parent in ast.walk(tree):
+            for child in ast.iter_child_nodes(parent):
+                self.parents[child] = parent
+        self.visit(tree)
+
+    def visit_Name(self, node: ast.Name):
+        if node.id == 'time':
+            self._term(node)
+        elif node.id in FRAME_NAMES:
+            self.reason = f"'{node.id}' changes every frame"
+
+    def _constant(self, node: ast.AST) -> Optional[float]:
+        """Значение поддерева, одинаковое для всех линий и кадров (иначе None)"""
+        if any(isinstance(name, ast.Name) and name.id in FRAME_NAMES for name in ast.walk(node)):
+            return None
+        code = compile(ast.Expression(body=node), '<period>', 'eval')
+        try:
+            values = {float(eval(code, SAFE_GLOBALS, dict(context))) for context in self.contexts}
+        except Exception:
+            return None
+        return values.pop() if len(values) == 1 else None
+
+    def _term(self, node: ast.AST):
+        """Идет вверх от time, пока множитель линеен; результат - период или reason"""
+        coefficient = 1.0
+        while True:
+            parent = self.parents.get(node)
+            if isinstance(parent, ast.BinOp) and isinstance(parent.op, (ast.Mult, ast.Div)):
+                other = parent.right if parent.left is node else parent.left
+                value = self._constant(other)
+                if value is None or (isinstance(parent.op, ast.Div) and other is not parent.right):
+                    self.reason = "time is multiplied by a per-line or time-dependent value"
+                    return
+                if isinstance(parent.op, ast.Div):
+                    if value == 0:
+                        self.reason = "time is divided by zero"
+                        return
+                    value = 1 / value
+                coefficient *= value
+            elif isinstance(parent, ast.UnaryOp) and isinstance(parent.op, (ast.USub, ast.UAdd)):
+                pass
+            elif isinstance(parent, ast.BinOp) and isinstance(parent.op, (ast.Add, ast.Sub)):
+                pass  # Сдвиг фазы: множитель тот же
+            else:
+                break
+            node = parent
+
+        if isinstance(parent, ast.Call) and isinstance(parent.func, ast.Name):
+            base = PERIODIC_FUNCTIONS.get(parent.func.id)
+            if base is None:
+                self.reason = f"time inside {parent.func.id}() is not periodic"
+                return
+        elif isinstance(parent, ast.Expression):
+            base = 2 * math.pi  # Сам параметр: угол (размер от time проверка отсеет)
+        else:
+            self.reason = f"time in {type(parent).__name__} is not periodic"
+            return
+
+        if coefficient == 0:
+            return
+        # Период base / |c| в единицах base
+        self.periods.append((base, Fraction(1 / abs(coefficient)).limit_denominator(1000)))
+
+
+def _lcm(periods: List[Period]) -> Optional[float]:
+    """НОК периодов с общей основой (sin и saw вместе - нет общего периода)"""
+    bases = {base for base, _ in periods}
+    if len(bases) > 1:
+        # pi и 2pi соизмеримы, 2pi и 1 - нет
+        if all(abs(base / math.pi - round(base / math.pi)) < 1e-12 for base in bases):
+            periods = [(math.pi, multiple * Fraction(round(base / math.pi)))
+                       for base, multiple in periods]
+        else:
+            return None
+    base = periods[0][0]
+    numerator = 0
+    denominator = 0
+    for _, multiple in periods:
+        numerator = multiple.numerator if not numerator else \
+            numerator * multiple.numerator // math.gcd(numerator, multiple.numerator)
+        denominator = math.gcd(denominator, multiple.denominator)
+    return base * numerator / denominator
+
+
+def detect_period(plan: Dict[str, Any], contexts: List[Dict[str, Any]],
+                  max_period: float = DEFAULT_MAX_PERIOD) -> Tuple[Optional[float], str]:
+    """
+    Период сцены по выражениям: (период или None, пояснение)
+    contexts - контексты нескольких разных линий (множитель при time должен быть общим)
+    """
+    periods = []
+    for expression in scene_expressions(plan):
+        if 'time' not in expression and not any(name in expression for name in FRAME_NAMES):
+            continue
+        terms = _TimeTerms(contexts)
+        try:
+            terms.run(ast.parse(expression, mode='eval'))
+        except SyntaxError:
+            continue
+        if terms.reason:
+            return None, f"{terms.reason}: '{expression}'"
+        periods.extend(terms.periods)
+
+    if not periods:
+        return None, "scene does not depend on time"
+    period = _lcm(periods)
+    if period is None:
+        return None, "time periods are incommensurable (2pi and 1)"
+    if period > max_period:
+        return None, f"period {period:.1f} s is longer than max_period {max_period:g} s"
+    return period, f"{len(periods)} time terms"
+
+
+def verify_period(evaluate: Callable[[float], array], period: float,
+                  samples=(0.37, 1.91)) -> bool:
+    """Кадры в t и t + period совпадают (evaluate - упакованные концы float32)"""
+    for t in samples:
+        first = evaluate(t)
+        second = evaluate(t + period)
+        if len(first) != len(second):
+            return False
+        if any(abs(a - b) > PERIOD_TOLERANCE for a, b in zip(first, second)):
+            return False
+    return True
+
+
+def available_memory() -> Optional[int]:
+    """Свободная память системы в байтах (Linux: MemAvailable), None - неизвестно"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+# ========== КЭШ КАДРОВ ==========
+
+def pack_endpoints(endpoints) -> array:
+    """Концы (x1, y1, x2, y2) -> плоский массив float32"""
+    positions = array('f')
+    for line in endpoints:
+        positions.extend(line)
+    return positions
+
+
+def unpack_endpoints(positions: array) -> List[Tuple[float, float, float, float]]:
+    return [tuple(positions[index:index + 4]) for index in range(0, len(positions), 4)]
+
+
+class CachedFrame:
+    """Кадр периода: концы (float32 или int16), цвета и толщины, если они от time"""
+
+    __slots__ = ('positions', 'colors', 'widths')
+
+    def __init__(self, positions, colors: Optional[array] = None, widths: Optional[array] = None):
+        self.positions = positions
+        self.colors = colors
+        self.widths = widths
+
+    def nbytes(self) -> int:
+        return sum(len(data) * data.itemsize for data in (self.positions, self.colors, self.widths)
+                   if data is not None)
+
+
+def _quantize(positions: array) -> Optional[array]:
+    """float32 -> int16 в шагах QUANT_STEP; None - кадр не помещается (или nan/inf)"""
+    if np is not None:
+        values = np.rint(np.frombuffer(positions, dtype=np.float32) / QUANT_STEP)
+        if values.size and not np.abs(values).max() <= QUANT_LIMIT:
+            return None
+        return array('h', values.astype(np.int16).tobytes())
+    scale = 1 / QUANT_STEP
+    values = [round(value * scale) if math.isfinite(value) else math.inf for value in positions]
+    if any(abs(value) > QUANT_LIMIT for value in values):
+        return None
+    return array('h', values)
+
+
+def _dequantize(quantized: array) -> array:
+    if np is not None:
+        values = np.frombuffer(quantized, dtype=np.int16).astype(np.float32) * np.float32(QUANT_STEP)
+        return array('f', values.tobytes())
+    return array('f', [value * QUANT_STEP for value in quantized])
+
+
+class FrameCache:
+    """
+    Кадры одного периода на сетке времени: ячейка i - момент i * period / slots
+
+    Размер выбирается при создании под бюджет памяти (меньший из cache_mb и
+    доли свободной памяти системы): float32, при нехватке - int16, затем
+    реже (не реже MIN_CACHE_FPS), затем - только часть ячеек.
+    int16 обрезал бы концы дальше +-4096 пикселей: первый такой кадр
+    переводит кэш в float32 с меньшим fps (сохраненные кадры сбрасываются).
+    Вытеснение, когда ячеек больше, чем помещается:
+    - 'keep' (по умолчанию): полный кэш новых кадров не принимает. Период
+      проигрывается по кругу, и LRU вытеснял бы кадр перед самым его
+      повтором (ноль попаданий); 'keep' дает долю попаданий capacity / slots
+    - 'lru': вытесняется давно не использованный кадр - для перемотки
+      и повторов короткого участка
+    """
+
+    def __init__(self, period: float, lines: int, extra_bytes: int = 0, fps: float = DEFAULT_CACHE_FPS,
+                 budget_bytes: float = DEFAULT_CACHE_MB * 1024 * 1024, eviction: str = 'keep'):
+        self.period = period
+        self.eviction = eviction if eviction in ('keep', 'lru') else 'keep'
+        memory = available_memory()
+        if memory is not None:
+            budget_bytes = min(budget_bytes, memory * MAX_MEMORY_SHARE)
+        self.budget = int(budget_bytes)
+        self.lines = lines
+        self.extra_bytes = extra_bytes
+        self.requested_fps = fps
+        self.out_of_range = False  # Был кадр вне диапазона int16
+        self._plan(allow_int16=True)
+        self.frames = OrderedDict()  # Ячейка -> CachedFrame
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.complete_reported = False
+
+    def _plan(self, allow_int16: bool):
+        """Хранение, число ячеек и емкость под бюджет"""
+        # Концы: 16 байт на линию в float32, 8 в int16; extra_bytes - цвета и толщины кадра
+        slots = max(1, int(round(self.period * self.requested_fps)))
+        self.storage = 'float32'
+        frame_bytes = 16 * self.lines + self.extra_bytes
+        if slots * frame_bytes > self.budget:
+            if allow_int16:
+                self.storage = 'int16'
+                frame_bytes = 8 * self.lines + self.extra_bytes
+            if slots * frame_bytes > self.budget:
+                fitting = self.budget // max(1, frame_bytes)
+                slots = max(fitting, int(math.ceil(self.period * MIN_CACHE_FPS)))
+        self.slots = slots
+        self.fps = slots / self.period
+        self.capacity = min(slots, self.budget // max(1, frame_bytes))
+
+    def slot(self, current_time: float) -> Tuple[int, float]:
+        """Ячейка момента current_time и ее время (в первом периоде)"""
+        index = int(math.floor(current_time % self.period / self.period * self.slots + 0.5)) % self.slots
+        return index, index * self.period / self.slots
+
+    def get(self, current_time: float,
+            evaluate: Callable[[float], CachedFrame]) -> Tuple[CachedFrame, float]:
+        """
+        Кадр ячейки current_time и время ячейки: из кэша или вычисленный в evaluate
+        (float32 концы всегда; int16 хранилище переводится обратно)
+        """
+        index, slot_time = self.slot(current_time)
+        frame = self.frames.get(index)
+        if frame is not None:
+            self.hits += 1
+            if self.eviction == 'lru':
+                self.frames.move_to_end(index)
+            if self.storage == 'int16':
+                return CachedFrame(_dequantize(frame.positions), frame.colors, frame.widths), slot_time
+            return frame, slot_time
+
+        self.misses += 1
+        frame = evaluate(slot_time)
+        self._store(index, frame)
+        return frame, slot_time
+
+    def _store(self, index: int, frame: CachedFrame):
+        if len(self.frames) >= self.capacity:
+            if self.eviction != 'lru' or not self.frames:
+                return
+            _, evicted = self.frames.popitem(last=False)
+            self.bytes -= evicted.nbytes()
+        if self.storage == 'int16':
+            quantized = _quantize(frame.positions)
+            if quantized is None:
+                # Концы не помещаются в int16: float32 реже, сетка ячеек новая
+                self.out_of_range = True
+                self._plan(allow_int16=False)
+                self.frames.clear()
+                self.bytes = 0
+                return
+            frame = CachedFrame(quantized, frame.colors, frame.widths)
+        self.frames[index] = frame
+        self.bytes += frame.nbytes()
+
+    @property
+    def complete(self) -> bool:
+        return len(self.frames) >= self.slots
+
+    def describe(self) -> str:
+        share = '' if self.capacity >= self.slots else f", {self.capacity}/{self.slots} slots fit"
+        storage = f"{self.storage} (int16 out of range)" if self.out_of_range else self.storage
+        return (f"{self.slots} frames at {self.fps:.0f} fps, {storage}, "
+                f"budget {self.budget / 1048576:.0f} MB{share}, eviction '{self.eviction}'")
+
+    def stats(self) -> Dict[str, Any]:
+        return {'period': self.period, 'slots': self.slots, 'stored': len(self.frames),
+                'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses,
+                'storage': self.storage, 'out_of_range': self.out_of_range}
@@ -0,0 +1,141 @@
+"""
+Растеризация на CPU - эквивалент GPU рендера для headless режима и тестов
+"""
+import math
+from array import array
+from typing import Tuple
+
+Color = Tuple[int, int, int, int]
+
+
+class CpuCanvas:
+    """RGB холст в памяти; ось y направлена вверх, как в OpenGL"""
+
+    def __init__(self, width: int, height: int, background: Tuple[int, int, int] = (0, 0, 0)):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.pixels = bytearray(bytes(background) * (width * height))
+
+    def clear(self):
+        """Заливает холст цветом фона"""
+        self.pixels = bytearray(bytes(self.background) * (self.width * self.height))
+
+    def fade(self, amount: float):
+        """
+        Затухание следа: каждый канал умножается на (1 - amount)
+        Через таблицу bytes.translate - один проход на C-скорости
+        """
+        keep = max(0.0, min(1.0, 1.0 - amount))
+        table = bytes(int(value * keep) for value in range(256))
+        self.pixels = bytearray(self.pixels.translate(table))
+
+    def blend_pixel(self, x: int, y: int, color: Color):
+        """Смешивает пиксель с цветом (альфа 0..255)"""
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return
+        offset = ((self.height - 1 - y) * self.width + x) * 3
+        r, g, b, a = color
+        pixels = self.pixels
+        if a >= 255:
+            pixels[offset] = r
+            pixels[offset + 1] = g
+            pixels[offset + 2] = b
+            return
+        pixels[offset] += (r - pixels[offset]) * a // 255
+        pixels[offset + 1] += (g - pixels[offset + 1]) * a // 255
+        pixels[offset + 2] += (b - pixels[offset + 2]) * a // 255
+
+    def draw_line(self, x1: float, y1: float, x2: float, y2: float, color: Color):
+        """Отрезок толщиной 1 пиксель (DDA)"""
+        steps = int(max(abs(x2 - x1), abs(y2 - y1))) + 1
+        dx = (x2 - x1) / steps
+        dy = (y2 - y1) / steps
+        x, y = x1, y1
+        for _ in range(steps + 1):
+            self.blend_pixel(int(round(x)), int(round(y)), color)
+            x += dx
+            y += dy
+
+    def draw_segments(self, endpoints, colors: array, offset_x: float = 0.0, offset_y: float = 0.0,
+                      scale_x: float = 1.0, scale_y: float = 1.0):
+        """
+        Рисует отрезки из буферов рендерера:
+        endpoints - (x1, y1, x2, y2), colors - RGBA по вершинам (цвет берется у первой)
+        Точка на холсте: ((x + offset_x) * scale_x, (y + offset_y) * scale_y)
+        """
+        for index, (x1, y1, x2, y2) in enumerate(endpoints):
+            base = index * 8
+            color = tuple(colors[base:base + 4]) if len(colors) >= base + 4 else (255, 255, 255, 255)
+            self.draw_line((x1 + offset_x) * scale_x, (y1 + offset_y) * scale_y,
+                           (x2 + offset_x) * scale_x, (y2 + offset_y) * scale_y, color)
+
+    def fill_quad(self, x1: float, y1: float, x2: float, y2: float, normal_x: float, normal_y: float,
+                  color1: Color, color2: Color):
+        """
+        Параллелограмм A + u * (B - A) + v * N, u в [0, 1], v в [-1, 1]:
+        закрашиваются пиксели, центр которых внутри; цвет - от color1 к color2 по u
+        """
+        dx, dy = x2 - x1, y2 - y1
+        det = dx * normal_y - dy * normal_x
+        if det == 0:
+            return
+        xs = (x1 - normal_x, x1 + normal_x, x2 - normal_x, x2 + normal_x)
+        ys = (y1 - normal_y, y1 + normal_y, y2 - normal_y, y2 + normal_y)
+        left, right = max(0, int(min(xs))), min(self.width - 1, int(max(xs)))
+        bottom, top = max(0, int(min(ys))), min(self.height - 1, int(max(ys)))
+
+        for py in range(bottom, top + 1):
+            cy = py + 0.5 - y1
+            for px in range(left, right + 1):
+                cx = px + 0.5 - x1
+                u = (cx * normal_y - cy * normal_x) / det
+                v = (dx * cy - dy * cx) / det
+                if 0.0 <= u <= 1.0 and -1.0 <= v <= 1.0:
+                    color = tuple(int(a + (b - a) * u + 0.5) for a, b in zip(color1, color2))
+                    self.blend_pixel(px, py, color)
+
+    def draw_thick_segments(self, endpoints, colors: array, widths, offset_x: float = 0.0,
+                            offset_y: float = 0.0, scale_x: float = 1.0, scale_y: float = 1.0):
+        """
+        Эталон ThickLineRenderer: отрезок - четырехугольник толщиной widths[i]
+        (в единицах сцены, как в шейдере), цвет интерполируется между концами
+        """
+        for index, (x1, y1, x2, y2) in enumerate(endpoints):
+            base = index * 8
+            if len(colors) >= base + 8:
+                color1, color2 = tuple(colors[base:base + 4]), tuple(colors[base + 4:base + 8])
+            else:
+                color1 = color2 = (255, 255, 255, 255)
+            width = widths[index] if index < len(widths) else 1.0
+
+            length = math.hypot(x2 - x1, y2 - y1)
+            if length == 0:
+                continue
+            # Нормаль в единицах сцены, затем вместе с концами - в пиксели холста
+            normal_x = -(y2 - y1) / length * 0.5 * width * scale_x
+            normal_y = (x2 - x1) / length * 0.5 * width * scale_y
+            self.fill_quad((x1 + offset_x) * scale_x, (y1 + offset_y) * scale_y,
+                           (x2 + offset_x) * scale_x, (y2 + offset_y) * scale_y,
+                           normal_x, normal_y, color1, color2)
+
+    def get_pixel(self, x: int, y: int) -> Tuple[int, int, int]:
+        offset = ((self.height - 1 - y) * self.width + x) * 3
+        return tuple(self.pixels[offset:offset + 3])
+
+    def blit(self, pixels: bytes, width: int, height: int, x: int, y: int):
+        """
+        Копирует RGB изображение (строки сверху вниз, как pixels холста)
+        левым верхним углом в (x, y) от верхнего левого угла холста
+        """
+        columns = max(0, min(width, self.width - x))
+        for row in range(max(0, -y), min(height, self.height - y)):
+            source = row * width * 3
+            target = ((y + row) * self.width + x) * 3
+            self.pixels[target:target + columns * 3] = pixels[source:source + columns * 3]
+
+    def save_ppm(self, path: str):
+        """Сохраняет холст в PPM (P6) - без внешних зависимостей"""
+        with open(path, 'wb') as f:
+            f.write(f"P6 {self.width} {self.height} 255\n".encode('ascii'))
+            f.write(self.pixels)
@@ -0,0 +1,749 @@
+"""
+Рендерер линий: все отрезки паттерна в одном vertex list (GL_LINES)
+Позиции и цвета хранятся упакованными массивами и загружаются целиком раз в кадр
+
+StripRenderer - то же, но общие концы отрезков хранятся один раз: ломаные
+(GL_LINE_STRIP) с индексом перезапуска примитива, тоже один вызов отрисовки
+
+ThickLineRenderer - толстые линии без glLineWidth: каждый отрезок - экземпляр
+четырехугольника, который разворачивает вершинный шейдер
+"""
+import ctypes
+from array import array
+from bisect import bisect_left
+from typing import Hashable, List, Optional, Tuple
+import pyglet
+from pyglet import gl
+from pyglet.graphics.shader import Shader, ShaderProgram
+from pyglet.graphics.vertexarray import VertexArray
+from pyglet.graphics.vertexbuffer import BufferObject
+
+LINE_VERTEX_SOURCE = """#version 150 core
+    in vec2 position;
+    in vec4 colors;
+    out vec4 vertex_colors;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    uniform vec2 offset;
+
+    void main()
+    {
+        gl_Position = window.projection * window.view * vec4(position + offset, 0.0, 1.0);
+        vertex_colors = colors;
+    }
+"""
+
+LINE_FRAGMENT_SOURCE = """#version 150 core
+    in vec4 vertex_colors;
+    out vec4 final_color;
+
+    void main()
+    {
+        final_color = vertex_colors;
+    }
+"""
+
+# Толстая линия: угол четырехугольника (доля вдоль отрезка, сторона -1/1)
+# и данные экземпляра - концы отрезка, цвета концов и толщина
+THICK_LINE_VERTEX_SOURCE = """#version 150 core
+    in vec2 corner;
+    in vec4 segment;
+    in vec4 color1;
+    in vec4 color2;
+    in float width;
+    out vec4 vertex_colors;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    uniform vec2 offset;
+
+    void main()
+    {
+        vec2 direction = segment.zw - segment.xy;
+        float size = length(direction);
+        direction = size > 0.0 ? direction / size : vec2(1.0, 0.0);
+        vec2 normal = vec2(-direction.y, direction.x);
+        vec2 point = mix(segment.xy, segment.zw, corner.x) + normal * (corner.y * 0.5 * width);
+        gl_Position = window.projection * window.view * vec4(point + offset, 0.0, 1.0);
+        vertex_colors = mix(color1, color2, corner.x);
+    }
+"""
+
+_line_program = None
+_thick_line_program = None
+
+
+def get_line_program() -> ShaderProgram:
+    """Шейдер линий: позиция (x, y) и цвет вершины, без текстур"""
+    global _line_program
+    if _line_program is None:
+        _line_program = ShaderProgram(Shader(LINE_VERTEX_SOURCE, 'vertex'),
+                                      Shader(LINE_FRAGMENT_SOURCE, 'fragment'))
+    return _line_program
+
+
+def get_thick_line_program() -> ShaderProgram:
+    """Шейдер толстых линий (экземпляры четырехугольника)"""
+    global _thick_line_program
+    if _thick_line_program is None:
+        _thick_line_program = ShaderProgram(Shader(THICK_LINE_VERTEX_SOURCE, 'vertex'),
+                                            Shader(LINE_FRAGMENT_SOURCE, 'fragment'))
+    return _thick_line_program
+
+
+class LineGroup(pyglet.graphics.Group):
+    """
+    Состояние отрисовки одного LineRenderer: смещение в центр и смешивание (альфа)
+    Смещение - uniform, поэтому смена центра не трогает вершины
+    """
+
+    def __init__(self, program: ShaderProgram, order: int = 0, parent: pyglet.graphics.Group = None):
+        super().__init__(order, parent)
+        self.program = program
+        self.offset = (0.0, 0.0)
+
+    # У каждого рендерера свое смещение - группы не сливаются в batch
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def set_state(self):
+        self.program.use()
+        self.program['offset'] = self.offset
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+
+    def unset_state(self):
+        gl.glDisable(gl.GL_BLEND)
+        self.program.stop()
+
+
+class LineRenderer:
+    """
+    Отрезки как пары вершин: позиция (x, y) и цвет RGBA (uint8)
+    Позиции хранятся относительно центра; центр задается set_offset
+    """
+
+    def __init__(self, batch: pyglet.graphics.Batch = None):
+        self.batch = batch or pyglet.graphics.Batch()
+        self.program = get_line_program()
+        self.group = LineGroup(self.program)
+        self.vertex_list = None
+        self.segment_count = 0
+        self.draw_count = None  # Отрезков к отрисовке после отсечения (None - все)
+
+        # Статистика загрузки за последний кадр (байт)
+        self.uploaded_bytes = 0
+
+    def resize(self, segment_count: int, vertex_keys: List[Hashable] = None):
+        """
+        Пересоздает vertex list под segment_count отрезков
+        vertex_keys (ключи концов отрезков) нужны StripRenderer, здесь не используются
+        """
+        if self.vertex_list is not None:
+            self.vertex_list.delete()
+            self.vertex_list = None
+
+        self.segment_count = segment_count
+        self.draw_count = None
+        if segment_count == 0:
+            return
+
+        vertex_count = segment_count * 2
+        self.vertex_list = self.program.vertex_list(
+            vertex_count, gl.GL_LINES,
+            batch=self.batch, group=self.group,
+            position=('f', array('f', bytes(4 * 2 * vertex_count))),
+            colors=('Bn', array('B', [255]) * (4 * vertex_count))
+        )
+
+    def set_segment_count(self, segment_count: int, vertex_keys: List[Hashable] = None):
+        """
+        Меняет число отрезков, сохраняя данные первых
+        Домен pyglet растет степенями двойки - рост амортизирован, как у динамического массива
+        """
+        if self.vertex_list is None or segment_count == 0:
+            self.resize(segment_count)
+            return
+        self.vertex_list.resize(2 * segment_count)
+        self.segment_count = segment_count
+
+    def upload_segments(self, first_segment: int, endpoints: List[Tuple[float, float, float, float]]):
+        """Загружает отрезки начиная с first_segment (остальные не трогает)"""
+        if self.vertex_list is None or not endpoints:
+            return
+        positions = self._pack_positions(endpoints)
+        buffer = self.vertex_list.domain.attrib_name_buffers['position']
+        buffer.set_region(self.vertex_list.start + 2 * first_segment, 2 * len(endpoints), positions)
+        self.uploaded_bytes = len(positions) * positions.itemsize
+
+    def set_offset(self, x: float, y: float):
+        """Смещение всех отрезков (центр сцены) - O(1), вершины не меняются"""
+        self.group.offset = (float(x), float(y))
+
+    @staticmethod
+    def _pack_positions(endpoints, shift_x: float = 0.0, shift_y: float = 0.0) -> array:
+        positions = array('f')
+        for x1, y1, x2, y2 in endpoints:
+            positions.extend((x1 + shift_x, y1 + shift_y,
+                              x2 + shift_x, y2 + shift_y))
+        return positions
+
+    def upload_positions(self, endpoints: List[Tuple[float, float, float, float]],
+                         ranges: Optional[List[Tuple[int, int]]] = None,
+                         shift_x: float = 0.0, shift_y: float = 0.0):
+        """
+        Загружает концы отрезков (относительно центра)
+        ranges - диапазоны отрезков [start, end), которые изменились; остальные
+        остаются от прошлой загрузки. None - загрузка целиком
+        shift_x, shift_y - сдвиг, если endpoints заданы не относительно центра
+        """
+        if self.vertex_list is None:
+            return
+
+        if ranges is None:
+            self.upload_packed(self._pack_positions(endpoints, shift_x, shift_y))
+            return
+
+        # Запись в регион буфера помечает грязным только его (vertex_list.position - весь список)
+        buffer = self.vertex_list.domain.attrib_name_buffers['position']
+        self.uploaded_bytes = 0
+        for start, end in ranges:
+            positions = self._pack_positions(endpoints[start:end], shift_x, shift_y)
+            buffer.set_region(self.vertex_list.start + 2 * start, 2 * (end - start), positions)
+            self.uploaded_bytes += len(positions) * positions.itemsize
+
+    def upload_packed(self, positions: array, ranges: Optional[List[Tuple[int, int]]] = None):
+        """
+        Загружает уже упакованные позиции (x1, y1, x2, y2 на отрезок)
+        Один упакованный массив может загружаться в несколько рендереров
+        """
+        if self.vertex_list is None:
+            return
+
+        if ranges is None:
+            self.vertex_list.position[:] = positions
+            self.uploaded_bytes = len(positions) * positions.itemsize
+            return
+
+        buffer = self.vertex_list.domain.attrib_name_buffers['position']
+        self.uploaded_bytes = 0
+        for start, end in ranges:
+            buffer.set_region(self.vertex_list.start + 2 * start, 2 * (end - start),
+                              positions[4 * start:4 * end])
+            self.uploaded_bytes += 4 * (end - start) * positions.itemsize
+
+    def upload_visible(self, positions: array):
+        """
+        Сжатый кадр после отсечения: позиции видимых отрезков в начало буфера,
+        рисуются только они (цвета и толщины - upload_colors/upload_widths с нуля)
+        """
+        if self.vertex_list is None:
+            return
+        count = len(positions) // 4
+        if count:
+            buffer = self.vertex_list.domain.attrib_name_buffers['position']
+            buffer.set_region(self.vertex_list.start, 2 * count, positions)
+        self.uploaded_bytes = len(positions) * positions.itemsize
+        self.draw_count = count
+
+    def upload_size(self, ranges: Optional[List[Tuple[int, int]]]) -> int:
+        """Байт позиций, загружаемых за кадр при изменившихся ranges (None - все)"""
+        if ranges is None:
+            return 16 * self.segment_count
+        return sum(16 * (end - start) for start, end in ranges)
+
+    def upload_colors(self, colors: array, first_segment: int = 0):
+        """Загружает упакованные цвета RGBA (4 байта на вершину), с first_segment - только хвост"""
+        if self.vertex_list is None:
+            return
+
+        if first_segment == 0 and len(colors) == 8 * self.segment_count:
+            self.vertex_list.colors[:] = colors
+        elif colors:
+            buffer = self.vertex_list.domain.attrib_name_buffers['colors']
+            buffer.set_region(self.vertex_list.start + 2 * first_segment, len(colors) // 4, colors)
+        self.uploaded_bytes += len(colors)
+
+    def draw(self):
+        """Рисует все отрезки одним вызовом (после отсечения - первые draw_count)"""
+        if self.vertex_list is None:
+            return
+        if self.draw_count is None:
+            self.batch.draw()
+            return
+        if not self.draw_count:
+            return
+        domain = self.vertex_list.domain
+        self.group.set_state()
+        domain.vao.bind()
+        for buffer, _ in domain.buffer_attributes:
+            buffer.commit()
+        gl.glDrawArrays(gl.GL_LINES, self.vertex_list.start, 2 * min(self.draw_count, self.segment_count))
+        domain.vao.unbind()
+        self.group.unset_state()
+
+    def delete(self):
+        """Освобождает буферы"""
+        self.resize(0)
+
+
+# Индекс перезапуска примитива: следующий индекс начинает новую ломаную
+RESTART_INDEX = 0xFFFFFFFF
+
+
+def strip_layout(vertex_keys: List[Hashable]) -> Tuple[array, array]:
+    """
+    Ломаные из отрезков: vertex_keys - ключи концов (по два на отрезок), например (n, индекс точки)
+
+    Возвращает (sources, indices): sources[v] = 2 * отрезок + конец, откуда берется
+    вершина v (вершины идут в порядке первого появления, sources возрастает);
+    indices - индексы ломаных, разделенные RESTART_INDEX. Отрезок, который
+    начинается там, где кончился предыдущий, продолжает ломаную; одинаковые
+    ключи - одна вершина (замыкание контура - индекс первой вершины)
+    """
+    sources = array('I')
+    indices = array('I')
+    vertex_of = {}
+    previous = None
+    for source in range(0, len(vertex_keys) - 1, 2):
+        start, end = vertex_keys[source], vertex_keys[source + 1]
+        if start != previous or not indices:
+            if indices:
+                indices.append(RESTART_INDEX)
+            vertex = vertex_of.get(start)
+            if vertex is None:
+                vertex = vertex_of[start] = len(sources)
+                sources.append(source)
+            indices.append(vertex)
+        vertex = vertex_of.get(end)
+        if vertex is None:
+            vertex = vertex_of[end] = len(sources)
+            sources.append(source + 1)
+        indices.append(vertex)
+        previous = end
+    return sources, indices
+
+
+class StripGroup(LineGroup):
+    """LineGroup с перезапуском примитива для ломаных"""
+
+    def set_state(self):
+        super().set_state()
+        gl.glEnable(gl.GL_PRIMITIVE_RESTART)
+        gl.glPrimitiveRestartIndex(RESTART_INDEX)
+
+    def unset_state(self):
+        gl.glDisable(gl.GL_PRIMITIVE_RESTART)
+        super().unset_state()
+
+
+class StripRenderer(LineRenderer):
+    """
+    Отрезки паттерна как ломаные (GL_LINE_STRIP) с перезапуском примитива
+
+    Интерфейс как у LineRenderer: на входе концы отрезков и диапазоны отрезков,
+    но общая точка соседних отрезков - одна вершина. Для connect/connectClosed
+    это вдвое меньше вершин и байт загрузки за кадр
+    """
+
+    def __init__(self, batch: pyglet.graphics.Batch = None):
+        super().__init__(batch)
+        self.group = StripGroup(self.program)
+        self.sources = array('I')
+        self.indices = array('I')
+        # Копия буферов: при смене числа отрезков vertex list пересоздается из нее
+        self.positions = array('f')
+        self.colors = array('B')
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.sources)
+
+    def _first_vertex(self, segment: int) -> int:
+        """Первая вершина, взятая из отрезка segment или дальше"""
+        return bisect_left(self.sources, 2 * segment)
+
+    def _create_vertex_list(self):
+        if self.vertex_list is not None:
+            self.vertex_list.delete()
+            self.vertex_list = None
+        if not self.sources:
+            return
+
+        self.vertex_list = self.program.vertex_list_indexed(
+            len(self.sources), gl.GL_LINE_STRIP, [0] * len(self.indices),
+            batch=self.batch, group=self.group,
+            position=('f', self.positions),
+            colors=('Bn', self.colors)
+        )
+        # Индексы пишутся в буфер напрямую: pyglet сдвигает их на start, а RESTART_INDEX сдвигать нельзя
+        start = self.vertex_list.start
+        indices = array('I', (index if index == RESTART_INDEX else index + start
+                              for index in self.indices))
+        self.vertex_list.domain.index_buffer.set_region(
+            self.vertex_list.index_start, len(indices), indices)
+
+    def resize(self, segment_count: int, vertex_keys: List[Hashable] = None):
+        """Пересоздает вершины и ломаные под segment_count отрезков с концами vertex_keys"""
+        self.segment_count = segment_count
+        self.sources, self.indices = strip_layout(vertex_keys[:2 * segment_count]) \
+            if segment_count and vertex_keys else (array('I'), array('I'))
+        self.positions = array('f', bytes(4 * 2 * len(self.sources)))
+        self.colors = array('B', [255]) * (4 * len(self.sources))
+        self._create_vertex_list()
+
+    def set_segment_count(self, segment_count: int, vertex_keys: List[Hashable] = None):
+        """
+        Меняет число отрезков, сохраняя вершины первых (раскладка по префиксу не меняется)
+        Индексы ломаных меняются целиком, поэтому vertex list пересоздается из копии буферов
+        """
+        self.segment_count = segment_count
+        self.sources, self.indices = strip_layout(vertex_keys[:2 * segment_count])
+        count = len(self.sources)
+        del self.positions[2 * count:]
+        del self.colors[4 * count:]
+        if len(self.positions) < 2 * count:
+            self.positions.extend(array('f', bytes(4 * (2 * count - len(self.positions)))))
+        if len(self.colors) < 4 * count:
+            self.colors.extend(array('B', [255]) * (4 * count - len(self.colors)))
+        self._create_vertex_list()
+
+    def _pack_vertices(self, endpoints, first_vertex: int, end_vertex: int, first_segment: int = 0,
+                       shift_x: float = 0.0, shift_y: float = 0.0) -> array:
+        """Позиции вершин [first_vertex, end_vertex); endpoints[0] - отрезок first_segment"""
+        sources = self.sources
+        base = 2 * first_segment
+        positions = array('f')
+        for vertex in range(first_vertex, end_vertex):
+            source = sources[vertex] - base
+            x1, y1, x2, y2 = endpoints[source >> 1]
+            if source & 1:
+                positions.append(x2 + shift_x)
+                positions.append(y2 + shift_y)
+            else:
+                positions.append(x1 + shift_x)
+                positions.append(y1 + shift_y)
+        return positions
+
+    def _write_positions(self, first_vertex: int, positions: array):
+        self.positions[2 * first_vertex:2 * first_vertex + len(positions)] = positions
+        buffer = self.vertex_list.domain.attrib_name_buffers['position']
+        buffer.set_region(self.vertex_list.start + first_vertex, len(positions) // 2, positions)
+        self.uploaded_bytes += len(positions) * positions.itemsize
+
+    def upload_segments(self, first_segment: int, endpoints: List[Tuple[float, float, float, float]]):
+        """Загружает вершины отрезков начиная с first_segment"""
+        if self.vertex_list is None or not endpoints:
+            return
+        first_vertex = self._first_vertex(first_segment)
+        self.uploaded_bytes = 0
+        self._write_positions(first_vertex, self._pack_vertices(
+            endpoints, first_vertex, self.vertex_count, first_segment))
+
+    def upload_positions(self, endpoints: List[Tuple[float, float, float, float]],
+                         ranges: Optional[List[Tuple[int, int]]] = None,
+                         shift_x: float = 0.0, shift_y: float = 0.0):
+        """Как LineRenderer.upload_positions: ranges - диапазоны отрезков"""
+        if self.vertex_list is None:
+            return
+
+        self.uploaded_bytes = 0
+        if ranges is None:
+            ranges = ((0, self.segment_count),)
+        for start, end in ranges:
+            first_vertex, end_vertex = self._first_vertex(start), self._first_vertex(end)
+            if end_vertex > first_vertex:
+                self._write_positions(first_vertex, self._pack_vertices(
+                    endpoints, first_vertex, end_vertex, 0, shift_x, shift_y))
+
+    def upload_packed(self, positions: array, ranges: Optional[List[Tuple[int, int]]] = None):
+        """Упакованные позиции отрезков (x1, y1, x2, y2): вершины берутся по sources"""
+        endpoints = [tuple(positions[4 * segment:4 * segment + 4]) for segment in range(self.segment_count)]
+        self.upload_positions(endpoints, ranges)
+
+    def upload_size(self, ranges: Optional[List[Tuple[int, int]]]) -> int:
+        if ranges is None:
+            return 8 * self.vertex_count
+        return sum(8 * (self._first_vertex(end) - self._first_vertex(start)) for start, end in ranges)
+
+    def upload_colors(self, colors: array, first_segment: int = 0):
+        """Цвета по вершинам отрезков (как у LineRenderer) - берутся для вершин ломаных"""
+        if self.vertex_list is None or not colors:
+            return
+
+        first_vertex = self._first_vertex(first_segment)
+        base = 2 * first_segment
+        source_colors = memoryview(colors)
+        packed = array('B', b''.join(source_colors[4 * (source - base):4 * (source - base) + 4]
+                                     for source in self.sources[first_vertex:]))
+        self.colors[4 * first_vertex:] = packed
+        buffer = self.vertex_list.domain.attrib_name_buffers['colors']
+        buffer.set_region(self.vertex_list.start + first_vertex, len(packed) // 4, packed)
+        self.uploaded_bytes += len(packed)
+
+
+def _pointer(data: array):
+    """Указатель на данные массива для glBufferSubData (без копии)"""
+    return (ctypes.c_ubyte * (len(data) * data.itemsize)).from_buffer(data)
+
+
+class ThickLineRenderer(LineRenderer):
+    """
+    Отрезки произвольной толщины: экземпляры одного четырехугольника
+
+    Данные экземпляра (на отрезок): концы (4 float), цвета концов (2 x RGBA uint8)
+    и толщина (float) - те же упаковки, что у LineRenderer, плюс толщины.
+    Все отрезки - один glDrawArraysInstanced; не зависит от glLineWidth,
+    который в core profile часто ограничен толщиной 1
+    """
+
+    # Углы четырехугольника в порядке GL_TRIANGLE_STRIP
+    CORNERS = (0.0, -1.0, 1.0, -1.0, 0.0, 1.0, 1.0, 1.0)
+
+    # (байт на отрезок, атрибуты: имя, компонент, тип, нормализация, смещение)
+    INSTANCE_LAYOUT = {
+        'segment': (16, (('segment', 4, gl.GL_FLOAT, False, 0),)),
+        'colors': (8, (('color1', 4, gl.GL_UNSIGNED_BYTE, True, 0),
+                       ('color2', 4, gl.GL_UNSIGNED_BYTE, True, 4))),
+        'width': (4, (('width', 1, gl.GL_FLOAT, False, 0),)),
+    }
+
+    def __init__(self, batch: pyglet.graphics.Batch = None):
+        super().__init__(batch)
+        self.program = get_thick_line_program()
+        self.group = LineGroup(self.program)
+        self.capacity = 0
+        self.line_width = 1.0  # Толщина новых отрезков, пока не загружены свои
+        self.vao = None
+        self.corner_buffer = None
+        self.buffers = {}  # 'segment', 'colors', 'width' -> BufferObject экземпляров
+
+    def _create(self, capacity: int):
+        """VAO, буфер углов и буферы экземпляров на capacity отрезков"""
+        locations = {name: info['location'] for name, info in self.program.attributes.items()}
+        self.vao = VertexArray()
+        self.vao.bind()
+
+        corners = array('f', self.CORNERS)
+        self.corner_buffer = BufferObject(len(corners) * corners.itemsize, gl.GL_STATIC_DRAW)
+        self.corner_buffer.set_data(_pointer(corners))
+        gl.glEnableVertexAttribArray(locations['corner'])
+        gl.glVertexAttribPointer(locations['corner'], 2, gl.GL_FLOAT, False, 0, 0)
+
+        for key, (stride, attributes) in self.INSTANCE_LAYOUT.items():
+            buffer = BufferObject(stride * capacity)
+            buffer.bind()
+            for name, size, gl_type, normalized, offset in attributes:
+                gl.glEnableVertexAttribArray(locations[name])
+                gl.glVertexAttribPointer(locations[name], size, gl_type, normalized, stride, offset)
+                gl.glVertexAttribDivisor(locations[name], 1)
+            self.buffers[key] = buffer
+
+        self.vao.unbind()
+        self.capacity = capacity
+
+    def _reserve(self, segment_count: int):
+        """Емкость буферов степенями двойки: рост амортизирован, данные сохраняются"""
+        if segment_count <= self.capacity:
+            return
+        capacity = 1
+        while capacity < segment_count:
+            capacity *= 2
+        if self.vao is None:
+            self._create(capacity)
+            return
+        for key, (stride, _) in self.INSTANCE_LAYOUT.items():
+            self.buffers[key].resize(stride * capacity)
+        self.capacity = capacity
+
+    def _write(self, key: str, first_segment: int, data: array):
+        stride = self.INSTANCE_LAYOUT[key][0]
+        size = len(data) * data.itemsize
+        if size:
+            self.buffers[key].set_data_region(_pointer(data), stride * first_segment, size)
+            self.uploaded_bytes += size
+
+    def _fill_defaults(self, first_segment: int, end_segment: int):
+        """Новые отрезки: белые, толщина line_width"""
+        count = end_segment - first_segment
+        if count > 0:
+            self._write('colors', first_segment, array('B', [255]) * (8 * count))
+            self._write('width', first_segment, array('f', [self.line_width]) * count)
+
+    def resize(self, segment_count: int, vertex_keys: List[Hashable] = None):
+        """Буферы под segment_count отрезков (содержимое - по умолчанию)"""
+        self.segment_count = segment_count
+        self.draw_count = None
+        if segment_count == 0:
+            return
+        self._reserve(segment_count)
+        self._fill_defaults(0, segment_count)
+
+    def set_segment_count(self, segment_count: int, vertex_keys: List[Hashable] = None):
+        """Меняет число отрезков, сохраняя данные первых"""
+        old_count = self.segment_count
+        self._reserve(segment_count)
+        self.segment_count = segment_count
+        self._fill_defaults(old_count, segment_count)
+
+    def set_line_width(self, width: float):
+        """Одна толщина для всех отрезков"""
+        self.line_width = float(width)
+        if self.segment_count:
+            self._write('width', 0, array('f', [self.line_width]) * self.segment_count)
+
+    def upload_segments(self, first_segment: int, endpoints: List[Tuple[float, float, float, float]]):
+        if self.vao is None or not endpoints:
+            return
+        self.uploaded_bytes = 0
+        self._write('segment', first_segment, self._pack_positions(endpoints))
+
+    def upload_positions(self, endpoints: List[Tuple[float, float, float, float]],
+                         ranges: Optional[List[Tuple[int, int]]] = None,
+                         shift_x: float = 0.0, shift_y: float = 0.0):
+        """Как LineRenderer.upload_positions: концы отрезков относительно центра"""
+        if self.vao is None:
+            return
+        self.uploaded_bytes = 0
+        if ranges is None:
+            ranges = ((0, self.segment_count),)
+        for start, end in ranges:
+            self._write('segment', start, self._pack_positions(endpoints[start:end], shift_x, shift_y))
+
+    def upload_packed(self, positions: array, ranges: Optional[List[Tuple[int, int]]] = None):
+        if self.vao is None:
+            return
+        self.uploaded_bytes = 0
+        if ranges is None:
+            ranges = ((0, self.segment_count),)
+        for start, end in ranges:
+            self._write('segment', start, positions[4 * start:4 * end])
+
+    def upload_visible(self, positions: array):
+        """Как LineRenderer.upload_visible: видимые отрезки в начало буферов экземпляров"""
+        if self.vao is None:
+            return
+        self.uploaded_bytes = 0
+        self._write('segment', 0, positions)
+        self.draw_count = len(positions) // 4
+
+    def upload_colors(self, colors: array, first_segment: int = 0):
+        """Цвета по вершинам отрезков (как у LineRenderer) - это и есть цвета концов экземпляра"""
+        if self.vao is not None:
+            self._write('colors', first_segment, colors)
+
+    def upload_widths(self, widths: array, first_segment: int = 0):
+        """Толщины отрезков (float на отрезок)"""
+        if self.vao is not None:
+            self._write('width', first_segment, widths)
+
+    def draw(self):
+        """Все отрезки - один instanced вызов (после отсечения - первые draw_count)"""
+        count = self.segment_count if self.draw_count is None else min(self.draw_count, self.segment_count)
+        if self.vao is None or count == 0:
+            return
+        self.group.set_state()
+        self.vao.bind()
+        gl.glDrawArraysInstanced(gl.GL_TRIANGLE_STRIP, 0, 4, count)
+        self.vao.unbind()
+        self.group.unset_state()
+
+    def delete(self):
+        """Освобождает буферы"""
+        if self.vao is not None:
+            for buffer in self.buffers.values():
+                buffer.delete()
+            self.corner_buffer.delete()
+            self.vao.delete()
+        self.vao = None
+        self.buffers = {}
+        self.capacity = 0
+        self.segment_count = 0
+        self.draw_count = None
+
+
+class TrailBuffer:
+    """
+    Накопление следа в постоянном offscreen framebuffer
+
+    Каждый кадр: полноэкранный полупрозрачный прямоугольник гасит прошлое
+    изображение на fade, поверх рисуются текущие линии, затем текстура
+    выводится на экран. След стоит один полноэкранный проход, а не копии геометрии
+    """
+
+    def __init__(self, width: int, height: int, fade: float = 0.1):
+        self.width = width
+        self.height = height
+        self.fade = fade
+        self.framebuffer = None
+        self.texture = None
+        self.fade_quad = None
+
+    def _create(self):
+        """Создает framebuffer и текстуру (нужен GL контекст)"""
+        self.texture = pyglet.image.Texture.create(self.width, self.height)
+        self.framebuffer = pyglet.image.Framebuffer()
+        self.framebuffer.attach_texture(self.texture)
+
+        self.fade_quad = pyglet.shapes.Rectangle(0, 0, self.width, self.height, color=(0, 0, 0))
+        self.fade_quad.opacity = int(max(0.0, min(1.0, self.fade)) * 255)
+
+        # Начинаем с чистого буфера
+        self.framebuffer.bind()
+        gl.glClearColor(0, 0, 0, 1)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        self.framebuffer.unbind()
+
+    def resize(self, width: int, height: int):
+        """Новый размер окна - буфер пересоздается при следующей отрисовке"""
+        self.width = width
+        self.height = height
+        self.delete()
+
+    def delete(self):
+        """Освобождает framebuffer, текстуру и прямоугольник затухания"""
+        if self.framebuffer is not None:
+            self.framebuffer.delete()
+            self.texture.delete()
+            self.fade_quad.delete()
+        self.framebuffer = None
+        self.texture = None
+        self.fade_quad = None
+
+    def accumulate(self, draw_lines):
+        """Гасит след и рисует линии в буфер (один кадр следа)"""
+        if self.framebuffer is None:
+            self._create()
+
+        self.framebuffer.bind()
+        self.fade_quad.draw()
+        draw_lines()
+        self.framebuffer.unbind()
+
+    def clear(self):
+        """Пустой след (после перемотки он накапливается заново)"""
+        if self.framebuffer is None:
+            return
+        self.framebuffer.bind()
+        gl.glClearColor(0, 0, 0, 1)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        self.framebuffer.unbind()
+
+    def draw(self, draw_lines, accumulate: bool = True):
+        """
+        Гасит след, рисует линии в буфер и выводит буфер на экран
+        accumulate=False - только вывод (на паузе след не гаснет)
+        """
+        if accumulate or self.framebuffer is None:
+            self.accumulate(draw_lines)
+
+        self.texture.blit(0, 0)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Сервер сцены: один движок считает геометрию раз в тик, несколько выводов
+(окна или headless холсты) показывают ее, каждый со своим видом - кроп и масштаб
+Запуск: python scene_server.py config.json --view 0,0,400,600 --view 400,0,400,600
+"""
+import argparse
+from array import array
+from typing import Optional, Tuple
+from functions.diagnostics import hot_log
+from raster import CpuCanvas
+
+try:
+    import pyglet
+    from pyglet import gl
+    from pyglet.math import Mat4, Vec3
+    from renderer import LineRenderer, ThickLineRenderer, TrailBuffer
+except ImportError:
+    pyglet = None
+    LineRenderer = None
+    ThickLineRenderer = None
+    TrailBuffer = None
+
+
+class Viewport:
+    """Прямоугольник сцены (в пикселях сцены, y вверх), который показывает вывод"""
+
+    def __init__(self, x: float, y: float, width: float, height: float):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def parse(cls, text: str) -> 'Viewport':
+        """Из строки 'x,y,ширина,высота'"""
+        x, y, width, height = (float(value) for value in text.split(','))
+        return cls(x, y, width, height)
+
+    def scale_for(self, width: int, height: int) -> Tuple[float, float]:
+        """Масштаб, при котором прямоугольник заполняет вывод width x height"""
+        return width / self.width, height / self.height
+
+
+class SceneFrame:
+    """Результат одного тика, общий для всех выводов"""
+
+    __slots__ = ('time', 'generation', 'endpoints', 'positions', 'ranges',
+                 'colors', 'colors_changed', 'widths', 'widths_changed', 'center', 'line_width',
+                 'trail_fade')
+
+    def __init__(self, current_time: float, generation: int, endpoints, positions: array,
+                 ranges, colors: array, colors_changed: bool, widths: Optional[array],
+                 widths_changed: bool, center: Tuple[float, float], line_width: float,
+                 trail_fade: Optional[float] = None):
+        self.time = current_time
+        self.generation = generation  # Меняется, когда меняется набор линий
+        self.endpoints = endpoints
+        self.positions = positions    # Упакованные (x1, y1, x2, y2) относительно центра
+        self.ranges = ranges          # Изменившиеся линии (None - все)
+        self.colors = colors
+        self.colors_changed = colors_changed
+        self.widths = widths          # Толщины отрезков (None - тонкие линии line_width)
+        self.widths_changed = widths_changed
+        self.center = center
+        self.line_width = line_width
+        self.trail_fade = trail_fade  # Затухание следа за кадр (None - без следа)
+
+
+def pack_positions(endpoints) -> array:
+    """Упаковывает концы линий в массив float32 (как вершинный буфер)"""
+    positions = array('f')
+    for x1, y1, x2, y2 in endpoints:
+        positions.extend((x1, y1, x2, y2))
+    return positions
+
+
+class SceneServer:
+    """
+    Вычисляет кадр движка один раз за тик и раздает его выводам
+    N выводов стоят одно вычисление; каждый вывод только загружает буфер
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.sinks = []
+        self.frame = None
+        self.generation = 0
+        self.evaluations = 0
+        self._pattern = None
+        self._line_count = -1
+
+    def add_sink(self, sink):
+        """Подключает вывод; он получит кадр целиком на следующем тике"""
+        sink.attach(self)
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+
+    def tick(self, current_time: float) -> Optional[SceneFrame]:
+        """Вычисляет кадр на момент current_time и отдает его всем выводам"""
+        hot_log.maybe_summary()
+
+        pattern = self.engine.current_pattern
+        if pattern is None:
+            return None
+
+        # Новый паттерн или число линий - выводам нужна полная загрузка
+        new_lines = pattern is not self._pattern or pattern.get_line_count() != self._line_count
+        if new_lines:
+            self.generation += 1
+            self._pattern = pattern
+            self._line_count = pattern.get_line_count()
+
+        pattern.begin_frame(current_time)
+        endpoints = self.engine.frame_endpoints(current_time)
+        colors_changed = new_lines or not pattern.colors.static
+        colors = pattern.compute_colors(current_time) if colors_changed else self.frame.colors
+
+        # Толстые линии (как выбрал бы паттерн для своего окна) - с толщинами отрезков
+        widths, widths_changed = None, False
+        if pattern.renderer_kind() == 'thick':
+            widths_changed = new_lines or not pattern.widths.static
+            widths = pattern.compute_widths(current_time) if widths_changed else self.frame.widths
+
+        self.frame = SceneFrame(
+            current_time, self.generation, endpoints, pack_positions(endpoints),
+            None if new_lines else pattern.dirty_ranges,
+            colors, colors_changed, widths, widths_changed, pattern.get_center(),
+            pattern.config.get('line_width', 1.0), self.engine.trail_fade
+        )
+        self.evaluations += 1
+
+        for sink in self.sinks:
+            sink.present(self.frame)
+        return self.frame
+
+    def scene_viewport(self) -> Viewport:
+        """Вид по умолчанию - сцена целиком (размер движка)"""
+        return Viewport(0, 0, self.engine.width, self.engine.height)
+
+
+class WindowSink:
+    """
+    Вывод в окно pyglet: свой рендерер, общий буфер концов линий
+    Рендерер - по кадру: ThickLineRenderer, если у кадра есть толщины отрезков
+    След (trails) - свой TrailBuffer окна размером с окно: общий кадр
+    добавляется в него один раз, затухание и вывод - в пикселях окна
+    """
+
+    def __init__(self, window: 'pyglet.window.Window', viewport: Viewport = None):
+        self.window = window
+        self.viewport = viewport
+        self.server = None
+        self.generation = None
+        self.line_width = 1.0
+        self.view = Mat4()
+        self.trails = None
+        self.frame_time = None
+        self._trail_time = None  # Момент кадра, последним добавленного в след
+
+        # Буферы создаются в контексте этого окна
+        window.switch_to()
+        self.renderer = LineRenderer(pyglet.graphics.Batch())
+        self.thick = False
+        window.push_handlers(on_draw=self.on_draw, on_resize=self.on_resize)
+
+    def attach(self, server: SceneServer):
+        self.server = server
+        self.apply_view()
+
+    def apply_view(self):
+        """Матрица вида окна: прямоугольник viewport растягивается на все окно"""
+        viewport = self.viewport or self.server.scene_viewport()
+        scale_x, scale_y = viewport.scale_for(self.window.width, self.window.height)
+        self.view = (Mat4.from_scale(Vec3(scale_x, scale_y, 1.0)) @
+                     Mat4.from_translation(Vec3(-viewport.x, -viewport.y, 0.0)))
+        self.window.view = self.view
+
+    def on_resize(self, width: int, height: int):
+        # Проекцию обновляет обработчик окна по умолчанию, здесь - только вид
+        if self.server is not None:
+            self.apply_view()
+        if self.trails is not None:
+            self.trails.resize(width, height)
+
+    def _update_trails(self, fade: Optional[float]):
+        """След окна по кадру: создается, меняет затухание или удаляется"""
+        if fade is None:
+            if self.trails is not None:
+                self.trails.delete()
+                self.trails = None
+            return
+        if self.trails is None:
+            # Framebuffer создается при первой отрисовке
+            self.trails = TrailBuffer(self.window.width, self.window.height, fade)
+        elif self.trails.fade != fade:
+            self.trails.delete()
+            self.trails.fade = fade
+
+    def present(self, frame: SceneFrame):
+        """Загружает кадр в буферы окна"""
+        self.window.switch_to()
+        if self.generation != frame.generation:
+            thick = frame.widths is not None
+            if thick != self.thick:
+                # Паттерн сменил вид линий - рендерер другого типа
+                self.renderer.delete()
+                self.renderer = ThickLineRenderer() if thick else LineRenderer(pyglet.graphics.Batch())
+                self.thick = thick
+            renderer = self.renderer
+            renderer.resize(len(frame.endpoints))
+            renderer.upload_packed(frame.positions)
+            renderer.upload_colors(frame.colors)
+            if thick:
+                renderer.upload_widths(frame.widths)
+            self.generation = frame.generation
+        else:
+            renderer = self.renderer
+            renderer.upload_packed(frame.positions, frame.ranges)
+            if frame.colors_changed:
+                renderer.upload_colors(frame.colors)
+            if self.thick and frame.widths_changed:
+                renderer.upload_widths(frame.widths)
+        renderer.set_offset(*frame.center)
+        self.line_width = frame.line_width
+        self._update_trails(frame.trail_fade)
+        self.frame_time = frame.time
+
+    def draw_lines(self):
+        if not self.thick:
+            gl.glLineWidth(self.line_width)
+        self.renderer.draw()
+
+    def _draw_view(self):
+        """Линии в буфер следа - в виде окна"""
+        self.window.view = self.view
+        self.draw_lines()
+        self.window.view = Mat4()
+
+    def on_draw(self):
+        self.window.clear()
+        if self.trails is None:
+            self.draw_lines()
+            return
+        # В след добавляется каждый новый кадр один раз: без тиков след не гаснет
+        fresh = self.frame_time != self._trail_time
+        self._trail_time = self.frame_time
+        self.window.view = Mat4()
+        self.trails.draw(self._draw_view, accumulate=fresh)
+        self.window.view = self.view
+
+    def close(self):
+        self.window.switch_to()
+        if self.trails is not None:
+            self.trails.delete()
+        self.renderer.delete()
+        self.window.close()
+
+
+class CanvasSink:
+    """Headless вывод: кадр растеризуется на CpuCanvas со своим видом"""
+
+    def __init__(self, width: int, height: int, viewport: Viewport = None,
+                 background: Tuple[int, int, int] = (0, 0, 0)):
+        self.canvas = CpuCanvas(width, height, background)
+        self.viewport = viewport
+        self.server = None
+
+    def attach(self, server: SceneServer):
+        self.server = server
+
+    def present(self, frame: SceneFrame):
+        viewport = self.viewport or self.server.scene_viewport()
+        scale_x, scale_y = viewport.scale_for(self.canvas.width, self.canvas.height)
+        center_x, center_y = frame.center
+
+        # След: гасим прошлый кадр вместо очистки (кадр приходит один раз за тик)
+        if frame.trail_fade is None:
+            self.canvas.clear()
+        else:
+            self.canvas.fade(frame.trail_fade)
+        offset_x, offset_y = center_x - viewport.x, center_y - viewport.y
+        widths = frame.widths
+        if widths is not None:
+            scale = min(scale_x, scale_y)
+            if scale < 1:
+                # Уменьшенный вид: не тоньше пикселя холста (как в HeadlessRenderer)
+                widths = [max(width, 1 / scale) for width in widths]
+            self.canvas.draw_thick_segments(frame.endpoints, frame.colors, widths,
+                                            offset_x, offset_y, scale_x, scale_y)
+        else:
+            self.canvas.draw_segments(frame.endpoints, frame.colors, offset_x, offset_y, scale_x, scale_y)
+
+
+def main():
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+
+    parser = argparse.ArgumentParser(description="One scene, several windows")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--width', type=int, default=800, help="scene width")
+    parser.add_argument('--height', type=int, default=600, help="scene height")
+    parser.add_argument('--view', action='append', default=[],
+                        help="x,y,width,height of the scene shown in one window (repeatable)")
+    parser.add_argument('--window-scale', type=float, default=1.0,
+                        help="window size relative to its view")
+    parser.add_argument('--fullscreen', action='store_true', help="window i fullscreen on screen i")
+    args = parser.parse_args()
+
+    # Вычисления - в движке без своего рендерера, рисуют только выводы
+    engine = ParametricEngine(args.width, args.height, headless=True)
+    data = ConfigLoader.load_json(args.config)
+    if not data:
+        return
+    engine.load_config(data)
+
+    server = SceneServer(engine)
+    views = [Viewport.parse(text) for text in args.view] or [server.scene_viewport()]
+    screens = pyglet.display.get_display().get_screens() if args.fullscreen else []
+
+    for index, viewport in enumerate(views):
+        if index < len(screens):
+            window = pyglet.window.Window(fullscreen=True, screen=screens[index])
+        else:
+            window = pyglet.window.Window(int(viewport.width * args.window_scale),
+                                          int(viewport.height * args.window_scale),
+                                          f"View {index}", resizable=True)
+        server.add_sink(WindowSink(window, viewport))
+
+    pyglet.clock.schedule_interval(lambda dt: server.tick(engine.clock.now()), 1 / 60)
+    print(f"✓ Scene server: {len(server.sinks)} windows, one evaluation per tick")
+    pyglet.app.run()
+
+
+if __name__ == "__main__":
+    main()
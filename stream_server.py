@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+"""
+Трансляция геометрии сцены по WebSocket в браузеры локальной сети
+Запуск: python stream_server.py config.json [--host 0.0.0.0] [--port 8765] [--fps 30]
+Планшет открывает http://<хост>:8765/ - страница stream_client.html
+подключается к ws://<хост>:8765/stream и рисует линии на canvas
+
+Движок считает кадр раз в тик (SceneServer), кадр кодируется один раз
+на всех подписчиков. Кодировки (?encoding= в адресе потока):
+- float32: концы как есть, 16 байт на линию
+- int16: концы в шагах 1/8 пикселя, 8 байт на линию
+- delta (по умолчанию): разность int8 с последним кадром, который получил
+  именно этот клиент, 4 байта на линию; большой скачок - ключевой кадр int16
+Кадр, концы которого дальше +-4096 пикселей от центра (не помещаются в int16),
+получают все клиенты как float32 - квантование не обрезает геометрию
+Медленный клиент не тормозит остальных: клиент отвечает на каждый кадр
+текстом "ack <номер>", и неподтвержденных кадров у него не больше MAX_IN_FLIGHT.
+Пока окно занято (или сокет не освободился - drain), новые кадры для него
+пропускаются: он получает последний, а не копит задержку в буферах
+
+Формат кадра (little-endian): заголовок HEADER, концы линий
+(относительно центра), затем цвета RGBA по вершинам, если FLAG_COLORS
+WebSocket (RFC 6455) реализован здесь же на asyncio - без зависимостей
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import math
+import os
+import socket
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STREAM_PATH = '/stream'
+CLIENT_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stream_client.html')
+
+# Заголовок: magic, версия, вид кадра, флаги, номер кадра, поколение линий,
+# время, число линий, шаг квантования, центр, размер сцены (44 байта - кратно 4)
+HEADER = struct.Struct('<2sBBBxxxIIfIfffff')
+MAGIC = b'LD'
+VERSION = 1
+
+KIND_FLOAT32 = 0
+KIND_INT16 = 1
+KIND_DELTA = 2
+FLAG_COLORS = 1
+
+ENCODINGS = ('float32', 'int16', 'delta')
+
+# Шаг int16: 1/8 пикселя, концы в пределах +-4096 пикселей от центра
+QUANT_STEP = 1 / 8
+QUANT_LIMIT = 32767
+
+# Кадров в пути (отправлены, не подтверждены): буферы сокетов на петле и в
+# LAN вмещают десятки кадров - без окна медленный клиент отстает на секунды
+MAX_IN_FLIGHT = 2
+# Буфер записи клиента: выше - drain ждет, кадры для клиента пропускаются
+WRITE_BUFFER_HIGH = 64 * 1024
+SEND_BUFFER = 32 * 1024
+# Клиент, который не подтверждает кадры дольше, отключается
+STALL_TIMEOUT = 10.0
+# Сообщения клиента - ack, ping, close: длиннее - соединение закрывается (1009)
+MAX_CLIENT_MESSAGE = 4 * 1024
+CLOSE_TOO_BIG = 1009
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+# ========== WEBSOCKET ==========
+
+def ws_accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept для ключа клиента"""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode('ascii')).digest()).decode('ascii')
+
+
+def ws_frame(opcode: int, payload: bytes = b'', mask: bool = False) -> bytes:
+    """Один кадр WebSocket (FIN); клиент обязан маскировать, сервер - нет"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length | (0x80 if mask else 0))
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126 | (0x80 if mask else 0), length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127 | (0x80 if mask else 0), length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    # XOR целыми числами - на порядок быстрее побайтового цикла
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, 'little') ^ int.from_bytes(repeated, 'little')).to_bytes(
+        len(payload), 'little')
+
+
+class MessageTooBig(Exception):
+    """Заявленная длина сообщения больше лимита (данные не читаются)"""
+
+
+async def ws_read_message(reader: asyncio.StreamReader, limit: Optional[int] = None) -> Tuple[int, bytes]:
+    """
+    Сообщение целиком (фрагменты склеиваются): (opcode, данные)
+    limit - наибольшая длина сообщения: длина из заголовка проверяется до
+    чтения, больше - MessageTooBig
+    """
+    opcode = None
+    parts = []
+    size = 0
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length, = struct.unpack('!H', await reader.readexactly(2))
+        elif length == 127:
+            length, = struct.unpack('!Q', await reader.readexactly(8))
+        size += length
+        if limit is not None and size > limit:
+            raise MessageTooBig(f"{size} bytes > {limit}")
+        key = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if key is not None:
+            payload = _apply_mask(payload, key)
+
+        frame_opcode = first & 0x0F
+        if frame_opcode >= OP_CLOSE:
+            return frame_opcode, payload  # Управляющие кадры не фрагментируются
+        if frame_opcode != OP_CONTINUATION:
+            opcode = frame_opcode
+        parts.append(payload)
+        if first & 0x80:
+            return opcode, b''.join(parts)
+
+
+async def _read_http_head(reader: asyncio.StreamReader) -> Tuple[str, Dict[str, str]]:
+    """Строка запроса/ответа и заголовки (имена в нижнем регистре)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+# ========== КОДИРОВАНИЕ КАДРОВ ==========
+
+def quantize(positions: array):
+    """
+    float32 концы -> int16 в шагах QUANT_STEP (numpy массив или array('h'))
+    None - кадр не помещается в int16 (или в нем nan/inf): его шлют как float32
+    """
+    if np is not None:
+        values = np.rint(np.frombuffer(positions, dtype=np.float32) / QUANT_STEP)
+        if values.size and not np.abs(values).max() <= QUANT_LIMIT:
+            return None
+        return values.astype('<i2')
+    scale = 1 / QUANT_STEP
+    values = [round(value * scale) if math.isfinite(value) else math.inf for value in positions]
+    if any(abs(value) > QUANT_LIMIT for value in values):
+        return None
+    return array('h', values)
+
+
+def _little_endian(values) -> bytes:
+    if sys.byteorder != 'little' and isinstance(values, array):
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class StreamFrame:
+    """Кадр для трансляции: концы float32 и int16 считаются один раз на всех"""
+
+    __slots__ = ('sequence', 'generation', 'time', 'lines', 'center', 'positions',
+                 'quantized', 'colors', 'colors_version', '_encoded', '_deltas')
+
+    def __init__(self, sequence: int, generation: int, current_time: float, lines: int,
+                 center: Tuple[float, float], positions: array, colors: array, colors_version: int):
+        self.sequence = sequence
+        self.generation = generation
+        self.time = current_time
+        self.lines = lines
+        self.center = center
+        self.positions = positions
+        self.quantized = quantize(positions)  # None - только float32
+        self.colors = colors
+        self.colors_version = colors_version  # Меняется вместе с цветами
+        # Клиенты в такт делят кодирование: (вид, опорный кадр, с цветами) -> bytes
+        self._encoded = {}
+        self._deltas = {}  # Опорный кадр -> разность int8 или None (не помещается)
+
+    def delta(self, reference, reference_sequence: int) -> Optional[bytes]:
+        """Разность int8 с квантованным кадром reference_sequence; None - скачок больше 127"""
+        if reference_sequence not in self._deltas:
+            difference = self.quantized.astype(np.int32) - reference
+            fits = difference.size == 0 or int(np.abs(difference).max()) <= 127
+            self._deltas[reference_sequence] = difference.astype(np.int8).tobytes() if fits else None
+        return self._deltas[reference_sequence]
+
+    def encode(self, kind: int, with_colors: bool, scene_size: Tuple[float, float],
+               reference_sequence: int = 0) -> bytes:
+        """Кадр вида kind; для KIND_DELTA разность уже посчитана в delta()"""
+        key = (kind, reference_sequence if kind == KIND_DELTA else 0, with_colors)
+        data = self._encoded.get(key)
+        if data is not None:
+            return data
+
+        if kind == KIND_FLOAT32:
+            payload = _little_endian(self.positions)
+        elif kind == KIND_INT16:
+            payload = _little_endian(self.quantized)
+        else:
+            payload = self._deltas[reference_sequence]
+
+        header = HEADER.pack(MAGIC, VERSION, kind, FLAG_COLORS if with_colors else 0,
+                             self.sequence, self.generation, self.time, self.lines,
+                             QUANT_STEP, self.center[0], self.center[1], *scene_size)
+        data = header + payload + (bytes(self.colors) if with_colors else b'')
+        self._encoded[key] = data
+        return data
+
+
+class StreamDecoder:
+    """
+    Декодер кадров на стороне клиента (Python версия stream_client.html)
+    Хранит опорный кадр для delta и последние цвета
+    """
+
+    def __init__(self):
+        self.quantized = None
+        self.colors = b''
+        self.header = None
+
+    def decode(self, data: bytes):
+        """Кадр -> (заголовок dict, концы (x1, y1, x2, y2) относительно центра)"""
+        (magic, version, kind, flags, sequence, generation, current_time, lines, step,
+         center_x, center_y, width, height) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a stream frame: {magic!r} v{version}")
+
+        offset = HEADER.size
+        values = lines * 4
+        if kind == KIND_FLOAT32:
+            positions = array('f', data[offset:offset + values * 4])
+            offset += values * 4
+            self.quantized = None
+        else:
+            if kind == KIND_INT16:
+                quantized = array('h', data[offset:offset + values * 2])
+                offset += values * 2
+            else:
+                delta = array('b', data[offset:offset + values])
+                offset += values
+                quantized = array('h', [base + change for base, change in zip(self.quantized, delta)])
+            self.quantized = quantized
+            positions = [value * step for value in quantized]
+        if flags & FLAG_COLORS:
+            self.colors = data[offset:offset + lines * 8]
+
+        self.header = {'kind': kind, 'sequence': sequence, 'generation': generation,
+                       'time': current_time, 'lines': lines, 'step': step,
+                       'center': (center_x, center_y), 'size': (width, height)}
+        endpoints = [tuple(positions[index:index + 4]) for index in range(0, values, 4)]
+        return self.header, endpoints
+
+
+# ========== СЕРВЕР ==========
+
+class _Subscriber:
+    """Клиент потока: своя кодировка, свой опорный кадр и счетчики"""
+
+    def __init__(self, writer: asyncio.StreamWriter, encoding: str, address: str):
+        self.writer = writer
+        self.encoding = encoding
+        self.address = address
+        self.event = asyncio.Event()   # Есть кадр новее отправленного
+        self.sequence = 0              # Последний отправленный кадр
+        self.in_flight = 0             # Отправлено, но не подтверждено
+        self.blocked_since = None      # Окно заполнено с этого момента
+        self.reference = None          # Его квантованные концы (для delta)
+        self.generation = None
+        self.colors_version = None
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.key_frames = 0
+
+
+class StreamSink:
+    """
+    Вывод SceneServer в WebSocket подписчиков
+
+    present() вызывается из потока вычисления: кадр упаковывается и
+    квантуется там же, а в цикл asyncio передается готовый StreamFrame.
+    Каждый подписчик отправляет последний кадр в своем темпе
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, default_encoding: str = 'delta'):
+        self.host = host
+        self.port = port
+        self.default_encoding = default_encoding
+        self.server = None  # SceneServer
+        self.subscribers = set()
+        self.latest = None
+        self.sequence = 0
+        self.colors_version = 0
+        self.scene_size = (0.0, 0.0)
+        self._generation = None
+        self._loop = None
+        self._listener = None
+
+    # ----- Вывод SceneServer -----
+
+    def attach(self, server):
+        self.server = server
+        self.scene_size = (float(server.engine.width), float(server.engine.height))
+
+    def present(self, frame):
+        """Кадр сцены -> StreamFrame (из потока вычисления)"""
+        self.sequence += 1
+        if frame.colors_changed or frame.generation != self._generation:
+            self.colors_version += 1
+            self._generation = frame.generation
+        stream_frame = StreamFrame(self.sequence, frame.generation, frame.time, len(frame.endpoints),
+                                   frame.center, frame.positions, frame.colors, self.colors_version)
+        self._loop.call_soon_threadsafe(self._publish, stream_frame)
+
+    def _publish(self, frame: StreamFrame):
+        self.latest = frame
+        for subscriber in self.subscribers:
+            subscriber.event.set()
+
+    # ----- Сеть -----
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._listener = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._listener.sockets[0].getsockname()[1]  # Порт 0 - выбирает система
+        return self
+
+    async def close(self):
+        for subscriber in list(self.subscribers):
+            subscriber.writer.close()
+        if self._listener is not None:
+            self._listener.close()
+            await self._listener.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request, headers = await _read_http_head(reader)
+            method, target = request.split(' ')[:2]
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+
+        url = urlsplit(target)
+        if url.path == STREAM_PATH and headers.get('upgrade', '').lower() == 'websocket':
+            encoding = parse_qs(url.query).get('encoding', [self.default_encoding])[0]
+            if encoding not in ENCODINGS:
+                encoding = self.default_encoding
+            if encoding == 'delta' and np is None:
+                encoding = 'int16'  # Разность считается через numpy
+            await self._serve_stream(reader, writer, headers, encoding)
+        elif method == 'GET' and url.path in ('/', '/index.html'):
+            with open(CLIENT_PAGE, 'rb') as f:
+                page = f.read()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                         b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(page) + page)
+            await writer.drain()
+            writer.close()
+        else:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            writer.close()
+
+    async def _serve_stream(self, reader, writer, headers: Dict[str, str], encoding: str):
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                      'Connection: Upgrade\r\n'
+                      f"Sec-WebSocket-Accept: {ws_accept_key(headers.get('sec-websocket-key', ''))}"
+                      '\r\n\r\n').encode('ascii'))
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+        connection = writer.get_extra_info('socket')
+        if connection is not None:
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        peer = writer.get_extra_info('peername')
+        subscriber = _Subscriber(writer, encoding, f"{peer[0]}:{peer[1]}" if peer else '?')
+        self.subscribers.add(subscriber)
+        if self.latest is not None:
+            subscriber.event.set()
+        print(f"✓ Stream client {subscriber.address} ({encoding}), {len(self.subscribers)} connected")
+
+        sender = asyncio.ensure_future(self._send_loop(subscriber))
+        try:
+            while True:
+                try:
+                    opcode, payload = await ws_read_message(reader, MAX_CLIENT_MESSAGE)
+                except MessageTooBig as e:
+                    print(f"⚠ Stream client {subscriber.address}: message too big ({e}), closing")
+                    writer.write(ws_frame(OP_CLOSE, struct.pack('!H', CLOSE_TOO_BIG)))
+                    break
+                if opcode == OP_CLOSE:
+                    writer.write(ws_frame(OP_CLOSE, payload[:2]))
+                    break
+                if opcode == OP_PING:
+                    writer.write(ws_frame(OP_PONG, payload))
+                elif opcode == OP_TEXT and payload.startswith(b'ack'):
+                    subscriber.in_flight = max(0, subscriber.in_flight - 1)
+                    subscriber.blocked_since = None
+                    subscriber.event.set()  # Окно освободилось - отправить последний кадр
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            sender.cancel()
+            self.subscribers.discard(subscriber)
+            writer.close()
+            print(f"Stream client {subscriber.address} left: {subscriber.sent} frames sent, "
+                  f"{subscriber.dropped} dropped, {subscriber.bytes_sent // max(1, subscriber.sent)} "
+                  f"bytes/frame")
+
+    async def _send_loop(self, subscriber: _Subscriber):
+        try:
+            while True:
+                await subscriber.event.wait()
+                subscriber.event.clear()
+                frame = self.latest
+                if frame is None or frame.sequence == subscriber.sequence:
+                    continue
+                if subscriber.in_flight >= MAX_IN_FLIGHT:
+                    # Кадр пропускается; ack снова разбудит цикл
+                    now = time.monotonic()
+                    if subscriber.blocked_since is None:
+                        subscriber.blocked_since = now
+                    elif now - subscriber.blocked_since > STALL_TIMEOUT:
+                        raise asyncio.TimeoutError
+                    continue
+                if subscriber.sequence:
+                    subscriber.dropped += frame.sequence - subscriber.sequence - 1
+
+                data = self._encode_for(subscriber, frame)
+                subscriber.writer.write(ws_frame(OP_BINARY, data))
+                subscriber.sent += 1
+                subscriber.in_flight += 1
+                subscriber.bytes_sent += len(data)
+                # Backpressure: пока клиент не прочитал, новые кадры для него копятся в latest
+                await asyncio.wait_for(subscriber.writer.drain(), STALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠ Stream client {subscriber.address} stalled, disconnecting")
+            subscriber.writer.close()
+        except ConnectionError:
+            subscriber.writer.close()
+
+    def _encode_for(self, subscriber: _Subscriber, frame: StreamFrame) -> bytes:
+        """
+        Кадр в кодировке клиента; ключевой кадр при новом наборе линий или большом скачке
+        Кадр вне диапазона int16 - float32 и для int16/delta клиентов
+        """
+        with_colors = subscriber.colors_version != frame.colors_version
+        if subscriber.encoding == 'float32' or frame.quantized is None:
+            kind = KIND_FLOAT32
+        elif (subscriber.encoding == 'delta' and subscriber.generation == frame.generation
+              and subscriber.reference is not None
+              and frame.delta(subscriber.reference, subscriber.sequence) is not None):
+            kind = KIND_DELTA
+        else:
+            kind = KIND_INT16
+            subscriber.key_frames += 1
+
+        data = frame.encode(kind, with_colors, self.scene_size, subscriber.sequence)
+        subscriber.sequence = frame.sequence
+        subscriber.generation = frame.generation
+        subscriber.colors_version = frame.colors_version
+        if subscriber.encoding == 'delta':
+            # После float32 опорного кадра нет - следующий будет ключевым
+            subscriber.reference = None if frame.quantized is None else frame.quantized.astype(np.int32)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'subscribers': len(self.subscribers),
+            'frames': self.sequence,
+            'sent': sum(subscriber.sent for subscriber in self.subscribers),
+            'dropped': sum(subscriber.dropped for subscriber in self.subscribers),
+        }
+
+
+async def run_stream(scene_server, sink: StreamSink, fps: float = 30.0,
+                     duration: Optional[float] = None, idle: bool = False):
+    """
+    Цикл тиков: кадр считается в отдельном потоке (сокеты обслуживаются
+    во время вычисления); без подписчиков сцена не считается, если не idle
+    duration - остановиться через столько секунд (None - бесконечно)
+    """
+    loop = asyncio.get_running_loop()
+    engine = scene_server.engine
+    period = 1.0 / fps
+    started = loop.time()
+    next_tick = started
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='stream-tick') as executor:
+        while duration is None or loop.time() - started < duration:
+            if sink.subscribers or idle:
+                await loop.run_in_executor(executor, scene_server.tick, engine.clock.now())
+            next_tick += period
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()  # Отстали - пропускаем тики, а не догоняем
+
+
+# ========== КЛИЕНТ ==========
+
+class StreamClient:
+    """Минимальный WebSocket клиент потока (для проверок и записи)"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.decoder = StreamDecoder()
+
+    @classmethod
+    async def connect(cls, host: str, port: int, encoding: str = 'delta',
+                      receive_buffer: int = 0) -> 'StreamClient':
+        """receive_buffer - приемные буферы сокета и чтения (маленькие - для медленного клиента)"""
+        if receive_buffer:
+            # Размер окна TCP согласуется при соединении - буфер задается до connect
+            connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+            connection.setblocking(False)
+            await asyncio.get_running_loop().sock_connect(connection, (host, port))
+            reader, writer = await asyncio.open_connection(sock=connection, limit=receive_buffer)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        writer.write((f"GET {STREAM_PATH}?encoding={encoding} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                      f"Upgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                      "Sec-WebSocket-Version: 13\r\n\r\n").encode('ascii'))
+        status, headers = await _read_http_head(reader)
+        if ' 101 ' not in status or headers.get('sec-websocket-accept') != ws_accept_key(key):
+            writer.close()
+            raise ConnectionError(f"handshake failed: {status}")
+        return cls(reader, writer)
+
+    async def receive(self) -> bytes:
+        """Следующий бинарный кадр потока (подтверждается сразу)"""
+        while True:
+            opcode, payload = await ws_read_message(self.reader)
+            if opcode == OP_BINARY:
+                self.writer.write(ws_frame(OP_TEXT, b'ack %d' % HEADER.unpack_from(payload)[4],
+                                           mask=True))
+                return payload
+            if opcode == OP_CLOSE:
+                raise ConnectionError("stream closed")
+
+    async def close(self):
+        self.writer.write(ws_frame(OP_CLOSE, struct.pack('!H', 1000), mask=True))
+        await self.writer.drain()
+        self.writer.close()
+
+
+def main():
+    try:
+        # Без окна: pyglet.gl не должен создавать скрытое окно при импорте
+        import pyglet
+        pyglet.options['shadow_window'] = False
+    except ImportError:
+        pass
+
+    from config_loader import ConfigLoader
+    from engine import ParametricEngine
+    from scene_server import SceneServer
+
+    parser = argparse.ArgumentParser(description="Stream scene geometry to browsers over WebSocket")
+    parser.add_argument('config', nargs='?', default='example_parametric.json')
+    parser.add_argument('--width', type=int, default=800, help="scene width")
+    parser.add_argument('--height', type=int, default=600, help="scene height")
+    parser.add_argument('--host', default='0.0.0.0', help="0.0.0.0 - whole LAN, 127.0.0.1 - this machine")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--encoding', choices=ENCODINGS, default='delta',
+                        help="default for clients that do not ask for one")
+    args = parser.parse_args()
+
+    engine = ParametricEngine(args.width, args.height, headless=True)
+    data = ConfigLoader.load_json(args.config)
+    if not data:
+        return
+    engine.load_config(data)
+
+    scene = SceneServer(engine)
+    sink = StreamSink(args.host, args.port, args.encoding)
+    scene.add_sink(sink)
+
+    async def serve():
+        await sink.start()
+        print(f"✓ Streaming on http://{args.host}:{sink.port}/ ({args.fps:g} fps, {args.encoding})")
+        await run_stream(scene, sink, args.fps)
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Часы сцены: пауза, перемотка, скорость и снимки состояния для перемотки
+
+Геометрия - чистая функция от времени, поэтому любой кадр вычисляется
+сразу по своему времени. Состояние между кадрами (сглаживание smooth_amp и
+smooth_band) берется из ближайшего снимка до нужного момента, а не
+проигрывается с нуля; ключевые кадры интерполяции просто сбрасываются,
+след заново накапливается за короткое окно (см. trail_warmup_frames)
+"""
+import bisect
+import math
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SNAPSHOT_INTERVAL = 1.0   # Секунд времени сцены между снимками состояния
+MAX_SNAPSHOTS = 600       # Больше - удаляются снимки дальше всего от текущего времени
+MIN_SPEED = 1 / 16
+MAX_SPEED = 16.0
+TRAIL_FRAME = 1 / 60      # Шаг времени кадра следа (как у таймера обновления)
+MAX_TRAIL_WARMUP = 120    # Кадров накопления следа после перемотки, не больше
+
+
+class Timeline:
+    """
+    Часы сцены: время = позиция + (сейчас - момент отсчета) * скорость
+
+    Пауза, перемотка и смена скорости переносят текущее время в позицию,
+    поэтому время не прыгает. clock - источник секунд (для проверок - свой)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._origin = clock()
+        self._position = 0.0
+        self.speed = 1.0
+        self.playing = True
+
+    def now(self) -> float:
+        """Текущее время сцены"""
+        if not self.playing:
+            return self._position
+        return self._position + (self._clock() - self._origin) * self.speed
+
+    def _rebase(self):
+        self._position = self.now()
+        self._origin = self._clock()
+
+    def play(self):
+        self._rebase()
+        self.playing = True
+
+    def pause(self):
+        self._rebase()
+        self.playing = False
+
+    def toggle(self) -> bool:
+        """Пауза/продолжение; возвращает, идет ли время"""
+        if self.playing:
+            self.pause()
+        else:
+            self.play()
+        return self.playing
+
+    def seek(self, current_time: float):
+        """Переход на момент current_time (не раньше 0)"""
+        self._position = max(0.0, current_time)
+        self._origin = self._clock()
+
+    def seek_by(self, delta: float):
+        self.seek(self.now() + delta)
+
+    def set_speed(self, speed: float):
+        """Скорость (отрицательная - назад), по модулю в [MIN_SPEED, MAX_SPEED]"""
+        self._rebase()
+        sign = -1.0 if speed < 0 else 1.0
+        self.speed = sign * min(max(abs(speed), MIN_SPEED), MAX_SPEED)
+
+    def state(self) -> Dict[str, Any]:
+        return {'time': self.now(), 'speed': self.speed, 'playing': self.playing}
+
+
+class StateSnapshots:
+    """
+    Снимки состояния между кадрами по времени сцены
+
+    record сохраняет не больше одного снимка на интервал (первый - ближе
+    всего к началу интервала); nearest отдает последний снимок не позже t
+    """
+
+    def __init__(self, interval: float = SNAPSHOT_INTERVAL, capacity: int = MAX_SNAPSHOTS):
+        self.interval = interval
+        self.capacity = capacity
+        self.times = []   # Отсортированные моменты снимков
+        self.states = {}  # Момент -> состояние
+
+    def clear(self):
+        self.times.clear()
+        self.states.clear()
+
+    def record(self, current_time: float, take: Callable[[], Any]):
+        """Снимок на интервал current_time, если его еще нет (take вызывается только тогда)"""
+        slot = math.floor(current_time / self.interval)
+        index = bisect.bisect_right(self.times, current_time)
+        if index and math.floor(self.times[index - 1] / self.interval) == slot:
+            return
+        if index < len(self.times) and math.floor(self.times[index] / self.interval) == slot:
+            # Снимок этого интервала сделан позже по времени: ранний ближе к началу
+            del self.states[self.times.pop(index)]
+
+        self.times.insert(index, current_time)
+        self.states[current_time] = take()
+        if len(self.times) > self.capacity:
+            farthest = max(self.times, key=lambda t: abs(t - current_time))
+            self.times.remove(farthest)
+            del self.states[farthest]
+
+    def nearest(self, current_time: float) -> Optional[Tuple[float, Any]]:
+        """(момент, состояние) последнего снимка не позже current_time или None"""
+        index = bisect.bisect_right(self.times, current_time)
+        if not index:
+            return None
+        moment = self.times[index - 1]
+        return moment, self.states[moment]
+
+
+def trail_warmup_frames(fade: float) -> int:
+    """
+    Сколько кадров накопить после перемотки, чтобы след совпал с непрерывным
+    проигрыванием: более ранние кадры погасли бы ниже 1/255
+    """
+    if fade >= 1.0:
+        return 1
+    if fade <= 0.0:
+        return MAX_TRAIL_WARMUP
+    return min(MAX_TRAIL_WARMUP, math.ceil(math.log(1 / 255) / math.log(1 - fade)))